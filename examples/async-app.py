@@ -0,0 +1,30 @@
+import asyncio
+from termpixels import App, Color
+
+async def ticker(app):
+    # runs alongside the App on the same event loop
+    n = 0
+    while True:
+        app.screen.print("background task: {}".format(n), 1, 3, fg=Color.rgb(0.5,0.5,0.5))
+        app.screen.update()
+        n += 1
+        await asyncio.sleep(0.5)
+
+async def main():
+    app = App()
+
+    @app.on("start")
+    async def on_start():
+        app.screen.print("Press any key (escape to exit).", 1, 1)
+        app.screen.update()
+        while True:
+            key = await app.next("key")
+            app.screen.print("You pressed: {}    ".format(key), 1, 2, fg=Color.rgb(0,1,0))
+            app.screen.update()
+
+    task = asyncio.ensure_future(ticker(app))
+    await app.run_async()
+    task.cancel()
+
+if __name__ == "__main__":
+    asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,28 @@
+from termpixels import App, Canvas, Color
+from time import time
+from math import sin
+
+def main():
+    app = App()
+    app.canvas = Canvas(app.screen.w, app.screen.h, mode="braille", fg=Color.rgb(0, 1, 0.5))
+
+    @app.on("resize")
+    def on_resize():
+        app.canvas.resize(app.screen.w, app.screen.h)
+
+    @app.on("frame")
+    def on_frame():
+        canvas = app.canvas
+        canvas.clear()
+        t = time()
+        for x in range(canvas.w):
+            # plot a wave, using the full braille resolution
+            y = canvas.h / 2 + sin(x / 8 + t * 2) * sin(x / 31 - t) * (canvas.h / 2 - 1)
+            canvas.set(x, round(y))
+        app.screen.blit(canvas)
+        app.screen.update()
+
+    app.run()
+
+if __name__ == "__main__":
+    main()
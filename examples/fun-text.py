@@ -1,9 +1,10 @@
-from termpixels import App, Color
+from termpixels import App, Gradient
 from time import time
 from math import sin
 
 def main():
     app = App()
+    rainbow = Gradient.hues(1, 0.5)                  # a table of colors for every hue
 
     @app.on("frame")                                 # run this function every frame
     def on_frame():
@@ -12,7 +13,7 @@ def main():
         
         for i, c in enumerate(text):
             f = i / len(text)
-            color = Color.hsl(f + time(), 1, 0.5)    # create a color from a hue value
+            color = rainbow.at(f + time())           # look up a color from a hue value
             x = app.screen.w // 2 - len(text) // 2   # horizontally center the text
             offset = sin(time() * 3 + f * 5) * 2     # some arbitrary math
             y = round(app.screen.h / 2 + offset)     # vertical center with an offset
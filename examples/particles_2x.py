@@ -1,9 +1,11 @@
 import random
 import math
+from array import array
 from termpixels import App, Color
+from termpixels.color import add_packed
 from termpixels.drawing import draw_colormap_2x
 
-RED = Color.rgb(0.25,0.1,0.05)
+RED = Color.rgb(0.25,0.1,0.05).packed
 
 class Particle:
     def __init__(self, x, y, vx = 0, vy = 0):
@@ -35,7 +37,7 @@ def main():
     def on_frame():
         w = app.screen.w
         h = app.screen.h
-        colormap = [Color.rgb(0,0,0) for x in range(w) for y in range(h * 2)]
+        colormap = array("I", [0]) * (w * h * 2)
 
         dx = app.mouse_x - app.mouse_px
         dy = app.mouse_y - app.mouse_py
@@ -60,11 +62,11 @@ def main():
                 px = int(p.x - p.vx * f)
                 py = int(p.y - p.vy * f)
                 if px >= 0 and py >= 0 and px < w and py < h * 2:
-                    colormap[py * w + px] += RED
+                    colormap[py * w + px] = add_packed(colormap[py * w + px], RED)
             p.update()
             if p.x < 0 or p.y < 0 or p.x >= w or p.y >= h * 2:
                 app.particles.remove(p)
-        draw_colormap_2x(app.screen, colormap, 0, 0, w=w, h=h * 2)
+        draw_colormap_2x(app.screen, colormap, 0, 0, w=w, h=h * 2, dither=app.backend.color_mode)
         app.screen.update()
 
         app.mouse_px = app.mouse_x
@@ -0,0 +1,80 @@
+"""Mirror a screen to other terminals over a Unix socket.
+
+Run "python remote-view.py serve" in one terminal, then run
+"python remote-view.py view" in any number of others.
+"""
+
+import os
+import socket
+import sys
+from termpixels import App, Color, StyleScreen
+from termpixels.delta import DeltaBackend, DeltaClient
+
+SOCKET_PATH = "/tmp/termpixels-remote-view"
+
+def serve():
+    app = App(framerate=30, styled=True)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    if os.path.exists(SOCKET_PATH):
+        os.unlink(SOCKET_PATH)
+    listener.bind(SOCKET_PATH)
+    listener.listen()
+    listener.setblocking(False)
+    state = {"t": 0, "mirror": None}
+
+    @app.on("start")
+    def start():
+        state["mirror"] = StyleScreen(DeltaBackend(app.screen.w, app.screen.h))
+
+    @app.on("frame")
+    def frame():
+        mirror = state["mirror"]
+        try:
+            connection, _ = listener.accept()
+            mirror.backend.subscribe(connection)
+        except BlockingIOError:
+            pass
+
+        state["t"] += 1
+        app.screen.clear()
+        app.screen.print("viewers: {}".format(len(mirror.backend.subscribers)), 1, 1)
+        for x in range(app.screen.w):
+            hue = (x + state["t"]) / app.screen.w
+            app.screen.print("█", x, 3, fg=Color.hsl(hue % 1, 1, 0.5))
+        app.screen.update()
+        app.screen.blit_to(mirror)
+        mirror.update()
+
+    app.run()
+    listener.close()
+    os.unlink(SOCKET_PATH)
+
+def view():
+    app = App(framerate=60)
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(SOCKET_PATH)
+    connection.setblocking(False)
+    state = {"client": None}
+
+    @app.on("start")
+    def start():
+        state["client"] = DeltaClient(app.backend, app.input)
+
+    @app.on("frame")
+    def frame():
+        try:
+            data = connection.recv(1 << 16)
+        except BlockingIOError:
+            return
+        if not data:
+            app.stop()
+            return
+        state["client"].feed(data)
+
+    app.run()
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["serve"]:
+        serve()
+    else:
+        view()
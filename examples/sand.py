@@ -79,7 +79,8 @@ class P:
                     screen[x, y // 2].char = "▄"
 
 def main():
-    app = App(mouse=True, framerate=60)
+    # run the simulation in this thread, with no background threads
+    app = App(mouse=True, framerate=60, threaded=False)
     app.screen.show_cursor = True
 
     w = 0
@@ -148,8 +149,7 @@ def main():
         if k == "x":
             interact(False)
 
-    app.start()
-    app.await_stop()
+    app.run()
 
 if __name__ == "__main__":
     main()
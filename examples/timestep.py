@@ -0,0 +1,33 @@
+from termpixels import App, Color
+
+def main():
+    app = App(framerate=30, tickrate=120)
+    ball = {"x": 1.0, "y": 1.0, "vx": 20.0, "vy": 0.0}
+    prev = dict(ball)
+
+    @app.on("tick")
+    def tick(dt):
+        prev.update(ball)
+        ball["vy"] += 40 * dt
+        ball["x"] += ball["vx"] * dt
+        ball["y"] += ball["vy"] * dt
+        if ball["x"] < 0 or ball["x"] >= app.screen.w - 1:
+            ball["vx"] = -ball["vx"]
+            ball["x"] = max(0, min(app.screen.w - 1, ball["x"]))
+        if ball["y"] >= app.screen.h - 1:
+            ball["vy"] = -abs(ball["vy"])
+            ball["y"] = app.screen.h - 1
+
+    @app.on("render")
+    def render(alpha):
+        x = prev["x"] + (ball["x"] - prev["x"]) * alpha
+        y = prev["y"] + (ball["y"] - prev["y"]) * alpha
+        app.screen.clear()
+        app.screen.print(str(app.timestep.stats), 0, 0, fg=Color.rgb(0.5, 0.5, 0.5))
+        app.screen.print("●", int(x), int(y), fg=Color.rgb(1, 0.8, 0))
+        app.screen.update()
+
+    app.run()
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,15 @@
 from termpixels.app import App
 from termpixels.color import Color
 from termpixels.keys import Key, Mouse
-from termpixels.screen import Screen
+from termpixels.screen import Screen, StyleScreen
 from termpixels.buffer import Buffer
 from termpixels.sparsebuffer import SparseBuffer
+from termpixels.scrollback import ScrollbackBuffer
+from termpixels.canvas import Canvas
+from termpixels.gradient import Palette, Gradient
+from termpixels.timestep import Timestep
+from termpixels.stylebuffer import StyleBuffer
+from termpixels.style import Style, StyleTable
 from termpixels.pixeldata import PixelData, ImmutablePixelData
 
 name = "termpixels"
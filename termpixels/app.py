@@ -30,25 +30,98 @@ def main():
 if __name__ == "__main__":
     main()
 ```
+
+An App can also run on an asyncio event loop, by awaiting its run_async()
+method. In that case, input is read and events are dispatched on the loop 
+rather than in background threads, and listeners may be coroutine functions.
+The next() method returns a Future for the next occurrence of an event:
+```
+async def main():
+    app = App()
+
+    @app.on("start")
+    async def start():
+        app.screen.print("Press any key")
+        app.screen.update()
+        key = await app.next("key")
+        ...
+
+    await app.run_async()
+
+asyncio.get_event_loop().run_until_complete(main())
+```
+
+Finally, an App created with threaded=False does not use any background 
+threads. Instead, the caller drives it from its own loop, by calling 
+poll_input() to read input and step() to render each frame:
+```
+app = App(threaded=False)
+app.start()
+while app.running:
+    app.poll_input(timeout=1/60)
+    app.step()
+```
+(run() does the same at the App's framerate.)
+
+Slow work should not be done in a listener, since no other events can be
+dispatched until it returns. Instead, submit() runs a function in a thread
+(or process) pool and emits its result as an event:
+```
+@app.on("key")
+def key(k):
+    app.submit(compute_layout, app.screen.w, event="layout_done")
+
+@app.on("layout_done")
+def layout_done(layout):
+    ...
+```
+Calls that have not finished when the App stops are cancelled.
+
+An App created with a tickrate also emits "tick" events at that fixed rate, 
+for updating a simulation, and a "render" event after the ticks of each 
+frame. See termpixels.timestep for details.
 """
 
+import asyncio
 from time import sleep, perf_counter
 from threading import Event
-from termpixels.screen import Screen
+from termpixels.screen import Screen, StyleScreen
 from termpixels.detector import detect_backend, detect_input
-from termpixels.observable import Observable, start_polling, join_event_queue, Interval
+from termpixels.observable import Observable, EventQueue, main_event_queue, start_polling, stop_polling, join_polling, join_event_queue, poll_events, cancel_listener_tasks, Interval
+from termpixels.timestep import Timestep
 import termpixels.observable
 
 class App(Observable):
-    def __init__(self, *, mouse=False, framerate=30, exit_key="escape"):
+    def __init__(self, *, mouse=False, framerate=30, exit_key="escape", styled=False, threaded=True, 
+                 tickrate=None, executor=None, tty=None, term=None, queue=None):
         """
         mouse - whether to enable mouse tracking
         framerate - number of "frame" events to emit per second
+        styled - whether to use a StyleScreen, which supports text attributes
+        threaded - whether to read input and dispatch events in background 
+                   threads; if False, see poll_input() and step()
+        tickrate - if given, number of "tick" events to emit per second; each
+                   frame, the ticks that are due are emitted, followed by a
+                   "render" event (see termpixels.timestep)
+        executor - the executor used by submit() (see set_executor())
+        tty - the path or a file descriptor of the terminal, such as a pty, on
+              which to run the App instead of the controlling terminal
+        term - the terminal type, instead of the TERM environment variable
+        queue - the EventQueue on which the App's events are dispatched; by
+                default, each App has its own. Pass main_event_queue to share
+                it with the Observables that use it by default.
         """
-        super().__init__()
-        self.backend = detect_backend()
-        self.input = detect_input()
-        self.screen = Screen(self.backend, self.input)
+        super().__init__(EventQueue() if queue is None else queue)
+        self.set_executor(executor)
+        terminal = {"queue": self._event_queue}
+        if tty is not None:
+            terminal["tty"] = tty
+        if term is not None:
+            terminal["term"] = term
+        self.backend = detect_backend(**terminal)
+        self.input = detect_input(**terminal)
+        screen_class = StyleScreen if styled else Screen
+        self.screen = screen_class(self.backend, self.input)
 
         self.propagate_event(self.input, "key")
         self.propagate_event(self.input, "mouse")
@@ -62,7 +135,7 @@ class App(Observable):
         self._exit_event = Event()
         self.listen("_start", self._on_start)
         self.listen("_stop", self._on_stop)
-        self.listen("_exit", lambda: self._exit_event.set())
+        self.listen("_exit", self._on_exit)
 
         if exit_key is not None:
             @self.on("key")
@@ -72,21 +145,141 @@ class App(Observable):
 
         self._framerate = framerate
         self._mouse = mouse
+        self._threaded = threaded
+        self._running = False
         self._stopping = False
+        self._frame_interval = None
+
+        self.timestep = None
+        if tickrate is not None:
+            self.timestep = Timestep(tickrate)
+            self.listen("frame", self._on_frame_timestep, priority=1)
+
+        # state for run_async()
+        self._loop = None
+        self._exited = None
+        self._drain_scheduled = False
+
+    @property
+    def running(self):
+        """Whether the App has been started and has not yet stopped."""
+        return self._running
 
     def run(self, *args, **kwargs):
-        """ start() and then await_stop() """
+        """ start() and then await_stop() 
+        
+        If the App is not threaded, instead runs a loop in the calling thread
+        which calls poll_input() and step() at the App's framerate.
+        """
+        if self._threaded:
+            self.start(*args, **kwargs)
+            self.await_stop()
+            return
+
         self.start(*args, **kwargs)
-        self.await_stop()
+        try:
+            frame_time = perf_counter()
+            while self._running:
+                frame_time = max(frame_time + 1/self._framerate, perf_counter())
+                remaining = frame_time - perf_counter()
+                while self._running and remaining > 0:
+                    self.poll_input(remaining)
+                    remaining = frame_time - perf_counter()
+                if self._running:
+                    self.step()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
 
     def start(self, *args, **kwargs):
         """ Start running the App asynchronously.
 
-        Forwards all arguments to the "start" event.
+        Forwards all arguments to the "start" event. If the App is not
+        threaded, the App is started before this method returns.
         """
-        start_polling()
+        if self._threaded:
+            start_polling(self._event_queue)
         self.t0 = perf_counter()
+        self._running = True
         self.emit("_start", *args, **kwargs)
+        if not self._threaded:
+            poll_events(self._event_queue)
+
+    def poll_input(self, timeout=0):
+        """ Read input and dispatch events, in an App that is not threaded.
+
+        Waits up to timeout seconds (but returns as soon as possible if input
+        is received) and then dispatches all pending events, including any 
+        "key", "mouse" and "resize" events.
+        """
+        poll = getattr(self.input, "poll", None)
+        if poll is not None:
+            poll(timeout)
+            poll_events(self._event_queue)
+        else:
+            # input is read in a thread, so wait for it to emit an event
+            poll_events(self._event_queue, timeout)
+
+    def step(self):
+        """ Render a frame, in an App that is not threaded.
+
+        Dispatches pending events, then emits and dispatches a "frame" event,
+        and finally updates the screen.
+        """
+        poll_events(self._event_queue)
+        self.emit("frame")
+        poll_events(self._event_queue)
+        if self._running:
+            self.screen.update()
+
+    async def run_async(self, *args, **kwargs):
+        """ Run the App on the running asyncio event loop until it stops.
+
+        Rather than starting background threads, input is read using the loop,
+        frames are scheduled with loop.call_at(), and events are dispatched on
+        the loop. Other threads may still emit events, which are dispatched on
+        the loop as well. If the task running the App is cancelled, the App is
+        stopped gracefully. Coroutine listeners that are still running when
+        the App stops are cancelled.
+
+        Must be awaited in the main thread. Forwards all arguments to the 
+        "start" event.
+        """
+        loop = asyncio.get_event_loop()
+        self._loop = loop
+        self._exited = loop.create_future()
+        self._drain_scheduled = False
+        def wake():
+            if not self._drain_scheduled:
+                self._drain_scheduled = True
+                loop.call_soon_threadsafe(self._drain_events)
+        self._event_queue.set_waker(wake)
+        try:
+            self.t0 = perf_counter()
+            self._running = True
+            self.emit("_start", *args, **kwargs)
+            await asyncio.shield(self._exited)
+        finally:
+            if not self._stopping:
+                self.stop()
+            # restore the terminal state even if the loop is shutting down
+            self._drain_events()
+            self._event_queue.set_waker(None)
+            cancel_listener_tasks(loop)
+            self._loop = None
+
+    def _drain_events(self):
+        """Dispatch all queued events on the event loop."""
+        self._drain_scheduled = False
+        try:
+            poll_events(self._event_queue)
+        except Exception as e:
+            # finish the run_async() call with the exception
+            if not self._exited.done():
+                self._exited.set_exception(e)
+            else:
+                raise
     
     def _on_start(self, *args, **kwargs):
         self._stopping = False
@@ -106,15 +299,41 @@ class App(Observable):
 
         self.backend.flush()
         
-        self.input.start()
+        start_async = getattr(self.input, "start_async", None)
+        if self._loop is not None and start_async is not None:
+            start_async(self._loop)
+        elif self._loop is None and not self._threaded and hasattr(self.input, "poll"):
+            self.input.start(threaded=False)
+        else:
+            # input is read in a thread, but its events are still dispatched
+            # by the loop or by poll_input()
+            self.input.start()
         self.screen.show_cursor = False
         self.backend.flush()
 
-        self._frame_interval = self.create_interval("frame", 1/self._framerate)
-        self._frame_interval.start()
+        if self.timestep is not None:
+            self.timestep.reset()
+        if self._threaded or self._loop is not None:
+            self._frame_interval = self.create_interval("frame", 1/self._framerate)
+            self._frame_interval.start()
         self.emit("start", *args, **kwargs)
     
+    def _on_frame_timestep(self):
+        # ticks and renders are dispatched immediately, so that the time they
+        # take can be measured and renders skipped when falling behind
+        self.timestep.frame(
+            lambda dt: self._dispatch_now("tick", dt),
+            lambda alpha: self._dispatch_now("render", alpha),
+            budget=1/self._framerate)
+
+    def _dispatch_now(self, event_name, *args):
+        if not self._stopping:
+            self.emit(event_name, *args, sync=True)
+
     def _on_stop(self):
+        # the frame interval may have been started after stop() was called
+        if self._frame_interval is not None:
+            self._frame_interval.cancel()
         self.input.stop()
 
         # cleanup terminal state
@@ -130,6 +349,15 @@ class App(Observable):
 
         self._stop_event.set()
 
+    def _on_exit(self):
+        if self._threaded and self._event_queue is not main_event_queue:
+            # don't leave a thread behind for each App that has exited
+            stop_polling(self._event_queue)
+        self._running = False
+        self._exit_event.set()
+        if self._exited is not None and not self._exited.done():
+            self._exited.set_result(None)
+
     def await_stop(self):
         """ Block until the App is stopped. """
         try:
@@ -139,8 +367,15 @@ class App(Observable):
             pass
         finally:
             self.stop()
-            join_event_queue()
-            self._exit_event.wait()
+            if self._threaded and self._event_queue is not main_event_queue:
+                self._exit_event.wait()
+                join_polling(self._event_queue)
+                # dispatch the events put after the daemon stopped, e.g. by
+                # Intervals or submit() callbacks
+                poll_events(self._event_queue)
+            else:
+                join_event_queue(self._event_queue)
+                self._exit_event.wait()
             self._exit_event.clear()
 
     def stop(self):
@@ -150,11 +385,18 @@ class App(Observable):
         # is restored, respectively.
         if not self._stopping:
             self._stopping = True
-            self._frame_interval.cancel()
+            if self._frame_interval is not None:
+                self._frame_interval.cancel()
+            if self._loop is not None:
+                cancel_listener_tasks(self._loop)
+            self.cancel_submitted(shutdown=True)
             self.emit("before_stop")
             self.emit("_stop")
             self.emit("after_stop")
             self.emit("_exit")
+            if not self._threaded and self._loop is None:
+                # restore the terminal before returning
+                poll_events(self._event_queue)
 
 class LegacyApp(App):
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,250 @@
+"""A backend that mirrors one Screen to many terminals.
+
+Rendering a Screen to each viewer separately repeats the same diff and the
+same escape sequence encoding for every viewer. A BroadcastBackend instead
+encodes each update once, and writes the bytes to any number of subscribers:
+file descriptors or sockets, such as PTYs or connections to remote viewers.
+
+Writes never block. Output that a subscriber cannot accept yet is kept in
+a backlog for that subscriber, and written by the next flush() or pump().
+If the backlog of a subscriber grows past backlog_limit, it is discarded and
+the subscriber is sent a keyframe (a complete redraw of the screen) instead.
+Subscribers that join while the screen is already running are also sent a
+keyframe first.
+
+Example:
+```
+mirror_backend = BroadcastBackend(app.screen.w, app.screen.h)
+mirror = Screen(mirror_backend)
+mirror_backend.subscribe(viewer_socket)
+
+@app.on("frame")
+def frame():
+    ...
+    app.screen.blit_to(mirror)
+    mirror.update()
+```
+"""
+
+import os
+import weakref
+from termpixels.unix import UnixBackend
+
+class _Subscriber:
+    __slots__ = ("target", "fd", "backlog", "needs_keyframe")
+
+    def __init__(self, target):
+        # keep a reference to the target, so that e.g. a socket is not closed
+        self.target = target
+        self.fd = target if isinstance(target, int) else target.fileno()
+        self.backlog = bytearray()
+        self.needs_keyframe = True
+
+class Broadcaster:
+    """Sends the output of a backend to many subscribers.
+
+    This is the part of BroadcastBackend that does not depend on how output
+    is encoded, and is also used by termpixels.delta.DeltaBackend. Subclasses
+    must also derive from Observable, write their output to _out_buffer, and
+    implement _create_keyframe_encoder(), _begin_keyframe() and
+    _forget_state(). The size of the
+    terminals is given explicitly, rather than read from a terminal, and can
+    be changed with resize().
+
+    A "disconnect" event is emitted with the target when writing to a
+    subscriber fails (e.g. because it was closed), after it is unsubscribed.
+    """
+
+    def _init_broadcast(self, w, h, backlog_limit):
+        self._broadcast_size = (w, h)
+        self.backlog_limit = backlog_limit
+        self._subscribers = {}
+        self._screen = None
+        # the backend and Screen used to render keyframes, which are kept
+        # rather than set up again for each keyframe
+        self._encoder = None
+        self._keyframe_screen = None
+
+    @property
+    def size(self):
+        return self._broadcast_size
+
+    def update_size(self):
+        self.size_dirty = False
+
+    def resize(self, w, h):
+        """Change the size of the terminals, and redraw them completely at the next flush()."""
+        self._broadcast_size = (w, h)
+        for subscriber in self._subscribers.values():
+            subscriber.needs_keyframe = True
+
+    def attach_screen(self, screen):
+        """Set the Screen which is drawn for keyframes.
+
+        Called by Screen when it is created with this backend.
+        """
+        self._screen = weakref.ref(screen)
+
+    @property
+    def subscribers(self):
+        """Get a list of the subscribed targets."""
+        return [subscriber.target for subscriber in self._subscribers.values()]
+
+    def subscribe(self, target):
+        """Start sending output to a file descriptor or socket.
+
+        The target is made non-blocking. If a Screen is attached, a keyframe is
+        sent right away; otherwise, the target receives a keyframe at the next
+        flush().
+        """
+        subscriber = _Subscriber(target)
+        os.set_blocking(subscriber.fd, False)
+        self._subscribers[subscriber.fd] = subscriber
+        if self._screen is not None and self._screen() is not None:
+            self._send_keyframes(self._render_keyframe())
+
+    def unsubscribe(self, target):
+        """Stop sending output to a target, discarding its backlog."""
+        fd = target if isinstance(target, int) else target.fileno()
+        del self._subscribers[fd]
+
+    def backlog(self, target):
+        """Get the number of bytes waiting to be written to a target."""
+        fd = target if isinstance(target, int) else target.fileno()
+        return len(self._subscribers[fd].backlog)
+
+    def flush(self):
+        """Send the output written since the last flush to every subscriber."""
+        frame = bytes(self._out_buffer)
+        self._out_buffer.clear()
+        keyframe = None
+        if any(subscriber.needs_keyframe for subscriber in self._subscribers.values()):
+            keyframe = self._render_keyframe()
+        for subscriber in tuple(self._subscribers.values()):
+            if subscriber.needs_keyframe:
+                continue
+            subscriber.backlog.extend(frame)
+            self._drain(subscriber)
+        if keyframe is not None:
+            self._send_keyframes(keyframe)
+
+    def pump(self):
+        """Write as much of each subscriber's backlog as possible.
+
+        Returns the number of subscribers that still have a backlog.
+        """
+        waiting = 0
+        for subscriber in tuple(self._subscribers.values()):
+            if subscriber.backlog and self._drain(subscriber):
+                waiting += 1
+        return waiting
+
+    def _send_keyframes(self, keyframe):
+        for subscriber in tuple(self._subscribers.values()):
+            if subscriber.needs_keyframe:
+                subscriber.needs_keyframe = False
+                subscriber.backlog[:] = keyframe
+                self._drain(subscriber)
+
+    def _drain(self, subscriber):
+        """Write the backlog of a subscriber; returns whether some is left."""
+        backlog = subscriber.backlog
+        try:
+            while backlog:
+                written = os.write(subscriber.fd, backlog)
+                del backlog[:written]
+        except BlockingIOError:
+            pass
+        except OSError:
+            del self._subscribers[subscriber.fd]
+            self.emit("disconnect", subscriber.target)
+            return False
+        if len(backlog) > self.backlog_limit:
+            # the subscriber has fallen too far behind; start over
+            backlog.clear()
+            subscriber.needs_keyframe = True
+        return bool(backlog)
+
+    def _render_keyframe(self):
+        """Encode a complete redraw of the attached Screen.
+
+        The keyframe is rendered with a separate encoder, after which this
+        backend forgets its state (such as the cursor position), since it is
+        not the same for all subscribers any more.
+        """
+        screen = self._screen() if self._screen is not None else None
+        if self._encoder is None:
+            self._encoder = self._create_keyframe_encoder()
+        encoder = self._encoder
+        encoder._forget_state()
+        self._begin_keyframe(encoder)
+        if screen is not None:
+            copy = self._keyframe_screen
+            if copy is None or type(copy) is not type(screen):
+                copy = self._keyframe_screen = type(screen)(encoder)
+            elif (copy.w, copy.h) != encoder.size:
+                copy.resize(*encoder.size)
+            else:
+                copy.invalidate()
+            screen.blit_to(copy)
+            copy.cursor_pos = screen.cursor_pos
+            copy.update()
+        # the encoder may have shown or hidden the cursor in an earlier keyframe
+        encoder._show_cursor = None
+        encoder.show_cursor = bool(self._show_cursor)
+        self._finish_keyframe(encoder)
+        self._forget_state()
+        keyframe = bytes(encoder._out_buffer)
+        encoder._out_buffer.clear()
+        return keyframe
+
+    def _finish_keyframe(self, encoder):
+        pass
+
+class BroadcastBackend(Broadcaster, UnixBackend):
+    """A UnixBackend that writes its output to many subscribers.
+
+    The subscribers are expected to be terminals of type term (by default, 
+    the TERM environment variable). See Broadcaster for the rest.
+    """
+
+    def __init__(self, w, h, *, term=None, backlog_limit=1 << 20, queue=None):
+        """
+        w, h - the size of the terminals
+        term - the terminal type of the subscribers
+        backlog_limit - the most bytes to keep for a subscriber that is not
+                        reading its output quickly enough
+        queue - the event queue of the backend
+        """
+        self._init_broadcast(w, h, backlog_limit)
+        UnixBackend.__init__(self, term=term, queue=queue)
+
+    def _open_output(self, stdout, tty):
+        self._fd_out = None
+        self._fd_out_tty = -1
+
+    def _create_keyframe_encoder(self):
+        w, h = self._broadcast_size
+        return _KeyframeEncoder(w, h, term=self.terminal_name, queue=self._event_queue)
+
+    def _begin_keyframe(self, encoder):
+        encoder.resize(*self._broadcast_size)
+        encoder.color_mode = self.color_mode
+        encoder.write_escape("\x1b[0m")
+        encoder.clear_screen()
+
+    def _finish_keyframe(self, encoder):
+        if getattr(self, "_application_keypad", None) is not None:
+            encoder.application_keypad = self._application_keypad
+
+    def _forget_state(self):
+        self._cursor_pos = None
+        self._fg = None
+        self._bg = None
+        self._style = None
+
+class _KeyframeEncoder(BroadcastBackend):
+    """Collects the output for a keyframe, rather than sending it."""
+
+    def flush(self):
+        pass
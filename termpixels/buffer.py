@@ -20,6 +20,7 @@ class Buffer:
         self._w = 0
         self._h = 0
         self._pixels = []
+        self._row_versions = []
         self.resize(w, h)
     
     @property
@@ -38,7 +39,22 @@ class Buffer:
                         for y in range(h)] for x in range(w)]
         self._w = w
         self._h = h
+
+        # track modifications to each row; see row_version()
+        self._row_versions = [[0] for y in range(h)]
+        for column in self._pixels:
+            for y, pixel in enumerate(column):
+                pixel._row_version = self._row_versions[y]
     
+    def row_version(self, y):
+        """Get a counter that changes whenever a pixel in row y is modified.
+
+        Comparing the versions of a row at two points in time is a cheap way 
+        to check whether the row may have been changed in between. Versions
+        are reset when the buffer is resized.
+        """
+        return self._row_versions[y][0]
+
     def in_bounds(self, x, y):
         return x >= 0 and y >= 0 and x < self.w and y < self.h
     
@@ -99,6 +115,98 @@ class Buffer:
                 if char is not None:
                     pixel.char = char
     
+    def hspan(self, x, y, w, char=None, *, fg=None, bg=None):
+        """Draw a horizontal run of a character and/or colors.
+
+        Sets w pixels starting at (x, y) and extending to the right. Like 
+        fill(), attributes that are None are left unchanged, and any part of
+        the run outside of the buffer is ignored. This is much faster than 
+        printing the characters one at a time.
+
+        Characters wider than a single cell are repeated as if by put_char(),
+        so that they cover the run without overlapping.
+        """
+        if not self._single_cell(char):
+            self._put_run(char, x, y, w, 1, 0, fg=fg, bg=bg)
+        else:
+            self._span(x, y, w, 1, 0, char, fg, bg)
+    
+    def vspan(self, x, y, h, char=None, *, fg=None, bg=None):
+        """Draw a vertical run of a character and/or colors.
+
+        Sets h pixels starting at (x, y) and extending downwards. Behaves like 
+        hspan() otherwise.
+        """
+        if not self._single_cell(char):
+            self._put_run(char, x, y, h, 0, 1, fg=fg, bg=bg)
+        else:
+            self._span(x, y, h, 0, 1, char, fg, bg)
+
+    def _span(self, x, y, n, dx, dy, char, fg, bg):
+        """Set the attributes of n single-cell pixels along a row or column."""
+        if dx:
+            if y < 0 or y >= self.h:
+                return
+            cells = ((i, y) for i in range(max(0, x), min(self.w, x + n)))
+        else:
+            if x < 0 or x >= self.w:
+                return
+            cells = ((x, j) for j in range(max(0, y), min(self.h, y + n)))
+        for i, j in cells:
+            pixel = self.at_unsafe(i, j)
+            if ((char is not None and pixel._char != char) 
+                    or (fg is not None and pixel._fg != fg) 
+                    or (bg is not None and pixel._bg != bg)):
+                if char is not None:
+                    pixel._char = char
+                if fg is not None:
+                    pixel._fg = fg
+                if bg is not None:
+                    pixel._bg = bg
+                pixel._changed()
+    
+    def _put_color_row(self, x, y, colors, char, lower=False):
+        """Set a row of pixels starting at (x, y) to a character and colors.
+
+        Used by draw_colormap() and draw_colormap_2x(). colors is a sequence
+        of Colors, or Nones for pixels that are left unchanged. Each color is
+        set as the foreground, or as the background if lower is True, in 
+        which case a pixel that does not already show char keeps its old
+        background as the foreground. No bounds checking is performed.
+        """
+        at_unsafe = self.at_unsafe
+        for px, color in enumerate(colors, x):
+            if color is None:
+                continue
+            pixel = at_unsafe(px, y)
+            if lower:
+                if pixel._char != char:
+                    pixel._char = char
+                    pixel._fg = pixel._bg
+                    pixel._bg = color
+                    pixel._changed()
+                elif pixel._bg != color:
+                    pixel._bg = color
+                    pixel._changed()
+            elif pixel._char != char or pixel._fg != color:
+                pixel._char = char
+                pixel._fg = color
+                pixel._changed()
+
+    def _single_cell(self, char):
+        """Check whether a span of char (or None) can be written one pixel at a time."""
+        if char is None:
+            return True
+        if len(char) != 1:
+            raise Exception("Character must have length 1")
+        return terminal_char_len(char) == 1
+
+    def _put_run(self, char, x, y, n, dx, dy, **kwargs):
+        """Put a character repeatedly along a run of n cells using put_char()."""
+        step = max(1, terminal_char_len(char) or 1)
+        for i in range(0, n, step if dx else 1):
+            self.put_char(char, x + i * dx, y + i * dy, **kwargs)
+    
     def clear(self, *, fg=Color(255,255,255), bg=Color(0,0,0), char=" "):
         """Fill the entire screen buffer with the given attributes.
 
@@ -183,7 +291,7 @@ class Buffer:
                     shadowed.bg = bg
         return ch_len
     
-    def print(self, text, x=None, y=None, *, line_start=None, fg=None, bg=None):
+    def print(self, text, x=None, y=None, *, line_start=None, fg=None, bg=None, **kwargs):
         """Print a string of text starting at a particular location.
 
         Prints a string of one or more lines of text starting at the given
@@ -205,6 +313,9 @@ class Buffer:
         This means that you could, for example, use fill() to set a background 
         and foreground color for the whole screen, and then print text on top 
         using print().
+
+        Any other keyword arguments (such as attrs for a StyleBuffer) are
+        passed on to put_char().
         """
         if x is None:
             x = self.print_pos[0]
@@ -219,7 +330,7 @@ class Buffer:
             y = y0 + linenum
             x = x0 if linenum == 0 else line_start
             for ch in line:
-                ch_len = self.put_char(ch, x, y, fg=fg, bg=bg)
+                ch_len = self.put_char(ch, x, y, fg=fg, bg=bg, **kwargs)
                 x += ch_len
     
         self.print_pos = (x, y)
@@ -0,0 +1,305 @@
+from array import array
+from functools import lru_cache
+from itertools import combinations
+from termpixels.color import Color, _color_distance, _intern_packed
+from termpixels.util import flat_sequence
+
+# number of sub-pixels in each terminal cell (horizontally, vertically)
+_MODES = {
+    "half": (1, 2),
+    "quadrant": (2, 2),
+    "braille": (2, 4),
+}
+
+# braille dot bit for each sub-pixel of a cell, indexed by [sy][sx]
+_BRAILLE_BITS = (
+    (0x01, 0x08),
+    (0x02, 0x10),
+    (0x04, 0x20),
+    (0x40, 0x80),
+)
+# braille pattern for each combination of dots (a space if there are none)
+_BRAILLE_CHARS = tuple(" " if bits == 0 else chr(0x2800 + bits) for bits in range(256))
+
+# quadrant block for each combination of the bits 1 (top left), 2 (top right),
+# 4 (bottom left) and 8 (bottom right)
+_QUADRANT_CHARS = " ▘▝▀▖▌▞▛▗▚▐▜▄▙▟█"
+
+@lru_cache(4096)
+def _quadrant_cell(colors):
+    """Approximate the four sub-pixels of a quadrant cell with two colors.
+
+    colors is a tuple of packed colors (top left, top right, bottom left,
+    bottom right). Returns a tuple (bits, fg, bg), where bits selects the
+    sub-pixels drawn in the foreground color. The pair of colors with the
+    smallest total error is used.
+    """
+    distinct = sorted(set(colors))
+    if len(distinct) == 1:
+        return 0, distinct[0], distinct[0]
+    best = None
+    for fg, bg in combinations(distinct, 2):
+        bits = 0
+        error = 0
+        for i, c in enumerate(colors):
+            fg_error = _color_distance(c, fg)
+            bg_error = _color_distance(c, bg)
+            if fg_error < bg_error:
+                bits |= 1 << i
+                error += fg_error
+            else:
+                error += bg_error
+        if best is None or error < best[0]:
+            best = (error, bits, fg, bg)
+    return best[1:]
+
+def _packed(color):
+    return color if isinstance(color, int) else color.packed
+
+class Canvas:
+    """A bitmap drawn using several sub-pixels per terminal cell.
+
+    The mode determines how each cell is divided:
+        "half" - 1x2 sub-pixels of any color, using the upper half block
+        "quadrant" - 2x2 sub-pixels, using quadrant blocks; since a cell can
+                     only show two colors, the best two are chosen
+        "braille" - 2x4 dots, using braille patterns; each dot is either on
+                    or off, and all the dots of a cell share the color that
+                    was drawn most recently
+
+    Coordinates given to set(), fill(), etc. are in sub-pixels; w and h give
+    the size in sub-pixels, while cols and rows give the size in cells.
+    Colors may be Colors or packed integers in the format 0xRRGGBB.
+
+    The canvas is drawn to a Buffer with blit_to() (or the blit() method of
+    the Buffer). Only cells which have changed since they were last drawn are
+    converted to characters again.
+    """
+
+    def __init__(self, cols, rows, *, mode="braille", fg=Color(255, 255, 255), bg=Color(0, 0, 0)):
+        if mode not in _MODES:
+            raise ValueError("Unknown canvas mode: {}".format(mode))
+        self._mode = mode
+        self._cell_w, self._cell_h = _MODES[mode]
+        self._fg = _packed(fg)
+        self._bg = _packed(bg)
+        self.resize(cols, rows)
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @property
+    def cols(self):
+        """Get the width of the canvas in terminal cells."""
+        return self._cols
+
+    @property
+    def rows(self):
+        """Get the height of the canvas in terminal cells."""
+        return self._rows
+
+    @property
+    def w(self):
+        """Get the width of the canvas in sub-pixels."""
+        return self._w
+
+    @property
+    def h(self):
+        """Get the height of the canvas in sub-pixels."""
+        return self._h
+
+    def resize(self, cols, rows):
+        """Resize the canvas to the given number of cells, clearing it."""
+        self._cols = cols
+        self._rows = rows
+        self._w = cols * self._cell_w
+        self._h = rows * self._cell_h
+        self._cells = [None] * (cols * rows)
+        self.clear()
+
+    def in_bounds(self, x, y):
+        return x >= 0 and y >= 0 and x < self._w and y < self._h
+
+    def clear(self, *, bg=None):
+        """Turn off every sub-pixel, optionally changing the background color."""
+        if bg is not None:
+            self._bg = _packed(bg)
+        n = self._cols * self._rows
+        if self._mode == "braille":
+            self._bits = bytearray(n)
+            self._colors = array("I", [self._fg]) * n
+        else:
+            self._colors = array("I", [self._bg]) * (self._w * self._h)
+        self._dirty = bytearray(b"\x01") * n
+
+    def set(self, x, y, color=None):
+        """Turn on a sub-pixel with the given color (or the default fg).
+
+        Sub-pixels outside of the canvas are ignored.
+        """
+        self.fill(x, y, 1, 1, color=color)
+
+    def unset(self, x, y):
+        """Turn off a sub-pixel."""
+        self.fill(x, y, 1, 1, on=False)
+
+    def get(self, x, y):
+        """Get the color of a sub-pixel, or None if it is off."""
+        if not self.in_bounds(x, y):
+            raise Exception("position {} out of bounds".format((x, y)))
+        cx, sx = divmod(x, self._cell_w)
+        cy, sy = divmod(y, self._cell_h)
+        if self._mode == "braille":
+            cell = cy * self._cols + cx
+            if not self._bits[cell] & _BRAILLE_BITS[sy][sx]:
+                return None
+            return Color.from_packed(self._colors[cell])
+        color = self._colors[y * self._w + x]
+        if color == self._bg:
+            return None
+        return Color.from_packed(color)
+
+    def fill(self, x, y, w, h, *, color=None, on=True):
+        """Turn on (or off) a rectangle of sub-pixels.
+
+        Any part of the rectangle that lies outside of the canvas is ignored.
+        """
+        x0, x1 = max(0, x), min(self._w, x + w)
+        y0, y1 = max(0, y), min(self._h, y + h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        cell_w = self._cell_w
+        cell_h = self._cell_h
+        cols = self._cols
+        cx0 = x0 // cell_w
+        cx1 = (x1 - 1) // cell_w + 1
+        packed = self._bg if not on else self._fg if color is None else _packed(color)
+
+        if self._mode == "braille":
+            for y in range(y0, y1):
+                cy, sy = divmod(y, cell_h)
+                row = cy * cols
+                bits = _BRAILLE_BITS[sy]
+                for cx in range(cx0, cx1):
+                    mask = 0
+                    for sx in range(cell_w):
+                        if x0 <= cx * cell_w + sx < x1:
+                            mask |= bits[sx]
+                    cell = row + cx
+                    if on:
+                        self._bits[cell] |= mask
+                        self._colors[cell] = packed
+                    else:
+                        self._bits[cell] &= ~mask
+                self._dirty[row + cx0:row + cx1] = b"\x01" * (cx1 - cx0)
+        else:
+            span = array("I", [packed]) * (x1 - x0)
+            for y in range(y0, y1):
+                row = y * self._w
+                self._colors[row + x0:row + x1] = span
+                cells = (y // cell_h) * cols
+                self._dirty[cells + cx0:cells + cx1] = b"\x01" * (cx1 - cx0)
+
+    def draw_colormap(self, colormap, x, y, *, w, h):
+        """Draw a color bitmap, with one sub-pixel per color.
+
+        colormap is a one-dimensional sequence of colors in any of the forms 
+        accepted by termpixels.drawing.draw_colormap(), including Nones or 
+        negative integers for transparent sub-pixels. (x, y) is the position
+        of its top-left corner in sub-pixels.
+
+        In braille mode, each sub-pixel that is drawn is turned on.
+        """
+        colormap = flat_sequence(colormap)
+        dx0, dx1 = max(0, -x), max(0, min(w, self._w - x))
+        dy0, dy1 = max(0, -y), max(0, min(h, self._h - y))
+        if dx0 >= dx1:
+            return
+        cell_w = self._cell_w
+        cx0 = (x + dx0) // cell_w
+        cx1 = (x + dx1 - 1) // cell_w + 1
+        for dy in range(dy0, dy1):
+            row = colormap[dy * w + dx0:dy * w + dx1]
+            py = y + dy
+            if self._mode != "braille" and isinstance(row, memoryview) and min(row) >= 0:
+                # copy a row of packed colors directly
+                start = py * self._w + x + dx0
+                self._colors[start:start + len(row)] = array("I", row)
+                cells = (py // self._cell_h) * self._cols
+                self._dirty[cells + cx0:cells + cx1] = b"\x01" * (cx1 - cx0)
+                continue
+            # fill each run of a single color
+            run_start = 0
+            run_color = None
+            for px, color in enumerate(row, x + dx0):
+                if color is not None and color.__class__ is not int:
+                    color = color.packed
+                elif color is not None and color < 0:
+                    color = None
+                if color != run_color:
+                    if run_color is not None:
+                        self.fill(run_start, py, px - run_start, 1, color=run_color)
+                    run_start = px
+                    run_color = color
+            if run_color is not None:
+                self.fill(run_start, py, x + dx1 - run_start, 1, color=run_color)
+
+    def blit_to(self, buffer, x=0, y=0, x0=0, y0=0, x1=None, y1=None):
+        """ draw the canvas to a buffer
+
+        Draw a sub-region of the canvas by specifying two corners (x0, y0) and
+        (x1, y1) in cells, where all coordinates are inclusive.
+        """
+        self._rasterize()
+        if x1 is None:
+            x1 = self._cols - 1
+        if y1 is None:
+            y1 = self._rows - 1
+        x0, x1 = (min(x0, x1), max(x0, x1))
+        y0, y1 = (min(y0, y1), max(y0, y1))
+        for cy in range(max(0, y0), min(self._rows, y1 + 1)):
+            dst_y = y + cy - y0
+            row = cy * self._cols
+            for cx in range(max(0, x0), min(self._cols, x1 + 1)):
+                dst_x = x + cx - x0
+                if not buffer.in_bounds(dst_x, dst_y):
+                    continue
+                char, fg, bg = self._cells[row + cx]
+                pixel = buffer.at_unsafe(dst_x, dst_y)
+                pixel.char = char
+                pixel.fg = fg
+                pixel.bg = bg
+
+    def _rasterize(self):
+        """Convert the sub-pixels of each changed cell into a character and colors."""
+        dirty = self._dirty
+        cell = dirty.find(1)
+        if cell == -1:
+            return
+        while cell != -1:
+            self._cells[cell] = self._render_cell(cell)
+            cell = dirty.find(1, cell + 1)
+        dirty[:] = bytes(len(dirty))
+
+    def _render_cell(self, cell):
+        # the colors are stored packed, so they need no masking
+        from_packed = _intern_packed
+        bg = from_packed(self._bg)
+        if self._mode == "braille":
+            bits = self._bits[cell]
+            return _BRAILLE_CHARS[bits], from_packed(self._colors[cell]), bg
+
+        cy, cx = divmod(cell, self._cols)
+        top = cy * self._cell_h * self._w + cx * self._cell_w
+        colors = self._colors
+        if self._mode == "half":
+            upper = colors[top]
+            lower = colors[top + self._w]
+            if upper == lower:
+                return " ", from_packed(upper), from_packed(upper)
+            return "▀", from_packed(upper), from_packed(lower)
+
+        bottom = top + self._w
+        bits, fg, bg = _quadrant_cell((colors[top], colors[top + 1], colors[bottom], colors[bottom + 1]))
+        return _QUADRANT_CHARS[bits], from_packed(fg), from_packed(bg)
@@ -1,5 +1,15 @@
 import colorsys
+import operator
 from functools import lru_cache
+from numbers import Integral
+
+def _clip(c):
+    if c.__class__ is int and 0 <= c <= 255:
+        return c
+    return max(0, min(255, round(c)))
+
+def _pack_clipped(r, g, b):
+    return (_clip(r) << 16) | (_clip(g) << 8) | _clip(b)
 
 class Color:
     """Represents an immutable 24-bit RGB color
@@ -10,6 +20,8 @@ class Color:
     support for various formats and are memoized for efficiency.
     """
 
+    __slots__ = ("_r", "_g", "_b", "_packed")
+
     def __init__(self, *args):
         """Construct a Color from one of several formats:
         
@@ -18,38 +30,37 @@ class Color:
         Color(RGB) - one integer in the format 0xRRGGBB
         Color((r,g,b)) - an iterable of three floats in the range [0,1]
         """
-        r = 0
-        g = 0
-        b = 0
-
         if len(args) == 3:
             r, g, b = args
+            r = _clip(r)
+            g = _clip(g)
+            b = _clip(b)
         elif len(args) == 1:
-            if isinstance(args[0], Color):
-                r = args[0].r
-                g = args[0].g
-                b = args[0].b 
+            arg = args[0]
+            if isinstance(arg, Color):
+                r = arg._r
+                g = arg._g
+                b = arg._b
+            elif isinstance(arg, Integral):
+                # also accept integer types such as numpy's
+                arg = operator.index(arg)
+                r = _clip(arg >> 16)
+                g = (arg >> 8) & 0xFF
+                b = arg & 0xFF
             else:
                 try:
-                    c = Color.unpack(args[0])
-                    r = c.r
-                    g = c.g
-                    b = c.b
-                except:
-                    try:
-                        r = args[0][0] * 255
-                        g = args[0][1] * 255
-                        b = args[0][2] * 255
-                    except:
-                        raise Exception("Invalid single argument constructor for Color: {}".format(args[0]))
+                    r = _clip(arg[0] * 255)
+                    g = _clip(arg[1] * 255)
+                    b = _clip(arg[2] * 255)
+                except (TypeError, IndexError, KeyError):
+                    raise Exception("Invalid single argument constructor for Color: {}".format(arg))
         else:
             raise Exception("Invalid constructor for Color: {}".format(args))
 
-        clip = lambda c: max(0, min(255, round(c)))
-        self._r = clip(r)
-        self._g = clip(g)
-        self._b = clip(b)
-        self._packed = Color.pack(self)
+        self._r = r
+        self._g = g
+        self._b = b
+        self._packed = (r << 16) | (g << 8) | b
     
     @property
     def r(self):
@@ -66,45 +77,41 @@ class Color:
         """The blue component as an integer in the range [0,255]"""
         return self._b
 
+    @property
+    def packed(self):
+        """The color as an integer in the format 0xRRGGBB"""
+        return self._packed
+
     def __eq__(self, other):
-        try:
+        if isinstance(other, Color):
             return self._packed == other._packed
-        except AttributeError:
-            return False
+        return False
 
     def __hash__(self):
         return self._packed
         
     def __add__(self, other):
-        try:
-            return Color(self.r + other.r, self.g + other.g, self.b + other.b)
-        except:
-            pass
-        return Color(self.r + other, self.g + other, self.b + other)
+        if isinstance(other, Color):
+            return Color.from_packed(add_packed(self._packed, other._packed))
+        return Color.from_packed(_pack_clipped(self._r + other, self._g + other, self._b + other))
 
     def __radd__(self, other):
         return self + other
 
     def __sub__(self, other):
-        try:
-            return Color(self.r - other.r, self.g - other.g, self.b - other.b)
-        except:
-            pass
-        return Color(self.r - other, self.g - other, self.b - other)
+        if isinstance(other, Color):
+            return Color.from_packed(sub_packed(self._packed, other._packed))
+        return Color.from_packed(_pack_clipped(self._r - other, self._g - other, self._b - other))
 
     def __rsub__(self, other):
-        try:
-            return Color(other.r - self.r, other.g - self.g, other.b - self.b)
-        except:
-            pass
-        return Color(other - self.r, other - self.g, other - self.b)
+        if isinstance(other, Color):
+            return other - self
+        return Color.from_packed(_pack_clipped(other - self._r, other - self._g, other - self._b))
 
     def __mul__(self, other):
-        try:
-            return Color(self.r * other.r, self.g * other.g, self.b * other.b)
-        except:
-            pass
-        return Color(self.r * other, self.g * other, self.b * other)
+        if isinstance(other, Color):
+            return Color.from_packed(mul_packed(self._packed, other._packed))
+        return Color.from_packed(scale_packed(self._packed, other))
 
     def __rmul__(self, other):
         return self * other
@@ -118,19 +125,30 @@ class Color:
     @staticmethod  
     def pack(col):
         """Produce a "packed" color in the format 0xRRGGBB"""
-        return (col.r << 16) | (col.g << 8) | (col.b)
+        return col._packed
     
     @staticmethod
     def unpack(val):
         """Unpack an integer in the format 0xRRGGBB into a Color instance"""
+        if 0 <= val <= 0xFFFFFF:
+            return Color.from_packed(val)
         return Color(val >> 16, (val >> 8) & 0xFF, val & 0xFF)
 
     @staticmethod
-    @lru_cache(2048) # big cache here as it is more likely that we see repeated
-                     # inputs since they are only 8 bits each.
+    def from_packed(packed):
+        """Get the shared Color for an integer in the format 0xRRGGBB
+        
+        This is the cheapest way to construct a Color. Colors are interned, so
+        the same packed value always produces the same instance (as long as it
+        remains in the cache). Bits above the lowest 24 are ignored.
+        """
+        # mask first, so that e.g. -1 and 0xFFFFFF share an instance
+        return _intern_packed(packed & 0xFFFFFF)
+
+    @staticmethod
     def rgb_int(r, g, b):
         """Construct a Color from RGB values in the range [0,255]"""
-        return Color(r, g, b)
+        return Color.from_packed(_pack_clipped(r, g, b))
 
     @staticmethod
     @lru_cache(32) # memoizing float params is only useful if user is e.g. 
@@ -146,38 +164,173 @@ class Color:
         """Construct a Color from HSL values in the range [0,1]"""
         return Color.rgb(*colorsys.hls_to_rgb(h, l, s))
 
+@lru_cache(65536) # big enough to hold every distinct color in a frame
+def _intern_packed(packed):
+    col = Color.__new__(Color)
+    col._r = packed >> 16
+    col._g = (packed >> 8) & 0xFF
+    col._b = packed & 0xFF
+    col._packed = packed
+    return col
+
+# Arithmetic on packed 0xRRGGBB integers. These saturate each channel in the
+# same way as the Color operators, but do not construct any Colors, which makes
+# them suitable for per-pixel work on large colormaps.
+_HIGH_BITS = 0x808080
+_LOW_BITS = 0x7F7F7F
+
+def add_packed(a, b):
+    """Add two packed colors, saturating each channel at 255"""
+    # add the low 7 bits of each channel, then the high bits without carrying
+    s = ((a & _LOW_BITS) + (b & _LOW_BITS)) ^ ((a ^ b) & _HIGH_BITS)
+    carry = ((a & b) | ((a | b) & ~s)) & _HIGH_BITS
+    return (s | ((carry >> 7) * 0xFF)) & 0xFFFFFF
+
+def sub_packed(a, b):
+    """Subtract packed color b from a, saturating each channel at 0"""
+    # borrow from the high bit of each channel so that channels are independent
+    d = ((a | _HIGH_BITS) - (b & _LOW_BITS)) ^ ((a ^ ~b) & _HIGH_BITS)
+    borrow = ((~a & b) | (~(a ^ b) & d)) & _HIGH_BITS
+    return d & ~((borrow >> 7) * 0xFF) & 0xFFFFFF
+
+def mul_packed(a, b):
+    """Multiply two packed colors channel-wise, saturating each channel at 255"""
+    r = (a >> 16) * (b >> 16)
+    g = ((a >> 8) & 0xFF) * ((b >> 8) & 0xFF)
+    b = (a & 0xFF) * (b & 0xFF)
+    return (min(r, 255) << 16) | (min(g, 255) << 8) | min(b, 255)
+
+def scale_packed(a, factor):
+    """Multiply each channel of a packed color by a scalar, clipping to [0,255]"""
+    return _pack_clipped((a >> 16) * factor, ((a >> 8) & 0xFF) * factor, (a & 0xFF) * factor)
+
+def lerp_packed(a, b, t):
+    """Linearly interpolate between two packed colors, with t in the range [0,1]"""
+    if t <= 0:
+        return a
+    if t >= 1:
+        return b
+    ar = a >> 16
+    ag = (a >> 8) & 0xFF
+    ab = a & 0xFF
+    return ((round(ar + ((b >> 16) - ar) * t) << 16)
+        | (round(ag + (((b >> 8) & 0xFF) - ag) * t) << 8)
+        | round(ab + ((b & 0xFF) - ab) * t))
+
+
+# The default xterm values of the 16 named colors. Since most terminals allow
+# these to be changed by the user, they are only an approximation.
+PALETTE_16 = (
+    0x000000, 0xcd0000, 0x00cd00, 0xcdcd00, 0x0000ee, 0xcd00cd, 0x00cdcd, 0xe5e5e5,
+    0x7f7f7f, 0xff0000, 0x00ff00, 0xffff00, 0x5c5cff, 0xff00ff, 0x00ffff, 0xffffff,
+)
+
+_PALETTE_16_INDEX = {packed: i for i, packed in enumerate(PALETTE_16)}
+
+# channel values of the 6x6x6 color cube in the 256-color palette
+_CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+
+# The 256-color palette: the 16 named colors, the 6x6x6 color cube, and a 
+# grayscale ramp of 24 colors.
+PALETTE_256 = PALETTE_16 + tuple(
+    (r << 16) | (g << 8) | b
+    for r in _CUBE_LEVELS for g in _CUBE_LEVELS for b in _CUBE_LEVELS
+) + tuple(0x010101 * (8 + 10 * i) for i in range(24))
+
+def _color_distance(a, b):
+    """Estimate the perceptual distance between two packed colors.
+
+    Uses the "redmean" approximation, which weights the channels according to
+    the amount of red in the colors.
+    """
+    ar = a >> 16
+    br = b >> 16
+    rmean = (ar + br) >> 1
+    dr = ar - br
+    dg = ((a >> 8) & 0xFF) - ((b >> 8) & 0xFF)
+    db = (a & 0xFF) - (b & 0xFF)
+    return (((512 + rmean) * dr * dr) >> 8) + 4 * dg * dg + (((767 - rmean) * db * db) >> 8)
+
+def _nearest_levels(c):
+    """Get the indices of the cube levels on either side of a channel value."""
+    if c < 95:
+        return (0, 1)
+    i = (c - 95) // 40 + 1
+    return (i, i + 1) if i < 5 else (5,)
+
+@lru_cache(16384)
+def _quantize_256(packed):
+    r = packed >> 16
+    g = (packed >> 8) & 0xFF
+    b = packed & 0xFF
+
+    # rather than searching the entire palette, only consider the nearest
+    # colors in the cube, the nearest grays, and the named colors.
+    candidates = list(range(16))
+    for ri in _nearest_levels(r):
+        for gi in _nearest_levels(g):
+            for bi in _nearest_levels(b):
+                candidates.append(16 + ri * 36 + gi * 6 + bi)
+    gray = min(23, max(0, ((r + g + b) // 3 - 3) // 10))
+    candidates.extend(range(232 + max(0, gray - 1), 232 + min(24, gray + 2)))
+
+    # prefer indices above 15 when there is a tie, since they are less likely
+    # to have been changed by the user.
+    return min(candidates, key=lambda i: (_color_distance(packed, PALETTE_256[i]), i < 16))
+
+@lru_cache(4096)
+def _quantize_16(packed):
+    # the named colors themselves, such as those chosen by dithering
+    index = _PALETTE_16_INDEX.get(packed)
+    if index is not None:
+        return index
+    r = packed >> 16
+    g = (packed >> 8) & 0xFF
+    b = packed & 0xFF
+    if r == g == b == 0:
+        return 0
+    bright = r + g + b >= 127 * 3
+    bits = (1 if r > 63 else 0) | (2 if g > 63 else 0) | (4 if b > 63 else 0)
+    return bits + (8 if bright else 0)
 
 def color_to_16(color):
     """Convert color into ANSI 16-color format.
     """
-    if color.r == color.g == color.b == 0:
-        return 0
-    bright = sum((color.r, color.g, color.b)) >= 127 * 3
-    r = 1 if color.r > 63 else 0
-    g = 1 if color.g > 63 else 0
-    b = 1 if color.b > 63 else 0
-    return (r | (g << 1) | (b << 2)) + (8 if bright else 0)
+    return _quantize_16(color._packed)
 
 def color_to_256(color):
     """Convert color into ANSI 8-bit color format.
-    Red is converted to 196
-    This converter emits the 216 RGB colors and the 24 grayscale colors.
-    It does not use the 16 named colors.
+    
+    Finds the nearest color in the palette, using a perceptual estimate of the
+    distance between colors. The 16 named colors are only used if they are a 
+    strictly better match than the rest of the palette. Results are cached.
     """
-    output = 0
-    if color.r == color.g == color.b:
-        # grayscale case
-        if color.r == 0: # pure black
-            output = 16
-        elif color.r == 255: # pure white
-            output = 231
-        else:
-            output = 232 + int(color.r / 256 * 24)
-    else:
-        # 216-color RGB
-        scale = lambda c: int(c / 256 * 6)
-        output = 16
-        output += scale(color.b)
-        output += scale(color.g) * 6
-        output += scale(color.r) * 6 * 6
-    return output
\ No newline at end of file
+    return _quantize_256(color._packed)
+
+def colors_to_16(colors):
+    """Convert many colors into ANSI 16-color format at once.
+
+    colors is an iterable of Colors or packed integers in the format 0xRRGGBB.
+    Returns bytes containing the index of each color.
+    """
+    return _quantize_many(colors, _quantize_16)
+
+def colors_to_256(colors):
+    """Convert many colors into ANSI 8-bit color format at once.
+
+    colors is an iterable of Colors or packed integers in the format 0xRRGGBB.
+    Returns bytes containing the index of each color.
+    """
+    return _quantize_many(colors, _quantize_256)
+
+def _quantize_many(colors, quantize):
+    # colormaps tend to repeat colors, so avoid even the cost of the lru_cache
+    seen = {}
+    result = bytearray()
+    for color in colors:
+        packed = operator.index(color) if isinstance(color, Integral) else color._packed
+        index = seen.get(packed)
+        if index is None:
+            index = seen[packed] = quantize(packed)
+        result.append(index)
+    return bytes(result)
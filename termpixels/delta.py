@@ -0,0 +1,575 @@
+"""A compact binary format for sending Screen updates to remote viewers.
+
+A BroadcastBackend sends escape sequences for one particular type of
+terminal. A DeltaBackend instead encodes the changes that a Screen renders
+in a small binary format that does not depend on the terminal, and sends it
+to any number of subscribers, like a BroadcastBackend (see
+termpixels.broadcast). A DeltaClient decodes the stream and renders it with
+a UnixBackend of its own, using the capabilities and color mode of the local
+terminal.
+
+Format
+------
+The stream is a sequence of operations. Each operation is an opcode byte
+followed by its arguments. Integers are unsigned LEB128 varints (7 bits per
+byte, least significant first, high bit set on all but the last byte), and
+signed integers are zigzag encoded first (0, -1, 1, -2, ... become 0, 1, 2,
+3, ...). Colors are 3 bytes: red, green and blue.
+
+END (0)
+    The end of a frame. The client renders the frame.
+KEYFRAME (1) version w h
+    Starts a complete redraw. The client forgets its style table and sets
+    its frame to w by h blank cells. version is DELTA_VERSION.
+STYLE_DEF (2) id fg bg attrs
+    Defines style id, with colors fg and bg and attributes attrs (see
+    termpixels.style). IDs are small integers, defined in any order. An ID
+    may be redefined, with the same or another style, which does not change
+    the cells already written.
+STYLE (3) id
+    Selects the style used by TEXT, RUN, CLEAR and SCROLL. The style must
+    have been defined since the last keyframe.
+MOVE (4) x y
+    Moves the cursor.
+TEXT (5) n bytes
+    Writes n bytes of UTF-8 text at the cursor, in the current style. The
+    cursor advances by the width of the text in cells.
+RUN (6) n codepoint
+    Writes a single-width character n times, in the current style. The
+    cursor advances by n cells.
+CLEAR (7)
+    Fills the frame with spaces in the current style, and moves the cursor
+    to the top left corner.
+SCROLL (8) top bottom n
+    Scrolls the rows from top to bottom (inclusive) up by n rows, where n is
+    signed; negative values scroll down. Exposed rows are filled with spaces
+    in the current style. The cursor position is undefined afterwards.
+CURSOR (9) visible
+    Shows (1) or hides (0) the cursor.
+
+Subscribers are sent a keyframe when they subscribe, and whenever they fall
+too far behind, so a client can start decoding at any keyframe. A keyframe
+only defines the styles it uses, and a DeltaBackend uses a limited number of
+IDs, reusing the ID of the least recently used style once they run out, so
+that the style tables of clients stay small however many styles are used.
+
+Example:
+```
+# on the server
+mirror = StyleScreen(DeltaBackend(app.screen.w, app.screen.h))
+mirror.backend.subscribe(viewer_socket)
+...
+app.screen.blit_to(mirror)
+mirror.update()
+
+# on the viewer
+DeltaClient().run(server_socket)
+```
+"""
+
+import os
+from array import array
+from collections import OrderedDict
+from termpixels.broadcast import Broadcaster
+from termpixels.color import Color
+from termpixels.observable import Observable
+from termpixels.screen import StyleScreen
+from termpixels.style import StyleTable
+from termpixels.stylebuffer import StyleBuffer
+from termpixels.util import terminal_char_len, terminal_len
+
+DELTA_VERSION = 1
+
+END = 0
+KEYFRAME = 1
+STYLE_DEF = 2
+STYLE = 3
+MOVE = 4
+TEXT = 5
+RUN = 6
+CLEAR = 7
+SCROLL = 8
+CURSOR = 9
+
+def write_varint(out, value):
+    """Append an unsigned varint to a bytearray."""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, pos):
+    """Read an unsigned varint from data at pos.
+
+    Returns the value and the position after it. Raises IndexError if data
+    ends before the varint does.
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def zigzag(n):
+    """Map a signed integer to an unsigned one."""
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+def unzigzag(n):
+    """Inverse of zigzag()."""
+    return n >> 1 if n & 1 == 0 else -(n >> 1) - 1
+
+class DeltaBackend(Broadcaster, Observable):
+    """A backend that sends the delta format to many subscribers.
+
+    Use it with a Screen or (preferably) a StyleScreen, and subscribe file
+    descriptors or sockets to it; see Broadcaster for the methods to manage
+    subscribers.
+    """
+
+    def __init__(self, w, h, *, backlog_limit=1 << 20, style_limit=1024, queue=None):
+        """
+        w, h - the size of the screen
+        backlog_limit - the most bytes to keep for a subscriber that is not
+                        reading its output quickly enough
+        style_limit - the most style IDs to use in the stream
+        queue - the event queue of the backend
+        """
+        Observable.__init__(self, queue)
+        self._init_broadcast(w, h, backlog_limit)
+        self.size_dirty = False
+        self._styles = _StreamStyles(style_limit)
+        # the style that each ID has been defined as for every subscriber
+        self._defined = {}
+        # the ID and style selected in the stream
+        self._selected = None
+        self._fg = Color(255, 255, 255)
+        self._bg = Color(0, 0, 0)
+        self._attrs = 0
+        self._cursor_pos = None
+        self._show_cursor = None
+        self._out_buffer = bytearray()
+        # text written since the last operation, which is sent as one TEXT
+        self._text = []
+
+    def _op(self, opcode):
+        """Start an operation, first sending any text written before it."""
+        out = self._out_buffer
+        if self._text:
+            data = "".join(self._text).encode("utf-8")
+            self._text.clear()
+            out.append(TEXT)
+            write_varint(out, len(data))
+            out.extend(data)
+        out.append(opcode)
+        return out
+
+    @property
+    def cursor_pos(self):
+        return self._cursor_pos
+
+    @cursor_pos.setter
+    def cursor_pos(self, pos):
+        if self._cursor_pos != pos:
+            out = self._op(MOVE)
+            write_varint(out, pos[0])
+            write_varint(out, pos[1])
+            self._cursor_pos = pos
+
+    @property
+    def show_cursor(self):
+        return self._show_cursor
+
+    @show_cursor.setter
+    def show_cursor(self, show_cursor):
+        if self._show_cursor != show_cursor:
+            self._op(CURSOR).append(1 if show_cursor else 0)
+            self._show_cursor = show_cursor
+
+    @property
+    def fg(self):
+        return self._fg
+
+    @fg.setter
+    def fg(self, color):
+        self._fg = color
+
+    @property
+    def bg(self):
+        return self._bg
+
+    @bg.setter
+    def bg(self, color):
+        self._bg = color
+
+    def set_style(self, style):
+        """Set the colors and text attributes used for writing from a Style."""
+        self._fg = style.fg
+        self._bg = style.bg
+        self._attrs = style.attrs
+
+    def _select_style(self):
+        """Select the current style in the stream, defining it if necessary."""
+        style = (self._fg, self._bg, self._attrs)
+        selected = self._selected
+        if selected is not None and selected[1] == style:
+            return
+        style_id = self._styles.intern(style)
+        if self._defined.get(style_id) != style:
+            self._define_style(style_id, style)
+        write_varint(self._op(STYLE), style_id)
+        self._selected = (style_id, style)
+
+    def _define_style(self, style_id, style):
+        fg, bg, attrs = style
+        out = self._op(STYLE_DEF)
+        write_varint(out, style_id)
+        out.extend(fg.packed.to_bytes(3, "big"))
+        out.extend(bg.packed.to_bytes(3, "big"))
+        write_varint(out, attrs)
+        self._defined[style_id] = style
+
+    def _advance(self, n):
+        if self._cursor_pos is not None:
+            self._cursor_pos = (self._cursor_pos[0] + n, self._cursor_pos[1])
+
+    def write(self, text):
+        self._select_style()
+        self._text.append(text)
+        self._advance(terminal_len(text))
+
+    def _run(self, char, n):
+        self._select_style()
+        out = self._op(RUN)
+        write_varint(out, n)
+        write_varint(out, ord(char))
+        self._advance(n)
+
+    @property
+    def can_erase(self):
+        return True
+
+    @property
+    def can_repeat(self):
+        return True
+
+    def erase_line(self):
+        """Erase from the cursor to the end of the line."""
+        self._run(" ", self.size[0] - self._cursor_pos[0])
+
+    def erase_chars(self, n):
+        """Erase n characters starting at the cursor."""
+        self._run(" ", n)
+
+    def repeat(self, char, n):
+        """Write a single-width character n times."""
+        self._run(char, n)
+
+    def clear_screen(self):
+        self._select_style()
+        self._op(CLEAR)
+        self._cursor_pos = (0, 0)
+
+    def scroll(self, top, bottom, n):
+        """Scroll the rows from top to bottom (inclusive) up by n rows."""
+        if n == 0:
+            return True
+        self._select_style()
+        out = self._op(SCROLL)
+        write_varint(out, top)
+        write_varint(out, bottom)
+        write_varint(out, zigzag(n))
+        self._cursor_pos = None
+        return True
+
+    def flush(self):
+        """Send the operations since the last flush as a frame."""
+        self._op(END)
+        Broadcaster.flush(self)
+
+    def _create_keyframe_encoder(self):
+        w, h = self._broadcast_size
+        encoder = _DeltaKeyframeEncoder(w, h, queue=self._event_queue)
+        # the IDs are shared, so that those the keyframe defines stay valid
+        encoder._styles = self._styles
+        return encoder
+
+    def _begin_keyframe(self, encoder):
+        w, h = self._broadcast_size
+        encoder.resize(w, h)
+        out = encoder._op(KEYFRAME)
+        write_varint(out, DELTA_VERSION)
+        write_varint(out, w)
+        write_varint(out, h)
+        # a keyframe defines only the styles it uses
+        encoder._defined.clear()
+
+    def _finish_keyframe(self, encoder):
+        encoder._op(END)
+        # subscribers that were sent the keyframe only know the styles it
+        # defined, and the others do not know the styles it added
+        defined = encoder._defined
+        self._defined = {style_id: style for style_id, style in self._defined.items()
+                         if defined.get(style_id) == style}
+
+    def _forget_state(self):
+        self._cursor_pos = None
+        self._selected = None
+
+class _StreamStyles:
+    """Assigns IDs to the styles used in a delta stream.
+
+    At most limit IDs are used; once they all are, the ID of the least
+    recently used style is given to the next new style.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._ids = OrderedDict()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def intern(self, style):
+        """Get the ID of a (fg, bg, attrs) tuple."""
+        ids = self._ids
+        style_id = ids.get(style)
+        if style_id is not None:
+            ids.move_to_end(style)
+            return style_id
+        if len(ids) < self.limit:
+            style_id = len(ids)
+        else:
+            _, style_id = ids.popitem(last=False)
+        ids[style] = style_id
+        return style_id
+
+class _DeltaKeyframeEncoder(DeltaBackend):
+    """Collects the operations for a keyframe, rather than sending them."""
+
+    def flush(self):
+        pass
+
+class DeltaDecoder:
+    """Applies a delta stream to a StyleBuffer.
+
+    Data may be fed in chunks of any size; incomplete operations are kept
+    until the rest of them arrives. The stream must start with a keyframe,
+    as it does for every subscriber of a DeltaBackend. If feed() raises
+    ValueError, the invalid data is discarded, so later data can still be fed.
+    """
+
+    def __init__(self, *, styles=None):
+        """
+        styles - the StyleTable of the frame buffer, for example the styles
+                 of the StyleScreen that the frames are blitted to
+        """
+        self.styles = StyleTable() if styles is None else styles
+        self.frame = None
+        self.cursor_pos = (0, 0)
+        self.show_cursor = True
+        self.keyframes = 0
+        self._data = bytearray()
+        # the local style ID of each ID in the stream
+        self._style_ids = {}
+        self._style = None
+        self.styles.attach(self)
+
+    def _style_refs(self):
+        """Get the local style IDs in use; see StyleTable.attach()."""
+        return [self._style_ids.values(), () if self._style is None else (self._style,)]
+
+    def feed(self, data):
+        """Decode some data, and return the number of frames completed."""
+        self._data.extend(data)
+        data = self._data
+        frames = 0
+        pos = 0
+        try:
+            while pos < len(data):
+                start = pos
+                pos = self._decode(data, pos)
+                if data[start] == END:
+                    frames += 1
+        except IndexError:
+            # the operation at start is incomplete
+            pos = start
+        except ValueError:
+            # the length of an invalid operation is not known, so drop the
+            # rest of the data too rather than decode it out of step
+            pos = len(data)
+            raise
+        finally:
+            del data[:pos]
+        return frames
+
+    def _decode(self, data, pos):
+        """Decode and apply the operation at pos; returns the next position."""
+        op = data[pos]
+        pos += 1
+        if op == END:
+            # a safe point to free the styles that are no longer used
+            self.styles.maybe_collect()
+            return pos
+        if self.frame is None and op != KEYFRAME:
+            raise ValueError("Delta stream must start with a keyframe")
+        if op == KEYFRAME:
+            version, pos = read_varint(data, pos)
+            w, pos = read_varint(data, pos)
+            h, pos = read_varint(data, pos)
+            if version != DELTA_VERSION:
+                raise ValueError("Unsupported delta version: {}".format(version))
+            self._keyframe(w, h)
+            return pos
+        if op == STYLE_DEF:
+            style_id, pos = read_varint(data, pos)
+            if pos + 6 > len(data):
+                raise IndexError
+            fg = Color.from_packed(int.from_bytes(data[pos:pos + 3], "big"))
+            bg = Color.from_packed(int.from_bytes(data[pos + 3:pos + 6], "big"))
+            attrs, pos = read_varint(data, pos + 6)
+            self._style_ids[style_id] = self.styles.intern(fg, bg, attrs)
+            return pos
+        if op == STYLE:
+            style_id, pos = read_varint(data, pos)
+            style = self._style_ids.get(style_id)
+            if style is None:
+                raise ValueError("Style {} is not defined".format(style_id))
+            self._style = style
+            return pos
+        if op == MOVE:
+            x, pos = read_varint(data, pos)
+            y, pos = read_varint(data, pos)
+            self.cursor_pos = (x, y)
+            return pos
+        if op == TEXT:
+            n, pos = read_varint(data, pos)
+            if pos + n > len(data):
+                raise IndexError
+            self._text(data[pos:pos + n].decode("utf-8"))
+            return pos + n
+        if op == RUN:
+            n, pos = read_varint(data, pos)
+            codepoint, pos = read_varint(data, pos)
+            self._run(codepoint, n)
+            return pos
+        if op == CLEAR:
+            self._clear()
+            return pos
+        if op == SCROLL:
+            top, pos = read_varint(data, pos)
+            bottom, pos = read_varint(data, pos)
+            n, pos = read_varint(data, pos)
+            self._scroll(top, bottom, unzigzag(n))
+            return pos
+        if op == CURSOR:
+            self.show_cursor = bool(data[pos])
+            return pos + 1
+        raise ValueError("Unknown delta opcode: {}".format(op))
+
+    def _keyframe(self, w, h):
+        self._style_ids = {}
+        self._style = None
+        self.frame = StyleBuffer(w, h, styles=self.styles)
+        self.cursor_pos = (0, 0)
+        self.keyframes += 1
+
+    def _text(self, text):
+        frame = self.frame
+        x, y = self.cursor_pos
+        for ch in text:
+            n = terminal_char_len(ch) or 0
+            if 0 <= y < frame.h and 0 <= x and x + n <= frame.w:
+                frame._set_cell(x, y, ord(ch), self._style)
+                if n > 1:
+                    frame._set_cell(x + 1, y, ord(" "), self._style)
+            x += n
+        self.cursor_pos = (x, y)
+
+    def _run(self, codepoint, n):
+        frame = self.frame
+        x, y = self.cursor_pos
+        if 0 <= y < frame.h:
+            for i in range(max(0, x), min(frame.w, x + n)):
+                frame._set_cell(i, y, codepoint, self._style)
+        self.cursor_pos = (x + n, y)
+
+    def _clear(self):
+        style = self.styles[self._style]
+        self.frame.clear(fg=style.fg, bg=style.bg, attrs=style.attrs)
+        self.cursor_pos = (0, 0)
+
+    def _scroll(self, top, bottom, n):
+        frame = self.frame
+        top, bottom = max(0, top), min(frame.h - 1, bottom)
+        if n == 0 or top > bottom:
+            return
+        blank_chars = array("I", [ord(" ")]) * frame.w
+        blank_ids = array("I", [self._style]) * frame.w
+        for rows, blank in ((frame._chars, blank_chars), (frame._style_ids, blank_ids)):
+            region = rows[top:bottom + 1]
+            count = min(abs(n), len(region))
+            fill = [array("I", blank) for i in range(count)]
+            if n > 0:
+                rows[top:bottom + 1] = region[count:] + fill
+            else:
+                rows[top:bottom + 1] = fill + region[:len(region) - count]
+        for y in range(top, bottom + 1):
+            frame._row_versions[y][0] += 1
+
+class DeltaClient:
+    """Renders a delta stream to a terminal.
+
+    Frames are drawn at the top left of the terminal, and clipped to its size.
+    """
+
+    def __init__(self, backend=None, input=None, *, color_mode=None):
+        """
+        backend - the backend to render to; by default, a UnixBackend for the
+                  controlling terminal
+        input - if given, the screen is resized when it emits a "resize" event
+        color_mode - the color mode to render in, instead of the one detected
+                     for the terminal (see UnixBackend.color_mode)
+        """
+        if backend is None:
+            from termpixels.unix import UnixBackend
+            backend = UnixBackend()
+        if color_mode is not None:
+            backend.color_mode = color_mode
+        self.backend = backend
+        self.screen = StyleScreen(backend, input)
+        self.decoder = DeltaDecoder(styles=self.screen.styles)
+        self._keyframes = 0
+
+    def feed(self, data):
+        """Decode some data, and render the latest frame if one was completed."""
+        if self.decoder.feed(data):
+            self.render()
+
+    def render(self):
+        """Render the latest frame."""
+        decoder = self.decoder
+        screen = self.screen
+        if decoder.frame is None:
+            return
+        if decoder.keyframes != self._keyframes:
+            # the frame may have become smaller
+            self._keyframes = decoder.keyframes
+            screen.clear()
+        decoder.frame.blit_to(screen)
+        x, y = decoder.cursor_pos
+        screen.cursor_pos = (min(x, screen.w - 1), min(y, screen.h - 1))
+        screen.show_cursor = decoder.show_cursor
+        screen.update()
+
+    def run(self, stream):
+        """Render a file descriptor or socket until it is closed."""
+        fd = stream if isinstance(stream, int) else stream.fileno()
+        while True:
+            data = os.read(fd, 1 << 16)
+            if not data:
+                return
+            self.feed(data)
@@ -1,22 +1,28 @@
-def detect_backend():
-    """Try to construct an appropriate backend for this platform."""
+def detect_backend(**kwargs):
+    """Try to construct an appropriate backend for this platform.
+
+    Keyword arguments are passed to the constructor of the backend.
+    """
     try:
         from termpixels.unix import UnixBackend
-        return UnixBackend()
+        return UnixBackend(**kwargs)
     except:
         try:
             from termpixels.win32_vt import Win32VtBackend
-            return Win32VtBackend()
+            return Win32VtBackend(**kwargs)
         except Exception as e:
             raise e
             from termpixels.win32 import Win32Backend
-            return Win32Backend()
+            return Win32Backend(**kwargs)
+
+def detect_input(**kwargs):
+    """Try to construct an appropriate input implementation for this platform.
 
-def detect_input():
-    """Try to construct an appropriate input implementation for this platform."""
+    Keyword arguments are passed to the constructor of the input.
+    """
     try:
         from termpixels.unix import UnixInput
-        return UnixInput()
+        return UnixInput(**kwargs)
     except:
         from termpixels.win32 import Win32Input
-        return Win32Input()
+        return Win32Input(**kwargs)
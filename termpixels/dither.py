@@ -0,0 +1,194 @@
+"""Ordered dithering of colormaps for terminals with limited colors.
+
+Gradients drawn on a 256-color or 16-color terminal show bands once each color
+is rounded to the nearest color of the palette. Dithering replaces the bands
+with a fine pattern of the neighboring palette colors.
+
+An ordered (Bayer) dither is used, so that the color of a pixel depends only
+on its own value and its position. Unchanged pixels therefore keep the same
+color from frame to frame, and Screen does not need to redraw them.
+
+Example:
+```
+colormap = dither_colormap(colormap, w, h, app.backend.color_mode)
+draw_colormap(app.screen, colormap, 0, 0, w=w, h=h)
+```
+(draw_colormap() and draw_colormap_2x() can also do this with their dither
+argument.)
+"""
+
+import sys
+from array import array
+from functools import lru_cache
+from termpixels.color import Color, PALETTE_16, _color_distance
+from termpixels.util import flat_sequence
+
+# 4x4 Bayer threshold matrix, listed row by row
+_BAYER_4 = (
+    0, 8, 2, 10,
+    12, 4, 14, 6,
+    3, 11, 1, 9,
+    15, 7, 13, 5,
+)
+
+# channel values of the levels of the 256-color cube
+_CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+
+# the typecode of an array of packed colors; array("I") is not guaranteed to 
+# hold 32 bits, although it does on all common platforms
+_PACKED_TYPECODE = "I" if array("I").itemsize >= 4 else "L"
+
+def _channel_offsets(itemsize):
+    """Get the byte offsets of the red, green and blue channels of a packed
+    color stored in an unsigned integer of itemsize bytes."""
+    if sys.byteorder == "little":
+        return 2, 1, 0
+    return itemsize - 3, itemsize - 2, itemsize - 1
+
+def _level_table(levels, threshold):
+    """Map each channel value to the index of a level.
+
+    A value between two levels rounds up if it is more than threshold (in the
+    range [0,1]) of the way to the upper level.
+    """
+    table = bytearray(256)
+    i = 0
+    for c in range(256):
+        while i + 1 < len(levels) and levels[i + 1] <= c:
+            i += 1
+        if i + 1 < len(levels) and c - levels[i] > threshold * (levels[i + 1] - levels[i]):
+            table[c] = i + 1
+        else:
+            table[c] = i
+    return bytes(table)
+
+@lru_cache(4)
+def _level_tables(levels):
+    """Get a table for each threshold of the Bayer matrix."""
+    return tuple(_level_table(levels, (t + 0.5) / 16) for t in _BAYER_4)
+
+@lru_cache(4)
+def _level_colors(levels):
+    """Get the Colors for each combination of levels, indexed by r*n*n+g*n+b."""
+    return tuple(Color.rgb_int(r, g, b) for r in levels for g in levels for b in levels)
+
+def _palette_pairs(palette):
+    """Get the data for mixing each pair of palette colors, indexed by 
+    i*len(palette)+j for the colors at indices i and j.
+
+    Each is a tuple of the two packed colors, the difference between their
+    channels, the squared length of that difference, and a penalty for mixing
+    colors that are far apart, which shows as noise.
+    """
+    pairs = []
+    for a in palette:
+        for b in palette:
+            dr = (b >> 16) - (a >> 16)
+            dg = ((b >> 8) & 0xFF) - ((a >> 8) & 0xFF)
+            db = (b & 0xFF) - (a & 0xFF)
+            pairs.append((a, b, dr, dg, db, dr * dr + dg * dg + db * db, _color_distance(a, b) / 50))
+    return tuple(pairs)
+
+_PALETTE_16_PAIRS = _palette_pairs(PALETTE_16)
+
+@lru_cache(16384)
+def _dither_16(packed):
+    """Get the Color to use for a packed color at each threshold of the Bayer
+    matrix, mixing the pair of 16-color palette colors that best matches it."""
+    r = packed >> 16
+    g = (packed >> 8) & 0xFF
+    b = packed & 0xFF
+    # rather than trying every pair, mix the nearest color with each of the
+    # others
+    nearest = min(range(16), key=lambda i: _color_distance(packed, PALETTE_16[i]))
+    ar = PALETTE_16[nearest] >> 16
+    ag = (PALETTE_16[nearest] >> 8) & 0xFF
+    ab = PALETTE_16[nearest] & 0xFF
+    best = None
+    for a, c, dr, dg, db, length, penalty in _PALETTE_16_PAIRS[nearest * 16:nearest * 16 + 16]:
+        t = 0
+        if length:
+            t = ((r - ar) * dr + (g - ag) * dg + (b - ab) * db) / length
+            t = min(1, max(0, round(t * 16) / 16))
+        # the squared distance to the mix, weighted as by _color_distance()
+        er = r - ar - dr * t
+        eg = g - ag - dg * t
+        eb = b - ab - db * t
+        rmean = (r + ar + dr * t) / 2
+        error = (512 + rmean) * er * er / 256 + 4 * eg * eg + (767 - rmean) * eb * eb / 256 + penalty
+        if best is None or error < best[0]:
+            best = (error, a, c, t)
+    _, a, c, t = best
+    a = Color.from_packed(a)
+    c = Color.from_packed(c)
+    return tuple(c if (threshold + 0.5) / 16 < t else a for threshold in range(16))
+
+def dither_colormap(colormap, w, h, color_mode, *, x=0, y=0):
+    """Dither a colormap to the colors that can be displayed in a color mode.
+
+    colormap is a sequence of Colors or packed integers representing a 2D 
+    bitmap, as for draw_colormap(). Transparent pixels (Nones or negative
+    integers) are returned as Nones. color_mode is the color_mode of a 
+    backend; colormaps for "truecolor" (or unknown) modes are returned 
+    unchanged.
+
+    Returns a new list of Colors. In 256-color mode, the colors are taken
+    from the color cube of the palette. In 16-color mode, they are taken from
+    the 16 named colors (see termpixels.color.PALETTE_16), including the
+    bright ones.
+
+    x and y give the position of the colormap in the destination buffer, which
+    is used to align the dither pattern so that it does not depend on where
+    the colormap is drawn.
+    """
+    if color_mode == "16-color":
+        return _dither_colormap_16(flat_sequence(colormap), w, h, x, y)
+    if color_mode != "256-color":
+        return list(colormap)
+    levels = _CUBE_LEVELS
+    tables = _level_tables(levels)
+    colors = _level_colors(levels)
+    n = len(levels)
+
+    colormap = flat_sequence(colormap)
+    if isinstance(colormap, memoryview) and colormap.format in ("I", "L") and colormap.itemsize >= 3:
+        raw = colormap.tobytes()
+        itemsize = colormap.itemsize
+    else:
+        packed = array(_PACKED_TYPECODE, (c._packed if isinstance(c, Color) else 0 if c is None or c < 0 else c
+                                          for c in colormap))
+        raw = packed.tobytes()
+        itemsize = packed.itemsize
+    planes = []
+    for offset in _channel_offsets(itemsize):
+        plane = raw[offset::itemsize]
+        out = bytearray(len(plane))
+        for dy in range(h):
+            row = dy * w
+            matrix_row = ((y + dy) & 3) * 4
+            for phase in range(4):
+                # the columns of this row using threshold phase of the matrix row
+                start = row + ((phase - x) & 3)
+                columns = slice(start, row + w, 4)
+                out[columns] = plane[columns].translate(tables[matrix_row + phase])
+        planes.append(out)
+
+    nn = n * n
+    return [None if c is None or (c.__class__ is int and c < 0) else colors[r * nn + g * n + b]
+            for c, r, g, b in zip(colormap, *planes)]
+
+def _dither_colormap_16(colormap, w, h, x, y):
+    result = []
+    for dy in range(h):
+        matrix_row = ((y + dy) & 3) * 4
+        thresholds = [_BAYER_4[matrix_row + ((x + dx) & 3)] for dx in range(4)]
+        for dx, c in enumerate(colormap[dy * w:dy * w + w]):
+            if c is None:
+                result.append(None)
+                continue
+            packed = c._packed if isinstance(c, Color) else c
+            if packed < 0:
+                result.append(None)
+            else:
+                result.append(_dither_16(packed)[thresholds[dx & 3]])
+    return result
@@ -1,5 +1,11 @@
 from termpixels.pixeldata import PixelData
+from termpixels.color import Color
+from termpixels.util import flat_sequence, terminal_char_len
+from termpixels.dither import dither_colormap
 from time import perf_counter
+from functools import lru_cache
+import math
+import operator
 
 # Boxes
 _BOX_T = 0
@@ -104,14 +110,12 @@ PROGRESS_SMOOTH = {
 def draw_hline(buffer, y, char="─", **kwargs):
     """Draw a horizontal line along the given y coordinate.
     """
-    for x in range(buffer.w):
-        buffer.print(char, x, y, **kwargs)
+    buffer.hspan(0, y, buffer.w, char, **kwargs)
 
 def draw_vline(buffer, x, char="│", **kwargs):
     """Draw a vertical line along the given x coordinate.
     """
-    for y in range(buffer.h):
-        buffer.print(char, x, y, **kwargs)
+    buffer.vspan(x, 0, buffer.h, char, **kwargs)
 
 def draw_box(buffer, x, y, w, h, chars=BOX_CHARS_LIGHT, **kwargs):
     """Draw a box using a set of box-drawing characters.
@@ -125,82 +129,107 @@ def draw_box(buffer, x, y, w, h, chars=BOX_CHARS_LIGHT, **kwargs):
         return
     if h > 1:
         for px, char_id in ((max(0, x + w - 1), _BOX_R), (x, _BOX_L)):
-            for py in range(y, y + h):
-                buffer.print(chars[char_id], px, py, **kwargs)
+            buffer.vspan(px, y, h, chars[char_id], **kwargs)
     if w > 1:
         for py, char_id in ((max(0, y + h - 1), _BOX_B), (y, _BOX_T)):
-            for px in range(x, x + w):
-                buffer.print(chars[char_id], px, py, **kwargs)
+            buffer.hspan(x, py, w, chars[char_id], **kwargs)
     if w > 1 and h > 1:
-        buffer.print(chars[_BOX_TL], x, y, **kwargs)
-        buffer.print(chars[_BOX_TR], x + w - 1, y, **kwargs)
-        buffer.print(chars[_BOX_BL], x, y + h -1, **kwargs)
-        buffer.print(chars[_BOX_BR], x + w - 1, y + h - 1, **kwargs)
+        buffer.put_char(chars[_BOX_TL], x, y, **kwargs)
+        buffer.put_char(chars[_BOX_TR], x + w - 1, y, **kwargs)
+        buffer.put_char(chars[_BOX_BL], x, y + h -1, **kwargs)
+        buffer.put_char(chars[_BOX_BR], x + w - 1, y + h - 1, **kwargs)
 
 def _invert_geometry(geom):
     """Invert (rotate 180 degrees) a 4-bit frame geometry bitmask."""
     return (geom >> 2) | ((geom << 2) & 0b1100)
 
-def _frame_connecting_char(buffer, char, x, y, chars):
-    """Connect a frame character to neighbors and return the resuling character index.
-    
-    For example, imagine we are drawing a horizontal line "─" on top of a corner "└".
-    We want to produce the combined character "┴".
-    """
-
-    assert char != _FRAME_NO
-
-    def buffer_char(x, y):
-        if not buffer.in_bounds(x, y):
-            return -1
-        char = buffer[x, y].char
-        try:
-            return chars.index(char)
-        except ValueError:
-            return -1
-    
-    geom = _FRAME_GEOMETRY[char]
-    geom |= _invert_geometry(_FRAME_GEOMETRY[buffer_char(x - 1, y)] & 0b0010)
-    geom |= _invert_geometry(_FRAME_GEOMETRY[buffer_char(x, y - 1)] & 0b0001)
-    geom |= _invert_geometry(_FRAME_GEOMETRY[buffer_char(x + 1, y)] & 0b1000)
-    geom |= _invert_geometry(_FRAME_GEOMETRY[buffer_char(x, y + 1)] & 0b0100)
-
-    assert geom != _FRAME_NO
-    return _GEOMETRY_FRAME[geom]
-
-def draw_frame(buffer, x, y, w, h, chars=FRAME_CHARS_LIGHT, **kwargs):
-    """Draw a box, connecting it where it overlaps with an existing box."""
-
-    frame_pixels = []
-    def pixel(char_idx, x, y):
-        char = chars[_frame_connecting_char(buffer, char_idx, x, y, chars)]
-        frame_pixels.append((char, x, y))
-    
+@lru_cache(32)
+def _frame_char_indices(chars):
+    """Map each character of a set of frame characters to its logical index."""
+    indices = {}
+    for i, char in enumerate(chars):
+        indices.setdefault(char, i)
+    return indices
+
+def _rect_frame_geometry(x, y, w, h):
+    """Get the geometry of each pixel of a frame, as a dict of {(x, y): geom}."""
+    geometry = {}
     if w < 1 or h < 1:
-        return
+        return geometry
     if h > 1:
         for px in (max(0, x + w - 1), x):
             for py in range(y, y + h):
-                pixel(_FRAME_V, px, py)
-            if h > 1:
-                pixel(_FRAME_B, px, y)
-                pixel(_FRAME_T, px, y + h - 1)
+                geometry[px, py] = _FRAME_GEOMETRY[_FRAME_V]
+            geometry[px, y] = _FRAME_GEOMETRY[_FRAME_B]
+            geometry[px, y + h - 1] = _FRAME_GEOMETRY[_FRAME_T]
     if w > 1:
         for py in (max(0, y + h - 1), y):
             for px in range(x, x + w):
-                pixel(_FRAME_H, px, py)
-            if w > 1:
-                pixel(_FRAME_R, x, py)
-                pixel(_FRAME_L, x + w - 1, py)
+                geometry[px, py] = _FRAME_GEOMETRY[_FRAME_H]
+            geometry[x, py] = _FRAME_GEOMETRY[_FRAME_R]
+            geometry[x + w - 1, py] = _FRAME_GEOMETRY[_FRAME_L]
     if w > 1 and h > 1:
-        pixel(_FRAME_TL, x, y)
-        pixel(_FRAME_TR, x + w - 1, y)
-        pixel(_FRAME_BL, x, y + h -1)
-        pixel(_FRAME_BR, x + w - 1, y + h - 1)
+        geometry[x, y] = _FRAME_GEOMETRY[_FRAME_TL]
+        geometry[x + w - 1, y] = _FRAME_GEOMETRY[_FRAME_TR]
+        geometry[x, y + h - 1] = _FRAME_GEOMETRY[_FRAME_BL]
+        geometry[x + w - 1, y + h - 1] = _FRAME_GEOMETRY[_FRAME_BR]
+    return geometry
+
+def draw_frames(buffer, rects, chars=FRAME_CHARS_LIGHT, **kwargs):
+    """Draw many boxes at once, connecting them where they meet or overlap.
+
+    rects is an iterable of (x, y, w, h) tuples. Where boxes overlap, the 
+    junction characters are worked out from the combined geometry of all of 
+    the boxes, and boxes are also connected to existing frame characters (from
+    the same set of chars) in the buffer, as by draw_frame(). Each pixel is 
+    written only once.
+    """
+    occupancy = {}
+    for rect in rects:
+        for xy, geom in _rect_frame_geometry(*rect).items():
+            occupancy[xy] = occupancy.get(xy, 0) | geom
+    
+    indices = _frame_char_indices(chars)
+    def neighbor_geometry(x, y):
+        geom = occupancy.get((x, y), 0)
+        if buffer.in_bounds(x, y):
+            char = buffer.at_unsafe(x, y, mutable=False).char
+            geom |= _FRAME_GEOMETRY[indices.get(char, _FRAME_NO)]
+        return geom
+    
+    frame_pixels = []
+    for (x, y), geom in occupancy.items():
+        # connect to neighbors that point towards this pixel
+        geom |= _invert_geometry(neighbor_geometry(x - 1, y) & 0b0010)
+        geom |= _invert_geometry(neighbor_geometry(x, y - 1) & 0b0001)
+        geom |= _invert_geometry(neighbor_geometry(x + 1, y) & 0b1000)
+        geom |= _invert_geometry(neighbor_geometry(x, y + 1) & 0b0100)
+        frame_pixels.append((chars[_GEOMETRY_FRAME[geom]], x, y))
 
     for char, x, y in frame_pixels:
         buffer.put_char(char, x, y, **kwargs)
 
+def draw_frame(buffer, x, y, w, h, chars=FRAME_CHARS_LIGHT, **kwargs):
+    """Draw a box, connecting it where it overlaps with an existing box."""
+    draw_frames(buffer, [(x, y, w, h)], chars, **kwargs)
+
+def draw_grid(buffer, x, y, col_widths, row_heights, chars=FRAME_CHARS_LIGHT, **kwargs):
+    """Draw a table of boxes that share their borders.
+
+    col_widths and row_heights give the inner size of each column and row, 
+    not including the borders. The whole grid is 
+    sum(col_widths) + len(col_widths) + 1 pixels wide, and similarly tall.
+    """
+    rects = []
+    py = y
+    for row_h in row_heights:
+        px = x
+        for col_w in col_widths:
+            rects.append((px, py, col_w + 2, row_h + 2))
+            px += col_w + 1
+        py += row_h + 1
+    draw_frames(buffer, rects, chars, **kwargs)
+
 def draw_spinner(buffer, x, y, *, freq=1, t=None, frames=SPINNER_SIX, **kwargs):
     """Print a repeating animation.
 
@@ -244,55 +273,278 @@ def draw_progress(buffer, x, y, *, w, progress, start="[", end="]", bar_char="="
     bar_filled_chars = int(progress * bar_space)
 
     buffer.fill(x, y, w, 1, fg=fg, bg=bg)
-    buffer.print(start, x, y)
-    buffer.print(bar_char * bar_filled_chars)
+    px, _ = buffer.print(start, x, y)
+    bar_w = bar_filled_chars * terminal_char_len(bar_char)
+    buffer.hspan(px, y, bar_w, bar_char)
+    px += bar_w
     if bar_filled_chars < bar_space:
         f = progress * bar_space - bar_filled_chars
         head_char = head_chars[int(f * len(head_chars))]
-        buffer.print(head_char)
-    buffer.print(empty_char * (bar_space - bar_filled_chars - 1))
-    buffer.print(end)
+        px += buffer.put_char(head_char, px, y)
+    empty_w = max(0, bar_space - bar_filled_chars - 1) * terminal_char_len(empty_char)
+    buffer.hspan(px, y, empty_w, empty_char)
+    buffer.print(end, px + empty_w, y)
+
+# Primitives
+# These draw onto any target with in_bounds() and fill() methods, such as a 
+# Buffer (using cell coordinates) or a Canvas (using sub-pixel coordinates). 
+# Keyword arguments are passed on to fill(), so they depend on the target: 
+# fg, bg and char for a Buffer, or color and on for a Canvas.
+
+def _div_ceil(n, d):
+    return -(-n // d)
+
+def _line_runs(a0, b0, a1, b1, a_limit, b_limit):
+    """Find the runs of a line along its major axis a.
+
+    Yields tuples (b, start, end), each of which is a run of pixels from start
+    to end (inclusive) along the a axis. Only the parts of runs between 0 and
+    a_limit (exclusive) and b_limit (exclusive) are generated.
+    """
+    if a1 < a0:
+        a0, b0, a1, b1 = a1, b1, a0, b0
+    da = a1 - a0
+    db = abs(b1 - b0)
+    sb = 1 if b1 >= b0 else -1
+
+    # the minor axis steps j for which b is in bounds
+    if sb > 0:
+        j0, j1 = -b0, b_limit - 1 - b0
+    else:
+        j0, j1 = b0 - (b_limit - 1), b0
+    for j in range(max(0, j0), min(db, j1) + 1):
+        # the pixels at offset k along the major axis are at minor axis offset
+        # floor((2*k*db + da) / (2*da)), which is j for these k:
+        start = a0 if j == 0 else a0 + _div_ceil((2 * j - 1) * da, 2 * db)
+        end = a1 if j == db else a0 + _div_ceil((2 * j + 1) * da, 2 * db) - 1
+        start = max(0, start)
+        end = min(a_limit - 1, end)
+        if start <= end:
+            yield b0 + sb * j, start, end
+
+def draw_line(target, x0, y0, x1, y1, **kwargs):
+    """Draw a line between two points (inclusive) using Bresenham's algorithm.
+
+    Each horizontal (or vertical) run of the line is drawn with a single call
+    to target.fill(). The parts of the line outside of the target are skipped
+    without being computed.
+    """
+    if abs(x1 - x0) >= abs(y1 - y0):
+        for y, start, end in _line_runs(x0, y0, x1, y1, target.w, target.h):
+            target.fill(start, y, end - start + 1, 1, **kwargs)
+    else:
+        for x, start, end in _line_runs(y0, x0, y1, x1, target.h, target.w):
+            target.fill(x, start, 1, end - start + 1, **kwargs)
+
+def _isqrt(n):
+    """Get the largest integer whose square is at most n (like math.isqrt)."""
+    x = int(math.sqrt(n))
+    # correct the rounding error of the floating point square root
+    while x * x > n:
+        x -= 1
+    while (x + 1) * (x + 1) <= n:
+        x += 1
+    return x
+
+def _ellipse_extent(rx, ry, dy):
+    """Get the largest x such that (x, dy) is inside an ellipse centered at 0.
+
+    A pixel is inside if its center lies within the ellipse with radii 
+    rx + 0.5 and ry + 0.5, which is computed using integers only.
+    """
+    w = 2 * rx + 1
+    h = 2 * ry + 1
+    n = w * w * (h * h - 4 * dy * dy)
+    if n <= 0:
+        return -1
+    return _isqrt((n - 1) // (4 * h * h))
+
+def draw_ellipse(target, cx, cy, rx, ry, *, fill=False, **kwargs):
+    """Draw an ellipse with the given center and radii.
+
+    If fill is True, the inside of the ellipse is filled. Each row of the 
+    ellipse is drawn using one call to target.fill() for each side.
+    """
+    if rx < 0 or ry < 0:
+        return
+    for dy in range(max(-ry, -cy), min(ry, target.h - 1 - cy) + 1):
+        y = cy + dy
+        outer = _ellipse_extent(rx, ry, dy)
+        inner = _ellipse_extent(rx, ry, abs(dy) + 1)
+        if fill or inner < 0:
+            target.fill(cx - outer, y, 2 * outer + 1, 1, **kwargs)
+            continue
+        # the outline covers the pixels which are not inside the next row 
+        # further from the center, so that the outline is connected
+        inner = min(inner + 1, outer)
+        target.fill(cx - outer, y, outer - inner + 1, 1, **kwargs)
+        target.fill(cx + inner, y, outer - inner + 1, 1, **kwargs)
+
+def draw_circle(target, cx, cy, r, *, fill=False, **kwargs):
+    """Draw a circle with the given center and radius.
+
+    If fill is True, the inside of the circle is filled.
+    """
+    draw_ellipse(target, cx, cy, r, r, fill=fill, **kwargs)
 
-def draw_colormap(buffer, colormap, x, y, *, w, h, char="█"):
+def draw_polygon(target, points, *, fill=False, **kwargs):
+    """Draw a closed polygon through a sequence of (x, y) points.
+
+    If fill is True, the inside of the polygon is filled using a scanline 
+    algorithm with the even-odd rule, drawing one span per call to 
+    target.fill(). The outline is always drawn.
+    """
+    points = list(points)
+    if not points:
+        return
+    edges = list(zip(points, points[1:] + points[:1]))
+    if fill:
+        y_min = max(0, min(y for x, y in points))
+        y_max = min(target.h - 1, max(y for x, y in points))
+        for y in range(y_min, y_max + 1):
+            crossings = []
+            for (xa, ya), (xb, yb) in edges:
+                # half-open so that vertices are not counted twice
+                if (ya <= y < yb) or (yb <= y < ya):
+                    crossings.append(xa + (y - ya) * (xb - xa) / (yb - ya))
+            crossings.sort()
+            for left, right in zip(crossings[::2], crossings[1::2]):
+                start = math.ceil(left)
+                end = math.floor(right)
+                if start <= end:
+                    target.fill(start, y, end - start + 1, 1, **kwargs)
+    for (xa, ya), (xb, yb) in edges:
+        draw_line(target, xa, ya, xb, yb, **kwargs)
+
+def _target_reader(target):
+    """Get a function that returns a comparable value for a point of a target."""
+    if hasattr(target, "at_unsafe"):
+        def read(x, y):
+            pixel = target.at_unsafe(x, y, mutable=False)
+            return (pixel.char, pixel.fg, pixel.bg)
+        return read
+    return target.get
+
+def flood_fill(target, x, y, **kwargs):
+    """Fill the region of identical pixels that contains the point (x, y).
+
+    The region consists of all pixels that are connected horizontally or 
+    vertically to the given point and that are identical to it. It is found
+    one horizontal span at a time, and each span is drawn using a single call
+    to target.fill().
+    """
+    if not target.in_bounds(x, y):
+        return
+    read = _target_reader(target)
+    w = target.w
+    h = target.h
+    value = read(x, y)
+    visited = bytearray(w * h)
+    spans = []
+    seeds = [(x, y)]
+    while seeds:
+        x, y = seeds.pop()
+        if visited[y * w + x]:
+            continue
+        left = x
+        while left > 0 and not visited[y * w + left - 1] and read(left - 1, y) == value:
+            left -= 1
+        right = x
+        while right < w - 1 and not visited[y * w + right + 1] and read(right + 1, y) == value:
+            right += 1
+        visited[y * w + left:y * w + right + 1] = b"\x01" * (right - left + 1)
+        spans.append((left, y, right - left + 1))
+
+        # add a seed for each run of matching pixels above and below the span
+        for ny in (y - 1, y + 1):
+            if ny < 0 or ny >= h:
+                continue
+            in_run = False
+            for nx in range(left, right + 1):
+                matches = not visited[ny * w + nx] and read(nx, ny) == value
+                if matches and not in_run:
+                    seeds.append((nx, ny))
+                in_run = matches
+
+    for left, y, length in spans:
+        target.fill(left, y, length, 1, **kwargs)
+
+def _clip_span(offset, length, limit):
+    """Clip the range [0, length) so that offset plus each value lies in [0, limit)."""
+    return max(0, -offset), max(0, min(length, limit - offset))
+
+def _buffer_limits(buffer):
+    """Get the width and height to which drawing should be clipped."""
+    if getattr(buffer, "bounded", True):
+        return buffer.w, buffer.h
+    # an unbounded SparseBuffer only has a top-left edge
+    return float("inf"), float("inf")
+
+def _colormap_row(colors):
+    """Convert a row of a colormap to Colors, and Nones for transparent pixels."""
+    from_packed = Color.from_packed
+    if isinstance(colors, memoryview):
+        # the items of a buffer are already ints
+        return [None if color < 0 else from_packed(color) for color in colors.tolist()]
+    result = []
+    for color in colors:
+        if color is None or color.__class__ is Color:
+            result.append(color)
+            continue
+        if not isinstance(color, Color):
+            # also accept integer types such as numpy's
+            color = operator.index(color)
+            color = None if color < 0 else from_packed(color)
+        result.append(color)
+    return result
+
+def draw_colormap(buffer, colormap, x, y, *, w, h, char="█", dither=None):
     """Draw a color bitmap where each color is represented as one character cell.
 
-    colormap is a one-dimensional list of colors representing a 2D bitmap. Each
-    row of colors should be listed in sequence. The indexing formula is y*w+x.
+    colormap is a one-dimensional sequence of colors representing a 2D bitmap.
+    Each row of colors should be listed in sequence. The indexing formula is 
+    y*w+x. Colors may be given as Colors or as integers in the format 0xRRGGBB,
+    so colormap may also be an array, memoryview, or NumPy array (of any shape)
+    of packed colors.
 
-    colormap may contain Nones, indicating transparent pixels. Drawing a 
-    transparent pixel will preserve the cell's contents.
+    colormap may contain Nones or negative integers, indicating transparent 
+    pixels. Drawing a transparent pixel will preserve the cell's contents.
 
     Provide x and y coordinate for top-left of the bitmap in the destination. 
 
     Provide the width and height of the colormap.
-    """
-    for dx in range(w):
-        for dy in range(h):
-            idx = dy * w + dx
-            if colormap[idx] is None:
-                continue
-            px = x + dx
-            py = y + dy
-            if not buffer.in_bounds(px, py):
-                continue
-            pixel = buffer[px, py]
-            pixel.char = char
-            pixel.fg = colormap[idx]
 
-def draw_colormap_2x(buffer, colormap, x, y, *, w, h, char="▀"):
+    To dither the colormap for a terminal with limited colors, set dither to
+    the color_mode of the backend (see termpixels.dither).
+    """
+    if dither is not None:
+        colormap = dither_colormap(colormap, w, h, dither, x=x, y=y)
+    colormap = flat_sequence(colormap)
+    limit_w, limit_h = _buffer_limits(buffer)
+    dx0, dx1 = _clip_span(x, w, limit_w)
+    dy0, dy1 = _clip_span(y, h, limit_h)
+    if len(char) != 1:
+        raise Exception("Character must have length 1")
+    for dy in range(dy0, dy1):
+        row = dy * w
+        colors = _colormap_row(colormap[row + dx0:row + dx1])
+        buffer._put_color_row(x + dx0, y + dy, colors, char)
+
+def draw_colormap_2x(buffer, colormap, x, y, *, w, h, char="▀", dither=None):
     """Draw a color bitmap at 2x vertical resolution using a box drawing character.
     
     Creates two sub-pixels per terminal character (super-pixel) by using a box
     drawing character and setting both foreground and background colors.
 
-    colormap is a one-dimensional list of colors representing a 2D bitmap. Each
-    row of colors should be listed in sequence. The indexing formula is y*w+x.
+    colormap is a one-dimensional sequence of colors representing a 2D bitmap,
+    in any of the forms accepted by draw_colormap(). The indexing formula is 
+    y*w+x.
     
-    colormap may contain Nones, indicating transparent sub-pixels. Drawing a
-    super-pixel that is completely transparent will preserve its contents. 
-    Drawing a super-pixel with one transparent sub-pixel will cause the 
-    super-pixel's background color to show through, but will destroy its 
-    contents.
+    colormap may contain Nones or negative integers, indicating transparent 
+    sub-pixels. Drawing a super-pixel that is completely transparent will 
+    preserve its contents. Drawing a super-pixel with one transparent 
+    sub-pixel will cause the super-pixel's background color to show through, 
+    but will destroy its contents.
 
     Provide x and y coordinate for top-left of destination in super-pixel 
     coordinates.
@@ -301,23 +553,22 @@ def draw_colormap_2x(buffer, colormap, x, y, *, w, h, char="▀"):
 
     Provide width and height of colormap (in sub-pixel size). When drawn, the 
     vertical dimension of the colormap will be reduced by half. 
+
+    To dither the colormap for a terminal with limited colors, set dither to
+    the color_mode of the backend (see termpixels.dither).
     """
-    for dx in range(w):
-        for dy in range(h):
-            idx = dy * w + dx
-            if colormap[idx] is None:
-                continue
-            px = x + dx
-            fy = y + dy * 0.5
-            py = int(fy)
-            if not buffer.in_bounds(px, py):
-                continue
-            pixel = buffer[px, py]
-            if fy % 1 < 0.5:
-                pixel.char = char
-                pixel.fg = colormap[idx]
-            else:
-                if pixel.char != char:
-                    pixel.char = char
-                    pixel.fg = pixel.bg
-                pixel.bg = colormap[idx]
+    # the sub-pixel row of the top of the colormap
+    sy = round(y * 2)
+    if dither is not None:
+        colormap = dither_colormap(colormap, w, h, dither, x=x, y=sy)
+    colormap = flat_sequence(colormap)
+    limit_w, limit_h = _buffer_limits(buffer)
+    dx0, dx1 = _clip_span(x, w, limit_w)
+    dy0, dy1 = _clip_span(sy, h, limit_h * 2)
+    if len(char) != 1:
+        raise Exception("Character must have length 1")
+    for dy in range(dy0, dy1):
+        row = dy * w
+        colors = _colormap_row(colormap[row + dx0:row + dx1])
+        # even sub-pixel rows are the tops of cells, and odd rows the bottoms
+        buffer._put_color_row(x + dx0, (sy + dy) >> 1, colors, char, lower=(sy + dy) & 1 == 1)
@@ -0,0 +1,240 @@
+"""Gradients and palettes sampled into lookup tables of Colors.
+
+Constructing a Color from floating point values (e.g. with Color.hsl()) is
+relatively expensive, and since animated values are rarely repeated, caching
+does not help. A Palette instead holds a fixed table of interned Colors, which
+is indexed by a value in the range [0,1]. Looking up a color is then only a
+multiplication and an index.
+
+Example:
+```
+rainbow = Gradient.hues()
+for i, c in enumerate(text):
+    app.screen.print(c, x + i, y, fg=rainbow.at(i / len(text) + time()))
+```
+
+fill_linear() and fill_radial() fill a rectangle of a Buffer or Canvas with a
+gradient, computing a whole row of lookups at a time.
+"""
+
+import colorsys
+import math
+from array import array
+from termpixels.canvas import Canvas
+from termpixels.color import Color, lerp_packed, _pack_clipped
+from termpixels.drawing import draw_colormap
+
+class Palette:
+    """A fixed sequence of Colors, which can be indexed by a value in [0,1].
+
+    colors may be Colors or packed integers in the format 0xRRGGBB. The
+    Colors in a palette are interned (see Color.from_packed()).
+
+    If cyclic is true, lookups wrap around, so that at(t) == at(t + 1).
+    Otherwise, values outside of [0,1] are clamped.
+    """
+
+    def __init__(self, colors, *, cyclic=False):
+        self._packed = array("I", (c if isinstance(c, int) else c.packed for c in colors))
+        if not self._packed:
+            raise ValueError("a palette must contain at least one color")
+        self._colors = tuple(Color.from_packed(c) for c in self._packed)
+        self._cyclic = cyclic
+
+    @property
+    def cyclic(self):
+        return self._cyclic
+
+    @property
+    def colors(self):
+        """Get a tuple of the Colors in the palette."""
+        return self._colors
+
+    @property
+    def packed(self):
+        """Get an array("I") of the colors in the palette as packed integers.
+
+        The array must not be modified.
+        """
+        return self._packed
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, i):
+        return self._colors[i]
+
+    def __iter__(self):
+        return iter(self._colors)
+
+    def index(self, t):
+        """Get the index of the color for a value t."""
+        n = len(self._colors)
+        if self._cyclic:
+            return math.floor(t * n + 0.5) % n
+        return max(0, min(n - 1, int(t * (n - 1) + 0.5)))
+
+    def at(self, t):
+        """Get the Color for a value t."""
+        return self._colors[self.index(t)]
+
+    def packed_at(self, t):
+        """Get the color for a value t as a packed integer."""
+        return self._packed[self.index(t)]
+
+    def _row(self, start, step, w):
+        """Get the packed colors for w values, from start in increments of step."""
+        packed = self._packed
+        n = len(packed)
+        if self._cyclic:
+            start = start * n + 0.5
+            step *= n
+            return array("I", [packed[math.floor(start + i * step) % n] for i in range(w)])
+        start = start * (n - 1) + 0.5
+        step *= n - 1
+        last = n - 1
+        return array("I", [packed[max(0, min(last, int(start + i * step)))] for i in range(w)])
+
+    def _lookup_many(self, values):
+        """Get the packed colors for a sequence of values."""
+        packed = self._packed
+        n = len(packed)
+        if self._cyclic:
+            return array("I", [packed[math.floor(t * n + 0.5) % n] for t in values])
+        last = n - 1
+        return array("I", [packed[max(0, min(last, int(t * last + 0.5)))] for t in values])
+
+class Gradient(Palette):
+    """A Palette that blends smoothly between a number of colors (stops).
+
+    Each stop is either a color, or a tuple (position, color) where position
+    is in the range [0,1]. Stops without positions are spaced evenly. The
+    gradient is sampled once, into size colors.
+
+    interpolate determines how colors between stops are blended:
+        "rgb" - linearly in RGB space
+        "hsl" - in HSL space, taking the shorter way around the hue wheel
+
+    If cyclic is true, the last stop blends back into the first.
+    """
+
+    def __init__(self, *stops, size=256, interpolate="rgb", cyclic=False):
+        if not stops:
+            raise ValueError("a gradient must have at least one stop")
+        if interpolate not in ("rgb", "hsl"):
+            raise ValueError("Unknown interpolation: {}".format(interpolate))
+        positioned = []
+        count = len(stops) if cyclic else max(1, len(stops) - 1)
+        for i, stop in enumerate(stops):
+            if isinstance(stop, tuple):
+                position, color = stop
+            else:
+                position, color = i / count, stop
+            positioned.append((position, color if isinstance(color, int) else color.packed))
+        positioned.sort(key=lambda stop: stop[0])
+        if cyclic:
+            # wrap around at both ends
+            first_pos, first_color = positioned[0]
+            last_pos, last_color = positioned[-1]
+            positioned = [(last_pos - 1, last_color)] + positioned + [(first_pos + 1, first_color)]
+        blend = _lerp_hsl if interpolate == "hsl" else lerp_packed
+
+        samples = []
+        denominator = size if cyclic else max(1, size - 1)
+        stop = 0
+        for k in range(size):
+            t = k / denominator
+            while stop + 1 < len(positioned) and positioned[stop + 1][0] <= t:
+                stop += 1
+            p0, c0 = positioned[stop]
+            if t <= p0 or stop + 1 == len(positioned):
+                samples.append(c0)
+                continue
+            p1, c1 = positioned[stop + 1]
+            samples.append(blend(c0, c1, (t - p0) / (p1 - p0)))
+        super().__init__(samples, cyclic=cyclic)
+
+    @classmethod
+    def hues(cls, s=1, l=0.5, *, size=256):
+        """Get a cyclic gradient through every hue, so that at(t) is like Color.hsl(t, s, l)."""
+        gradient = cls.__new__(cls)
+        Palette.__init__(gradient, [_hsl_packed(k / size, s, l) for k in range(size)], cyclic=True)
+        return gradient
+
+def _hsl_packed(h, s, l):
+    r, g, b = colorsys.hls_to_rgb(h, l, s)
+    return _pack_clipped(r * 255, g * 255, b * 255)
+
+def _lerp_hsl(a, b, t):
+    """Interpolate between two packed colors in HSL space."""
+    ha, la, sa = colorsys.rgb_to_hls((a >> 16) / 255, ((a >> 8) & 0xFF) / 255, (a & 0xFF) / 255)
+    hb, lb, sb = colorsys.rgb_to_hls((b >> 16) / 255, ((b >> 8) & 0xFF) / 255, (b & 0xFF) / 255)
+    # take the shorter way around the hue wheel
+    dh = (hb - ha + 0.5) % 1 - 0.5
+    return _hsl_packed((ha + dh * t) % 1, sa + (sb - sa) * t, la + (lb - la) * t)
+
+def _draw(target, colormap, x, y, w, h, kwargs):
+    if isinstance(target, Canvas):
+        target.draw_colormap(colormap, x, y, w=w, h=h, **kwargs)
+    else:
+        draw_colormap(target, colormap, x, y, w=w, h=h, **kwargs)
+
+def linear_colormap(palette, w, h, *, angle=0):
+    """Get a colormap of a linear gradient, as an array("I") of packed colors.
+
+    The gradient runs across the w*h rectangle in the direction given by angle
+    (in radians, measured clockwise from the positive x axis), so that the
+    first color of the palette is at one edge and the last is at the other.
+    """
+    dx = math.cos(angle)
+    dy = math.sin(angle)
+    # the length of the rectangle's projection onto the direction of the gradient
+    extent = abs(dx) * (w - 1) + abs(dy) * (h - 1) or 1
+    # the value at the top left corner
+    t0 = 0.5 - (dx * (w - 1) + dy * (h - 1)) / (2 * extent)
+    colormap = array("I")
+    for py in range(h):
+        colormap.extend(palette._row(t0 + py * dy / extent, dx / extent, w))
+    return colormap
+
+def radial_colormap(palette, w, h, *, cx=None, cy=None, radius=None, aspect=1):
+    """Get a colormap of a radial gradient, as an array("I") of packed colors.
+
+    The first color of the palette is at the center (cx, cy), relative to the
+    top left of the w*h rectangle, and the last is at the given radius. By
+    default, the gradient is centered in the rectangle and reaches its
+    corners. Vertical distances are multiplied by aspect, which may be
+    used to correct for the shape of terminal cells (e.g. aspect=2).
+    """
+    if cx is None:
+        cx = (w - 1) / 2
+    if cy is None:
+        cy = (h - 1) / 2
+    if radius is None:
+        radius = math.hypot(max(cx, w - 1 - cx), max(cy, h - 1 - cy) * aspect) or 1
+    scale = 1 / radius
+    dx2 = [((px - cx) * scale) ** 2 for px in range(w)]
+    sqrt = math.sqrt
+    colormap = array("I")
+    for py in range(h):
+        dy2 = ((py - cy) * aspect * scale) ** 2
+        colormap.extend(palette._lookup_many([sqrt(d + dy2) for d in dx2]))
+    return colormap
+
+def fill_linear(target, palette, x, y, w, h, *, angle=0, **kwargs):
+    """Fill a rectangle of a Buffer or Canvas with a linear gradient.
+
+    See linear_colormap(). Other keyword arguments are passed on to
+    termpixels.drawing.draw_colormap() for a Buffer (such as char and dither),
+    or to Canvas.draw_colormap() for a Canvas.
+    """
+    _draw(target, linear_colormap(palette, w, h, angle=angle), x, y, w, h, kwargs)
+
+def fill_radial(target, palette, x, y, w, h, *, cx=None, cy=None, radius=None, aspect=1, **kwargs):
+    """Fill a rectangle of a Buffer or Canvas with a radial gradient.
+
+    See radial_colormap(); other keyword arguments are treated as for
+    fill_linear().
+    """
+    colormap = radial_colormap(palette, w, h, cx=cx, cy=cy, radius=radius, aspect=aspect)
+    _draw(target, colormap, x, y, w, h, kwargs)
@@ -1,38 +1,193 @@
+from bisect import bisect_right
 from collections import defaultdict, deque
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 from queue import Queue, Empty
 from threading import Thread, Lock
+import asyncio
+import inspect
 import sys
 import threading
 import time
 import traceback
+import weakref
 
 _EVENT_HISTORY_LENGTH = 8
 _DEBUG_EVENTS = True
 
-main_event_queue = Queue()
+# used to record the stack cheaply where it is available (i.e. CPython)
+_getframe = getattr(sys, "_getframe", None)
+
+# the lanes of an EventQueue, from the highest priority to the lowest
+LANES = ("input", "timer", "frame", "default", "background")
+
+class EventQueue(Queue):
+    """A Queue of Events, which are dispatched in order of priority.
+
+    Each event is placed in a lane, and events are taken from the lane with 
+    the highest priority that has any (and in the order they were put within
+    each lane). The lanes are:
+        "input" - keyboard and mouse input, and resizes, so that the App stays
+                  responsive when frames are slow to render
+        "timer" - events emitted by an Interval, other than frames
+        "frame" - "frame" events
+        "default" - all other events
+        "background" - events that may wait until everything else is done
+
+    To avoid starving background events while the App is busy, up to 
+    background_budget of them are taken after each "frame" event, ahead of
+    any events other than input.
+
+    The lane of an event is chosen by its name (see set_lane()), then by the
+    lane attribute of the Event, and is otherwise "default".
+
+    Some events are ordered (see set_ordered()): no event that is put after an
+    ordered event is taken before it, whatever its lane. By default, these are
+    the lifecycle events of an App, so that e.g. input is never dispatched
+    before "start". Control events, such as the one put by stop_polling(), are
+    taken ahead of all lanes.
+
+    The queue can also notify its consumer when an event is put. This allows
+    events to be dispatched by something other than a thread blocking on 
+    get(), such as an asyncio event loop (see App.run_async()).
+    """
+
+    def __init__(self, *, background_budget=4):
+        self.background_budget = background_budget
+        self._event_lanes = {"key": "input", "mouse": "input", "resize": "input", "frame": "frame"}
+        self._ordered_events = {"_start", "start", "resize", "before_stop", "_stop", "after_stop", "_exit"}
+        super().__init__()
+        self._waker = None
+        self._dispatcher = None
+        self._stopping = False
+
+    def set_lane(self, event_name, lane):
+        """Put all events with a given name into a lane, or into the default lanes if None."""
+        if lane is None:
+            self._event_lanes.pop(event_name, None)
+            return
+        if lane not in LANES:
+            raise ValueError("Unknown lane: {}".format(lane))
+        self._event_lanes[event_name] = lane
+
+    def set_ordered(self, event_name, ordered=True):
+        """Set whether events put after events with a given name may be taken before them."""
+        if ordered:
+            self._ordered_events.add(event_name)
+        else:
+            self._ordered_events.discard(event_name)
+
+    def lane_size(self, lane):
+        """Get the number of events waiting in a lane."""
+        with self.mutex:
+            return len(self._lanes[lane])
+
+    def set_waker(self, waker):
+        """Set a function to call after each event is put, or None.
+
+        The waker is called from whichever thread put the event, so it must be
+        thread-safe.
+        """
+        self._waker = waker
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        waker = self._waker
+        if waker is not None:
+            waker()
+
+    # Queue calls the following methods with its mutex held
+
+    def _init(self, maxsize):
+        # each lane holds (sequence number, event) pairs
+        self._lanes = {lane: deque() for lane in LANES}
+        self._control = deque()
+        self._background_credit = 0
+        self._sequence = 0
+        # the sequence numbers of ordered events that have not been taken yet
+        self._barriers = deque()
+
+    def _qsize(self):
+        return len(self._control) + sum(len(events) for events in self._lanes.values())
+
+    def _put(self, event):
+        if event is _STOP_POLLING:
+            self._control.append(event)
+            return
+        lane = self._event_lanes.get(event.name) or getattr(event, "lane", None) or "default"
+        self._sequence += 1
+        if event.name in self._ordered_events:
+            self._barriers.append(self._sequence)
+        self._lanes[lane].append((self._sequence, event))
+
+    def _ready(self, lane):
+        """Whether an event can be taken from a lane without passing an ordered event."""
+        events = self._lanes[lane]
+        return bool(events) and (not self._barriers or events[0][0] <= self._barriers[0])
+
+    def _take(self, lane):
+        sequence, event = self._lanes[lane].popleft()
+        if self._barriers and self._barriers[0] == sequence:
+            self._barriers.popleft()
+        return event
+
+    def _get(self):
+        if self._control:
+            return self._control.popleft()
+        if self._ready("input"):
+            return self._take("input")
+        if self._background_credit > 0 and self._ready("background"):
+            self._background_credit -= 1
+            return self._take("background")
+        for lane in ("timer", "frame", "default"):
+            if self._ready(lane):
+                if lane == "frame":
+                    self._background_credit = self.background_budget
+                return self._take(lane)
+        return self._take("background")
+
+main_event_queue = EventQueue()
 
 class Event:
-    def __init__(self, *, source, name, args=[], kwargs={}, track_dispatch=False):
+    __slots__ = ("source", "name", "args", "kwargs", "lane", "_stack", "_dispatched")
+
+    def __init__(self, *, source, name, args=(), kwargs={}, track_dispatch=False, lane=None):
         """
         source - the Observable that emitted this event
         name - the event name
         args - arbitrary positional arguments with which to invoke listeners
         kwargs - arbitrary keyword arguments with which to invoke listeners
         track_dispatch - whether to enable await_dispatched() functionality
+        lane - the lane of an EventQueue in which to place the event, if its
+               name is not assigned to one
         """
         self.source = source
         self.name = name
         self.args = args
         self.kwargs = kwargs
+        self.lane = lane
         
-        if _DEBUG_EVENTS:
-            self._traceback = traceback.format_stack()
-        else:
-            self._traceback = None
+        # only the code and line number of each frame are recorded here; they
+        # are formatted if the traceback is actually needed
+        self._stack = None
+        if _DEBUG_EVENTS and _getframe is not None:
+            stack = []
+            frame = _getframe()
+            while frame is not None:
+                stack.append((frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            self._stack = stack
 
         self._dispatched = None
         if track_dispatch:
             self._dispatched = threading.Event()
+
+    @property
+    def _traceback(self):
+        """The stack where the Event was created, formatted like traceback.format_stack()."""
+        if self._stack is None:
+            return None
+        return traceback.format_list([traceback.FrameSummary(code.co_filename, lineno, code.co_name)
+                                      for code, lineno in reversed(self._stack)])
     
     def __repr__(self):
         return "Event(name='{}', source='{}')".format(self.name, self.source)
@@ -45,6 +200,168 @@ class Event:
         assert self._dispatched is not None
         self._dispatched.wait()
 
+def _weak_ref(listener, callback=None):
+    """Get a weak reference to a listener, which is equal to any other for the same listener."""
+    if inspect.ismethod(listener):
+        return weakref.WeakMethod(listener, callback)
+    return weakref.ref(listener, callback)
+
+class ListenerHandle:
+    """A registered listener, returned by Observable.listen().
+
+    Calling off() unlistens it in constant time.
+    """
+
+    __slots__ = ("_listeners", "_key", "_listener", "_ref", "_active", "__weakref__")
+
+    def __init__(self, listeners, key, listener, weak):
+        self._listeners = listeners
+        self._key = key
+        self._active = True
+        if not weak:
+            self._listener = listener
+            self._ref = None
+            return
+        self._listener = None
+        # unlisten automatically once the listener (or its object) is collected
+        handle_ref = weakref.ref(self)
+        def collected(ref):
+            handle = handle_ref()
+            if handle is not None:
+                handle.off()
+        self._ref = _weak_ref(listener, collected)
+
+    @property
+    def _lookup(self):
+        """The key of this handle in ListenerList._by_listener."""
+        return self._listener if self._ref is None else self._ref
+
+    @property
+    def listener(self):
+        """The listener function, or None if it was weakly referenced and has been collected."""
+        if self._ref is not None:
+            return self._ref()
+        return self._listener
+
+    @property
+    def active(self):
+        """Whether the listener is still registered."""
+        return self._active
+
+    def off(self):
+        """Unlisten the listener. Does nothing if it is no longer registered."""
+        if self._active:
+            self._listeners._remove(self)
+
+class ListenerList:
+    """The listeners registered for one event, in order of priority.
+
+    Listeners are kept sorted by priority, and then in order of registration.
+    A listener is inserted with a binary search and removed by marking its
+    handle inactive, so that neither operation re-sorts or searches the list.
+    Removed handles are compacted away once they make up half of the list.
+
+    Listeners may be added or removed while the event is being dispatched. 
+    Removed listeners are not invoked, and added listeners are first invoked
+    for the next event.
+    """
+
+    def __init__(self):
+        self._handles = []
+        self._keys = []
+        self._by_listener = {}
+        self._pending = []
+        self._removed = 0
+        self._dispatching = 0
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._handles) - self._removed + len(self._pending)
+
+    def __iter__(self):
+        """Iterate over the active listener functions."""
+        for handle in self._handles + self._pending:
+            listener = handle.listener
+            if handle._active and listener is not None:
+                yield listener
+
+    def add(self, listener, priority=0, *, weak=False):
+        """Register a listener and return its ListenerHandle."""
+        self._sequence += 1
+        handle = ListenerHandle(self, (-priority, self._sequence), listener, weak)
+        self._by_listener.setdefault(handle._lookup, []).append(handle)
+        if self._dispatching:
+            self._pending.append(handle)
+        else:
+            self._insert(handle)
+        return handle
+
+    def remove(self, listener):
+        """Unlisten the earliest registration of a listener function."""
+        handles = self._by_listener.get(listener)
+        if not handles:
+            try:
+                handles = self._by_listener.get(_weak_ref(listener))
+            except TypeError:
+                pass
+        if not handles:
+            raise ValueError("listener is not registered")
+        self._remove(handles[0])
+
+    def _insert(self, handle):
+        i = bisect_right(self._keys, handle._key)
+        self._keys.insert(i, handle._key)
+        self._handles.insert(i, handle)
+
+    def _remove(self, handle):
+        handle._active = False
+        lookup = handle._lookup
+        handles = self._by_listener[lookup]
+        handles.remove(handle)
+        if not handles:
+            del self._by_listener[lookup]
+        if handle in self._pending:
+            self._pending.remove(handle)
+            return
+        self._removed += 1
+        if not self._dispatching and self._removed * 2 > len(self._handles):
+            self._compact()
+
+    def _compact(self):
+        self._handles = [h for h in self._handles if h._active]
+        self._keys = [h._key for h in self._handles]
+        self._removed = 0
+
+    def dispatch(self, args, kwargs, queue=None):
+        """Invoke each active listener with the given arguments.
+
+        Errors raised by coroutine listeners are put on queue, if given.
+        """
+        self._dispatching += 1
+        try:
+            # the list of handles is neither reordered nor shortened while
+            # dispatching, so it can be iterated without copying it
+            for handle in self._handles:
+                if not handle._active:
+                    continue
+                listener = handle._listener
+                if listener is None:
+                    listener = handle._ref()
+                    if listener is None:
+                        continue
+                result = listener(*args, **kwargs)
+                if result is not None and inspect.iscoroutine(result):
+                    _run_coroutine(result, queue)
+        finally:
+            self._dispatching -= 1
+            if not self._dispatching:
+                if self._pending:
+                    for handle in self._pending:
+                        self._insert(handle)
+                    self._pending.clear()
+                if self._removed * 2 > len(self._handles):
+                    self._compact()
+
 class Observable:
     """A base class that implements a simple event emitter.
     
@@ -52,24 +369,50 @@ class Observable:
     emitted by providing the event name and an arbitrary data object. All 
     listeners will be synchronously invoked and passed the data object.
     """
-    def __init__(self, queue=main_event_queue):
-        self._listeners = defaultdict(list)
-        self._event_queue = queue
-        self._listener_priority = defaultdict(dict)
+    def __init__(self, queue=None):
+        """
+        queue - the queue to which events are emitted; main_event_queue by 
+                default
+        """
+        self._listeners = defaultdict(ListenerList)
+        self._event_queue = main_event_queue if queue is None else queue
+        self._executor = None
+        self._executor_kind = None
+        self._submitted = set()
+        self._submit_generation = 0
     
-    def listen(self, event_name, listener, *, priority=0):
-        """Register a new event listener for a particular event name."""
-        self._listener_priority[event_name][listener] = priority
-        self._listeners[event_name].append(listener)
-        self._listeners[event_name].sort(reverse=True, key=lambda listener: self._listener_priority[event_name][listener])
+    def listen(self, event_name, listener, *, priority=0, weak=False):
+        """Register a new event listener for a particular event name.
+
+        Listeners with a higher priority are invoked first. If weak is True,
+        only a weak reference to the listener is kept (or to the object of a
+        bound method), and it is unlistened once it is garbage collected.
+
+        Returns a ListenerHandle, which can be used to unlisten it.
+        """
+        return self._listeners[event_name].add(listener, priority, weak=weak)
     
     def unlisten(self, event_name, listener):
         """Remove a particular event listener for a particular event name."""
-        del self._listener_priority[event_name][listener]
         self._listeners[event_name].remove(listener)
     
-    def emit(self, event_name, *args, **kwargs):
-        """Enqueue an event to trigger all relevant listeners with arbitrary data."""
+    def set_event_lane(self, event_name, lane):
+        """Choose the lane of the event queue in which events with a given name are placed.
+
+        The lane applies to events of that name from any Observable using the
+        same queue. See EventQueue for the available lanes.
+        """
+        self._event_queue.set_lane(event_name, lane)
+
+    def emit(self, event_name, *args, sync=False, **kwargs):
+        """Enqueue an event to trigger all relevant listeners with arbitrary data.
+
+        If sync is True, the listeners are instead invoked immediately, in the
+        calling thread, before emit() returns.
+        """
+        if sync:
+            self._listeners[event_name].dispatch(args, kwargs, self._event_queue)
+            return
         self._event_queue.put(Event(source=self, name=event_name, args=args, kwargs=kwargs))
     
     def on(self, event_name, *, priority=0):
@@ -79,28 +422,178 @@ class Observable:
         """
         def decorator(fn):
             def wrapper(*args, **kwargs):
-                fn(*args, **kwargs)
-            wrapper.off = lambda: self.unlisten(event_name, wrapper)
-            self.listen(event_name, wrapper, priority=priority)
+                return fn(*args, **kwargs)
+            wrapper.off = self.listen(event_name, wrapper, priority=priority).off
             return wrapper
         return decorator
 
-    def propagate_event(self, source, event_name):
-        """Create a listener that propagates all events of the given name from another Observable."""
+    def next(self, event_name):
+        """Get an asyncio Future for the next occurrence of an event.
+
+        Must be called with an asyncio event loop running, e.g.:
+            key = await app.next("key")
+        
+        The result is None if the event has no arguments, its argument if it
+        has one, or a tuple of its positional arguments otherwise. The listener
+        is registered immediately, so an event emitted before the Future is
+        awaited is not missed.
+        """
+        loop = _running_loop()
+        if loop is None:
+            raise RuntimeError("no running event loop")
+        future = loop.create_future()
+        # the event may be emitted by another thread before listen() returns,
+        # so whichever of once() and this function comes second removes it
+        lock = Lock()
+        state = {"handle": None, "fired": False}
+        def resolve(result):
+            if not future.done():
+                future.set_result(result)
+        def once(*args, **kwargs):
+            with lock:
+                if state["fired"]:
+                    return
+                state["fired"] = True
+                handle = state["handle"]
+            if handle is not None:
+                handle.off()
+            result = None if not args else args[0] if len(args) == 1 else args
+            loop.call_soon_threadsafe(resolve, result)
+        handle = self.listen(event_name, once)
+        with lock:
+            state["handle"] = handle
+            fired = state["fired"]
+        if fired:
+            handle.off()
+        return future
+
+    def propagate_event(self, source, event_name, *, sync=True):
+        """Create a listener that propagates all events of the given name from another Observable.
+
+        By default, the listeners of this Observable are invoked directly when
+        the event from the source is dispatched, rather than enqueueing a new
+        event (see emit()).
+        """
         def propagate(*args, **kwargs):
-            self.emit(event_name, *args, **kwargs)
+            self.emit(event_name, *args, sync=sync, **kwargs)
         source.listen(event_name, propagate)
     
+    def set_executor(self, executor):
+        """Choose the executor used by submit().
+
+        executor - a concurrent.futures.Executor; "thread" or "process" to 
+                   create a ThreadPoolExecutor or ProcessPoolExecutor for this
+                   Observable when it is first needed; or None to use a thread
+                   pool shared by all Observables (the default)
+        """
+        if isinstance(executor, str) and executor not in _EXECUTOR_CLASSES:
+            raise ValueError("Unknown executor: {}".format(executor))
+        self.cancel_submitted(shutdown=True)
+        self._executor_kind = executor
+
+    def submit(self, fn, *args, event=None, error_event=None, **kwargs):
+        """Call fn(*args, **kwargs) in an executor and emit its result as an event.
+
+        When the call returns, event is emitted with the return value. If it
+        raises, error_event is emitted with the exception instead; if there
+        is no error_event, the exception is raised when the event queue is
+        dispatched, like an exception in a listener. Either event name may be
+        None to emit nothing.
+
+        The executor is chosen with set_executor(). Returns a 
+        concurrent.futures.Future for the call.
+        """
+        executor = self._executor
+        if executor is None:
+            executor = self._executor = _create_executor(self._executor_kind)
+        future = executor.submit(fn, *args, **kwargs)
+        self._submitted.add(future)
+        generation = self._submit_generation
+        future.add_done_callback(lambda future: self._on_submitted_done(future, generation, event, error_event))
+        return future
+
+    def cancel_submitted(self, *, shutdown=False):
+        """Cancel calls made with submit() that have not finished.
+
+        Calls that have not started are cancelled, and no events are emitted 
+        for calls that are already running (which cannot be interrupted, so 
+        the interpreter still waits for them to finish before exiting). If shutdown is True and the 
+        executor was created by this Observable, it is also shut down (a new 
+        one is created if submit() is called again).
+        """
+        self._submit_generation += 1
+        # cancel the pending calls directly rather than through
+        # shutdown(cancel_futures=True), which needs Python 3.9
+        for future in tuple(self._submitted):
+            future.cancel()
+        self._submitted.clear()
+        if shutdown:
+            if self._executor is not None and isinstance(self._executor_kind, str):
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _on_submitted_done(self, future, generation, event, error_event):
+        # called from a thread of the executor
+        self._submitted.discard(future)
+        if future.cancelled() or generation != self._submit_generation:
+            return
+        error = future.exception()
+        if error is None:
+            if event is not None:
+                self.emit(event, future.result())
+        elif error_event is not None:
+            self.emit(error_event, error)
+        else:
+            self._event_queue.put(Event(source=_submit_errors, name="error", args=(error,)))
+
     def create_interval(self, *args, **kwargs):
-        return Interval(*args, **kwargs, source=self)
+        """Create an Interval that emits events from this Observable.
+        
+        If called from a running asyncio event loop, a LoopInterval is created
+        instead, which runs on the loop rather than a thread.
+        """
+        if _running_loop() is None:
+            return Interval(*args, **kwargs, source=self)
+        return LoopInterval(*args, **kwargs, source=self)
+
+_EXECUTOR_CLASSES = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+_shared_executor = None
+_shared_executor_lock = Lock()
+
+def _create_executor(kind):
+    """Get the executor for an executor kind given to Observable.set_executor()."""
+    global _shared_executor
+    if isinstance(kind, Executor):
+        return kind
+    if kind is not None:
+        return _EXECUTOR_CLASSES[kind]()
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            # thread_name_prefix was added in Python 3.6
+            if sys.version_info >= (3, 6):
+                _shared_executor = ThreadPoolExecutor(thread_name_prefix="termpixels submit")
+            else:
+                _shared_executor = ThreadPoolExecutor()
+        return _shared_executor
+
+def _raise_submit_error(error):
+    raise error
+
+# emits the exceptions of submitted calls that have no error_event
+_submit_errors = Observable()
+_submit_errors.listen("error", _raise_submit_error)
 
 class Interval:
     """Emits an event on a fixed interval."""
 
-    def __init__(self, event_name, interval, *, queue=main_event_queue, source, await_dispatched=True, args=[], kwargs={}):
+    def __init__(self, event_name, interval, *, queue=None, source, await_dispatched=True, args=[], kwargs={}):
         """
         interval - the time in seconds between event emits
-        queue - the queue to which the event will be enqueued
+        queue - the queue to which the event will be enqueued, by default the
+                queue of the source
         source - the Observable that will emit the event
         await_dispatched - whether to wait for the emitted event to be dispatched before emitting another
         args - args data to pass to event
@@ -108,7 +601,7 @@ class Interval:
         """
         self.event_name = event_name
         self.interval = interval
-        self.queue = queue
+        self.queue = source._event_queue if queue is None else queue
         self.source = source
         self.args = args
         self.kwargs = kwargs
@@ -129,7 +622,7 @@ class Interval:
             with self._cancelled_lock:
                 if self._cancelled:
                     break
-                event = Event(source=self.source, name=self.event_name, args=self.args, kwargs=self.kwargs, track_dispatch=self._await_dispatched)
+                event = Event(source=self.source, name=self.event_name, args=self.args, kwargs=self.kwargs, track_dispatch=self._await_dispatched, lane="timer")
                 self.queue.put(event)
 
     def start(self):
@@ -150,6 +643,59 @@ class Interval:
         with self._cancelled_lock:
             self._cancelled = True
 
+class LoopInterval:
+    """Emits an event on a fixed interval using the running asyncio event loop.
+
+    Has the same interface as Interval, but schedules each event with 
+    loop.call_at() instead of sleeping in a thread. Since the event is emitted
+    on the loop, it is dispatched before the next one is scheduled (as long as
+    the queue is dispatched on the loop), so events never pile up.
+    """
+
+    def __init__(self, event_name, interval, *, queue=None, source, await_dispatched=True, args=[], kwargs={}):
+        """
+        Arguments are the same as for Interval. queue and await_dispatched are
+        ignored, since the event is emitted by the source on the loop.
+        """
+        self.event_name = event_name
+        self.interval = interval
+        self.source = source
+        self.args = args
+        self.kwargs = kwargs
+        self._handle = None
+        self._cancelled = False
+
+    def _main(self):
+        if self._cancelled:
+            return
+        self.source._event_queue.put(Event(source=self.source, name=self.event_name, args=self.args, kwargs=self.kwargs, lane="timer"))
+        now = self._loop.time()
+        self._deadline += self.interval
+        if self._deadline < now:
+            # fell behind; skip the missed events rather than catching up
+            self._deadline = now + self.interval
+        self._handle = self._loop.call_at(self._deadline, self._main)
+
+    def start(self):
+        """Start emitting the event, first waiting for the specified time to elapse.
+        
+        Return self.
+        """
+        if self._cancelled:
+            raise RuntimeError("Interval cannot be started after cancellation")
+        self._loop = _running_loop()
+        if self._loop is None:
+            raise RuntimeError("no running event loop")
+        self._deadline = self._loop.time() + self.interval
+        self._handle = self._loop.call_at(self._deadline, self._main)
+        return self
+
+    def cancel(self):
+        """Stop emitting the event."""
+        self._cancelled = True
+        if self._handle is not None:
+            self._handle.cancel()
+
 def dump_event_log(events, file=sys.stderr):
     """
     Format and print an iterable of Events and the traceback of the most recent one (if _DEBUG_EVENTS is True).
@@ -179,9 +725,17 @@ def dump_event_log(events, file=sys.stderr):
             print(line, end="", file=file)
     print(file=file)
 
-def poll_events(queue=main_event_queue):
-    """Immediately dispatch (invoke listeners for) all events in a queue."""
+def poll_events(queue=main_event_queue, timeout=0):
+    """Immediately dispatch (invoke listeners for) all events in a queue.
+    
+    If timeout is positive, first wait up to timeout seconds for an event if 
+    the queue is empty.
+    """
     try:
+        if timeout > 0:
+            event = queue.get(timeout=timeout)
+            _dispatch_event(event)
+            queue.task_done()
         while True:
             event = queue.get_nowait()
             _dispatch_event(event)
@@ -193,39 +747,168 @@ def join_event_queue(queue=main_event_queue):
     """Call join() on the queue to wait for event processing."""
     queue.join()
 
-_is_polling = set()
-_is_polling_lock = Lock()
+# put into a queue to stop the daemon polling it, ahead of all other events
+_STOP_POLLING = Event(source=None, name="_stop_polling")
+_polling_lock = Lock()
+
 def start_polling(queue=main_event_queue):
     """Create and start a daemon to continuously poll a queue.
     Will not start a new daemon if one already exists for the given queue.
+    If the daemon is stopping, first waits for it to exit, so that only one
+    daemon dispatches the events of a queue at a time.
 
     If a daemon was started, returns True.
     If a daemon already exists for the given queue, returns False.
     """
-    with _is_polling_lock:
-        if id(queue) in _is_polling:
-            return False
-        _is_polling.add(id(queue))
-    
+    history = deque(maxlen=_EVENT_HISTORY_LENGTH)
+    def dispatch(event):
+        history.append(event)
+        try:
+            _dispatch_event(event)
+        except Exception as e:
+            if _DEBUG_EVENTS:
+                dump_event_log(history)
+            raise e
+        queue.task_done()
+
     def fn():
-        history = deque(maxlen=_EVENT_HISTORY_LENGTH)
         while True:
             event = queue.get()
-            history.append(event)
-            try:
-                _dispatch_event(event)
-            except Exception as e:
-                if _DEBUG_EVENTS:
-                    dump_event_log(history)
-                raise e
+            if event is not _STOP_POLLING:
+                dispatch(event)
+                continue
             queue.task_done()
-    thread = Thread(name="Event loop for queue 0x{:X}".format(id(queue)), target=fn, daemon=True)
+            with _polling_lock:
+                if not queue._stopping:
+                    # start_polling() was called again since the stop
+                    continue
+            # the stop is taken ahead of other events, so dispatch those
+            # that were already queued, but not any that follow
+            for _ in range(queue.qsize()):
+                try:
+                    event = queue.get_nowait()
+                except Empty:
+                    break
+                if event is _STOP_POLLING:
+                    # left by a stop that was then undone
+                    queue.task_done()
+                    continue
+                dispatch(event)
+            with _polling_lock:
+                if queue._stopping:
+                    queue._dispatcher = None
+                    queue._stopping = False
+                    return
+
+    while True:
+        with _polling_lock:
+            # the daemon is recorded on the queue itself, so that each queue 
+            # (e.g. of each App) has its own
+            thread = getattr(queue, "_dispatcher", None)
+            stopping = getattr(queue, "_stopping", False)
+            if thread is None or (stopping and not thread.is_alive()):
+                thread = Thread(name="Event loop for queue 0x{:X}".format(id(queue)), target=fn, daemon=True)
+                queue._dispatcher = thread
+                queue._stopping = False
+                break
+            if not stopping:
+                return False
+            if thread is threading.current_thread():
+                # called by a listener while the daemon stops, so keep polling
+                queue._stopping = False
+                return False
+        thread.join()
     thread.start()
     return True
 
+def stop_polling(queue=main_event_queue):
+    """Stop the daemon polling a queue, once it has dispatched the events already in the queue.
+
+    Returns False if no daemon is polling the queue, or it is already 
+    stopping. Events put into the queue after the daemon has exited are not
+    dispatched; see join_polling().
+    """
+    with _polling_lock:
+        if getattr(queue, "_dispatcher", None) is None or queue._stopping:
+            return False
+        queue._stopping = True
+    queue.put(_STOP_POLLING)
+    return True
+
+def join_polling(queue=main_event_queue, timeout=None):
+    """Wait for the daemon polling a queue to exit after stop_polling().
+
+    Does not wait if called by the daemon itself.
+    """
+    thread = getattr(queue, "_dispatcher", None)
+    if thread is not None and thread is not threading.current_thread():
+        thread.join(timeout)
+
+def _running_loop():
+    """Get the asyncio event loop running in this thread, or None.
+
+    Like asyncio.get_running_loop(), which needs Python 3.7.
+    """
+    get_running_loop = getattr(asyncio, "_get_running_loop", None)
+    if get_running_loop is not None:
+        return get_running_loop()
+    try:
+        loop = asyncio.get_event_loop()
+    except RuntimeError:
+        return None
+    return loop if loop.is_running() else None
+
+# tasks for coroutine listeners, which must be referenced until they are done,
+# mapped to the loops they run on
+_listener_tasks = {}
+# the loop which runs coroutine listeners invoked outside of an event loop
+_coroutine_loop = None
+_coroutine_loop_lock = Lock()
+
+def _get_coroutine_loop():
+    """Get the loop for coroutine listeners, starting its thread if needed."""
+    global _coroutine_loop
+    with _coroutine_loop_lock:
+        if _coroutine_loop is None:
+            _coroutine_loop = asyncio.new_event_loop()
+            Thread(target=_coroutine_loop.run_forever, name="Coroutine listeners",
+                   daemon=True).start()
+        return _coroutine_loop
+
+def _run_coroutine(coroutine, queue=None):
+    """Run a coroutine returned by a listener.
+
+    If an asyncio event loop is running in this thread, the coroutine is
+    scheduled as a task on it. Otherwise, it is scheduled on a loop running in
+    a background thread, so that it does not hold up the dispatch of events.
+    An exception raised by the coroutine is put on queue as an error event.
+    """
+    loop = _running_loop()
+    if loop is not None:
+        _start_listener_task(coroutine, loop, queue)
+    else:
+        loop = _get_coroutine_loop()
+        loop.call_soon_threadsafe(_start_listener_task, coroutine, loop, queue)
+
+def _start_listener_task(coroutine, loop, queue):
+    task = asyncio.ensure_future(coroutine, loop=loop)
+    _listener_tasks[task] = loop
+    def done(task):
+        _listener_tasks.pop(task, None)
+        if task.cancelled() or task.exception() is None or queue is None:
+            return
+        queue.put(Event(source=_submit_errors, name="error", args=(task.exception(),)))
+    task.add_done_callback(done)
+
+def cancel_listener_tasks(loop):
+    """Cancel the tasks of coroutine listeners still running on an event loop."""
+    for task, task_loop in tuple(_listener_tasks.items()):
+        if task_loop is loop:
+            task.cancel()
+
 def _dispatch_event(event):
     """Invoke all listeners with a given Event instance."""
-    for listener in event.source._listeners[event.name]:
-        listener(*event.args, **event.kwargs)
+    event.source._listeners[event.name].dispatch(event.args, event.kwargs,
+                                                 event.source._event_queue)
     if event._dispatched is not None:
         event._dispatched.set()
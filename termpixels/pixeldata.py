@@ -7,6 +7,8 @@ class ImmutablePixelData:
     Used internally by Screen.
     """
 
+    __slots__ = ("_hash", "_char", "_fg", "_bg", "_row_version")
+
     def __init__(self, *, fg=Color(255, 255, 255), bg=Color(0, 0, 0), char=" "):
         if len(char) != 1:
             raise Exception("Character must have length 1")
@@ -14,6 +16,9 @@ class ImmutablePixelData:
         self._char = char
         self._fg = fg
         self._bg = bg
+        # a one-element list shared by every pixel in a Buffer row, holding a
+        # counter that is incremented whenever one of those pixels changes.
+        self._row_version = None
     
     @property
     def char(self):
@@ -44,6 +49,8 @@ class ImmutablePixelData:
         return self._hash
 
 class PixelData(ImmutablePixelData):
+    __slots__ = ()
+
     @property
     def char(self):
         return self._char
@@ -62,23 +69,29 @@ class PixelData(ImmutablePixelData):
             raise Exception("Character must have length 1")
         if self._char != char:
             self._char = char
-            self._hash = None
+            self._changed()
 
     @fg.setter
     def fg(self, value):
         if self._fg != value:
             self._fg = value
-            self._hash = None
+            self._changed()
 
     @bg.setter
     def bg(self, value):
         if self._bg != value:
             self._bg = value
-            self._hash = None
+            self._changed()
     
     def set(self, pixel):
-        self._fg = pixel._fg
-        self._bg = pixel._bg
-        self._char = pixel._char
-        self._hash = None
+        if self._char != pixel._char or self._fg != pixel._fg or self._bg != pixel._bg:
+            self._fg = pixel._fg
+            self._bg = pixel._bg
+            self._char = pixel._char
+            self._changed()
         return self
+
+    def _changed(self):
+        self._hash = None
+        if self._row_version is not None:
+            self._row_version[0] += 1
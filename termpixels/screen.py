@@ -1,7 +1,28 @@
+from array import array
 from termpixels.buffer import Buffer, PixelData
+from termpixels.stylebuffer import StyleBuffer
 from termpixels.util import terminal_char_len
 from time import perf_counter
 
+# number of distinct vertical shifts considered when detecting scrolling
+_SCROLL_CANDIDATES = 3
+
+# rough sizes in bytes of escape sequences, used to choose how to render
+_CUP_BYTES = 8
+_CLEAR_BYTES = 8
+_ERASE_BYTES = 3
+
+# longest run of unchanged pixels that is re-drawn instead of moving the cursor
+_MERGE_GAP = 4
+# shortest run of identical pixels rendered with an erase or repeat sequence
+_RUN_MIN = 4
+# shortest run of blank pixels in the middle of a row that is erased, which
+# must also pay for moving the cursor past the erased pixels
+_ERASE_CHARS_MIN = 12
+
+# value used in the caches of a StyleScreen for pixels with unknown contents
+_UNKNOWN = 0xFFFFFFFF
+
 class Screen(Buffer):
     """Provides a pixel-like terminal abstraction. 
 
@@ -24,15 +45,34 @@ class Screen(Buffer):
     position the cursor for aesthetic purposes.
     """
 
-    def __init__(self, backend, input):
+    def __init__(self, backend, input=None):
+        """
+        backend - the backend to which the screen is rendered
+        input - if given, the screen is resized when it emits a "resize" event
+        """
         self.backend = backend
         super().__init__(backend.size[0], backend.size[1])
-        input.listen("resize", lambda: self.resize(backend.size[0], backend.size[1]))    
+        if input is not None:
+            input.listen("resize", lambda: self.resize(backend.size[0], backend.size[1]))    
+        # allow backends such as BroadcastBackend to redraw the whole screen
+        attach_screen = getattr(backend, "attach_screen", None)
+        if attach_screen is not None:
+            attach_screen(self)
         self._update_count = 0
         self._update_duration = 0
 
     def resize(self, *args, **kwargs):
         super().resize(*args, **kwargs)
+        self.invalidate()
+
+    def invalidate(self):
+        """Make the next update() redraw every pixel, e.g. after the terminal was cleared."""
+        self._reset_cache()
+        self._row_hash_cache = [None] * self.h
+        self._row_version_cache = [None] * self.h
+
+    def _reset_cache(self):
+        """Mark the rendered contents of every pixel as unknown."""
         self._pixels_cache = [[PixelData(fg=None, bg=None, char=" ") 
                                for y in range(self.h)] for x in range(self.w)]
 
@@ -46,7 +86,7 @@ class Screen(Buffer):
         """Set whether the cursor is visible."""
         self.backend.show_cursor = show
 
-    def update(self):
+    def update(self, x=0, y=0, w=None, h=None, *, regions=None):
         """Commit the changes in the screen buffer to the backend (terminal).
 
         Determines which pixels (characters) have been modified from their 
@@ -58,31 +98,416 @@ class Screen(Buffer):
         re-rendered. This means that it is reasonable to clear and re-render
         the entire screen whenever you make an update, if it seems too
         challenging to manually make only the necessary changes.
+
+        By default, the whole screen is updated. A rectangular region can be 
+        given by x, y, w and h, where w and h default to extending to the right
+        and bottom edges of the screen. Alternatively, regions may be a list of
+        (x, y, w, h) tuples, all of which are updated and then flushed together.
+        Changes outside of the updated regions are kept and will be rendered by
+        a later update that covers them, so that parts of the screen can be 
+        committed at different rates.
+
+        If the contents of a range of rows have moved vertically since the last
+        update (as when new lines are added to the bottom of a log), and the
+        backend supports scrolling, the terminal is told to scroll those rows
+        so that only the newly exposed rows need to be re-drawn. This is only
+        done for regions spanning the full width of the screen.
+
+        Rows that have not been modified since they were last rendered are
+        skipped entirely, by comparing the row_version() of each row with the
+        version that was last rendered.
         """
         t0 = perf_counter()
         self._update_count = 0
-        for y in range(self.h):
-            for x in range(self.w):
-                pixel = self.at_unsafe(x, y)
-                if pixel != self._pixels_cache[x][y]:
-                    self._pixels_cache[x][y].set(pixel)
-                    self._update_count += 1
-
-                    # don't render a pixel shadowed by a fullwidth character
-                    if x > 0 and terminal_char_len(self.at_unsafe(x-1, y).char) > 1:
-                        continue
-                    self.render(pixel, x, y)
-                
+        if regions is None:
+            regions = [(x, y, self.w - x if w is None else w, self.h - y if h is None else h)]
+        for region in regions:
+            self._update_region(*region)
         self.backend.cursor_pos = self.cursor_pos
         self.backend.flush()
         self._update_duration = perf_counter() - t0
+
+    def _update_region(self, x, y, w, h):
+        """Render the changes within a rectangle without flushing the backend."""
+        x0, x1 = max(0, x), min(self.w, x + w)
+        y0, y1 = max(0, y), min(self.h, y + h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        full_width = x0 == 0 and x1 == self.w
+
+        versions = [self.row_version(y) for y in range(self.h)]
+        if full_width:
+            row_hashes = list(self._row_hash_cache)
+            for y in range(y0, y1):
+                if versions[y] != self._row_version_cache[y]:
+                    row_hashes[y] = self._row_hash(y)
+            self._scroll_shifted_rows(row_hashes, y0, y1)
+            self._row_hash_cache = row_hashes
+
+        changed_rows = []
+        changed_count = 0
+        for y in range(y0, y1):
+            if versions[y] == self._row_version_cache[y]:
+                continue
+            if full_width:
+                self._row_version_cache[y] = versions[y]
+            changed = self._diff_row(y, x0, x1)
+            if changed:
+                changed_rows.append((y, changed))
+                changed_count += len(changed)
+                if not full_width:
+                    # the row is only partially rendered
+                    self._row_hash_cache[y] = None
+        self._update_count += changed_count
+
+        full_screen = full_width and y0 == 0 and y1 == self.h
+        if full_screen and changed_count * 2 > self.w * self.h and self._repaint(changed_rows):
+            return
+        for y, changed in changed_rows:
+            self._render_row(y, changed, x1)
+
+    def _diff_row(self, y, x0, x1):
+        """Find the pixels of a row that differ from the cache and update it.
+
+        Returns a sorted list of the x coordinates of the changed pixels 
+        between x0 (inclusive) and x1 (exclusive).
+        """
+        changed = []
+        for x in range(x0, x1):
+            pixel = self.at_unsafe(x, y)
+            if pixel != self._pixels_cache[x][y]:
+                self._pixels_cache[x][y].set(pixel)
+                changed.append(x)
+        return changed
+
+    def _repaint(self, changed_rows):
+        """Clear the terminal and redraw the screen if it is cheaper than a diff.
+
+        changed_rows is a list of (y, changed) tuples describing the diff, as 
+        passed to _render_row(). Should only be called once the cache matches
+        the buffer. The most 
+        common blank pixel at the end of a row is used to clear the terminal,
+        after which only the pixels that differ from it need to be drawn. 
+        Returns whether the screen was repainted.
+        """
+        if not getattr(self.backend, "can_erase", False):
+            return False
+        candidates = {}
+        for y in range(self.h):
+            pixel = self.at_unsafe(self.w - 1, y)
+            if pixel.char == " ":
+                candidates[pixel] = candidates.get(pixel, 0) + 1
+        if not candidates:
+            return False
+        blank = max(candidates, key=candidates.get)
+
+        rows = []
+        cost = _CLEAR_BYTES
+        for y in range(self.h):
+            row = [x for x in range(self.w) if self.at_unsafe(x, y) != blank]
+            if row:
+                rows.append((y, row))
+                cost += _CUP_BYTES + len(row)
+        diff_cost = sum(_CUP_BYTES + len(changed) for y, changed in changed_rows)
+        if cost >= diff_cost:
+            return False
+
+        self._apply_style(blank)
+        self.backend.clear_screen()
+        for y, row in rows:
+            self._render_row(y, row, self.w)
+        return True
+
+    def _render_row(self, y, changed, x_end):
+        """Render the changed pixels of a row.
+
+        changed is a sorted list of the x coordinates of pixels that must be 
+        drawn, and x_end is the right edge (exclusive) of the region being 
+        updated. The pixels are grouped into spans which are rendered without
+        moving the cursor. Nearby spans are joined if re-drawing the unchanged
+        pixels between them is cheaper than moving the cursor, and the whole 
+        rest of the row is drawn as one span if that is estimated to be 
+        cheaper than the individual spans.
+        """
+        spans = []
+        start = changed[0]
+        end = start + 1
+        for x in changed[1:]:
+            if x - end <= _MERGE_GAP and self._same_style(end - 1, x, y):
+                end = x + 1
+            else:
+                spans.append((start, end))
+                start = x
+                end = x + 1
+        spans.append((start, end))
+
+        if len(spans) > 1 and x_end == self.w:
+            start = spans[0][0]
+            diff_cost = sum(_CUP_BYTES + e - s for s, e in spans)
+            full_cost = _CUP_BYTES + self.w - start
+            if getattr(self.backend, "can_erase", False) and self.at_unsafe(self.w - 1, y).char == " ":
+                # the trailing blank pixels will be erased with one sequence
+                full_cost = _CUP_BYTES + max(0, self._trailing_run_start(y) - start) + _ERASE_BYTES
+            if full_cost < diff_cost:
+                spans = [(start, self.w)]
+
+        for start, end in spans:
+            self._render_span(y, start, end)
+
+    def _render_span(self, y, start, end):
+        """Render the pixels from start to end (exclusive) of a row.
+
+        Runs of identical pixels are rendered using erase or repeat sequences 
+        where the backend supports them.
+        """
+        can_erase = getattr(self.backend, "can_erase", False)
+        can_repeat = getattr(self.backend, "can_repeat", False)
+        x = start
+        while x < end:
+            pixel = self.at_unsafe(x, y)
+            # don't render a pixel shadowed by a fullwidth character
+            if x > 0 and terminal_char_len(self.at_unsafe(x-1, y).char) > 1:
+                x += 1
+                continue
+            
+            n = self._run_length(x, y, end)
+            if n >= _RUN_MIN and terminal_char_len(pixel.char) == 1:
+                if pixel.char == " " and can_erase:
+                    if end == self.w and x + n == self.w:
+                        self._set_style(pixel, x, y)
+                        self.backend.erase_line()
+                        x += n
+                        continue
+                    if n >= _ERASE_CHARS_MIN:
+                        self._set_style(pixel, x, y)
+                        self.backend.erase_chars(n)
+                        x += n
+                        continue
+                if can_repeat and ord(pixel.char) < 128:
+                    self._set_style(pixel, x, y)
+                    self.backend.repeat(pixel.char, n)
+                    x += n
+                    continue
+            
+            for i in range(n):
+                self.render(self.at_unsafe(x + i, y), x + i, y)
+            x += n
+
+    def _run_length(self, x, y, end):
+        """Count the identical pixels in a row starting at x, stopping at end."""
+        pixel = self.at_unsafe(x, y)
+        n = 1
+        while x + n < end and self.at_unsafe(x + n, y) == pixel:
+            n += 1
+        return n
+
+    def _trailing_run_start(self, y):
+        """Find the start of the run of identical pixels at the end of a row."""
+        last = self.at_unsafe(self.w - 1, y)
+        x = self.w - 1
+        while x > 0 and self.at_unsafe(x - 1, y) == last:
+            x -= 1
+        return x
+
+    def _same_style(self, x0, x1, y):
+        """Check whether the pixels from x0 to x1 (inclusive) share colors."""
+        first = self.at_unsafe(x0, y)
+        for x in range(x0 + 1, x1 + 1):
+            pixel = self.at_unsafe(x, y)
+            if pixel.fg != first.fg or pixel.bg != first.bg or terminal_char_len(pixel.char) != 1:
+                return False
+        return True
+
+    def _set_style(self, pixel, x, y):
+        self.backend.cursor_pos = (x, y)
+        self._apply_style(pixel)
+
+    def _apply_style(self, pixel):
+        self.backend.fg = pixel.fg
+        self.backend.bg = pixel.bg
     
+    def _row_hash(self, y):
+        return hash(tuple(column[y] for column in self._pixels))
+
+    def _scroll_shifted_rows(self, row_hashes, y0, y1):
+        """Scroll the terminal if a range of rows has moved since the last update.
+
+        Only rows from y0 (inclusive) to y1 (exclusive) are considered.
+        Candidate shifts are found by looking up the hash of each changed row
+        among the hashes of the previously rendered rows. For each candidate, 
+        the longest run of rows that would be correct after scrolling is found,
+        and the best run is used if it saves more rows than scrolling exposes.
+        The cache is shifted to match the terminal contents afterwards.
+        """
+        scroll = getattr(self.backend, "scroll", None)
+        old_hashes = self._row_hash_cache
+        if scroll is None or y1 - y0 < 2:
+            return
+
+        old_rows = {}
+        for y in range(y0, y1):
+            old_rows.setdefault(old_hashes[y], y)
+        votes = {}
+        for y in range(y0, y1):
+            row_hash = row_hashes[y]
+            if row_hash != old_hashes[y] and row_hash in old_rows:
+                shift = old_rows[row_hash] - y
+                votes[shift] = votes.get(shift, 0) + 1
+        if not votes:
+            return
+
+        best = None
+        candidates = sorted(votes, key=votes.get, reverse=True)[:_SCROLL_CANDIDATES]
+        for shift in candidates:
+            run_start = None
+            saved = 0
+            end = min(y1, y1 - shift)
+            for y in range(max(y0, y0 - shift), end + 1):
+                matches = (y < end
+                           and row_hashes[y] == old_hashes[y + shift]
+                           and self._rows_equal(y, y + shift))
+                if matches:
+                    if run_start is None:
+                        run_start = y
+                        saved = 0
+                    if row_hashes[y] != old_hashes[y]:
+                        saved += 1
+                elif run_start is not None:
+                    benefit = saved - abs(shift)
+                    if benefit > 0 and (best is None or benefit > best[0]):
+                        best = (benefit, shift, run_start, y - 1)
+                    run_start = None
+        if best is None:
+            return
+
+        _, shift, a, b = best
+        if shift > 0:
+            top, bottom = a, b + shift
+            exposed = range(b + 1, bottom + 1)
+        else:
+            top, bottom = a + shift, b
+            exposed = range(top, a)
+        if not scroll(top, bottom, shift):
+            return
+        self._shift_cache(a, b, shift, exposed)
+        for y in exposed:
+            self._row_version_cache[y] = None
+
+    def _shift_cache(self, a, b, shift, exposed):
+        """Move rows a+shift to b+shift of the cache to rows a to b.
+
+        The rows in exposed are marked as unknown.
+        """
+        for column in self._pixels_cache:
+            moved = column[a + shift:b + shift + 1]
+            column[a:b + 1] = moved
+            for y in exposed:
+                column[y] = PixelData(fg=None, bg=None, char=" ")
+
+    def _rows_equal(self, y, cache_y):
+        """Check whether row y of the buffer matches row cache_y of the cache."""
+        for x in range(self.w):
+            if self.at_unsafe(x, y) != self._pixels_cache[x][cache_y]:
+                return False
+        return True
+
     def render(self, pixel, x, y):
         """Use the backend to redraw a particular PixelData instance.
         
         This is called internally by update() and generally should not be used.
         """
-        self.backend.cursor_pos = (x, y)
-        self.backend.fg = pixel.fg
-        self.backend.bg = pixel.bg
+        self._set_style(pixel, x, y)
         self.backend.write(pixel.char)
+
+class StyleScreen(Screen, StyleBuffer):
+    """A Screen that stores its contents like a StyleBuffer.
+
+    Diffing compares the code points and style IDs of each row rather than
+    PixelData instances, and unchanged rows are detected with a single array
+    comparison. Text attributes (see termpixels.style) are rendered if the 
+    backend has a set_style() method, which is also expected to cache the 
+    escape sequence for each style. Otherwise, only the colors are rendered.
+
+    StyleBuffers created with the styles of a StyleScreen can be blitted to it
+    without looking up any styles:
+        StyleBuffer(w, h, styles=screen.styles)
+    """
+
+    def _style_refs(self):
+        # the rendered IDs must not be reused until they are rendered over
+        return super()._style_refs() + self._style_ids_cache
+
+    def update(self, *args, **kwargs):
+        """Commit the changes in the screen buffer to the backend; see Screen.update().
+
+        IDs of styles that are no longer used are freed first, if the style
+        table has grown enough (see StyleTable.maybe_collect()).
+        """
+        self.styles.maybe_collect()
+        super().update(*args, **kwargs)
+
+    def _reset_cache(self):
+        unknown = array("I", [_UNKNOWN]) * self.w
+        self._chars_cache = [array("I", unknown) for y in range(self.h)]
+        self._style_ids_cache = [array("I", unknown) for y in range(self.h)]
+
+    def _diff_row(self, y, x0, x1):
+        chars = self._chars[y]
+        style_ids = self._style_ids[y]
+        chars_cache = self._chars_cache[y]
+        style_ids_cache = self._style_ids_cache[y]
+        if chars[x0:x1] == chars_cache[x0:x1] and style_ids[x0:x1] == style_ids_cache[x0:x1]:
+            return []
+        changed = [x for x in range(x0, x1) 
+                   if chars[x] != chars_cache[x] or style_ids[x] != style_ids_cache[x]]
+        chars_cache[x0:x1] = chars[x0:x1]
+        style_ids_cache[x0:x1] = style_ids[x0:x1]
+        return changed
+
+    def _row_hash(self, y):
+        return hash((self._chars[y].tobytes(), self._style_ids[y].tobytes()))
+
+    def _rows_equal(self, y, cache_y):
+        return (self._chars[y] == self._chars_cache[cache_y] 
+                and self._style_ids[y] == self._style_ids_cache[cache_y])
+
+    def _shift_cache(self, a, b, shift, exposed):
+        for cache in (self._chars_cache, self._style_ids_cache):
+            cache[a:b + 1] = cache[a + shift:b + shift + 1]
+            for y in exposed:
+                cache[y] = array("I", [_UNKNOWN]) * self.w
+
+    def _apply_style(self, pixel):
+        style = pixel.style
+        set_style = getattr(self.backend, "set_style", None)
+        if set_style is not None:
+            set_style(style)
+        else:
+            self.backend.fg = style.fg
+            self.backend.bg = style.bg
+
+    def _run_length(self, x, y, end):
+        chars = self._chars[y]
+        style_ids = self._style_ids[y]
+        char = chars[x]
+        style_id = style_ids[x]
+        n = 1
+        while x + n < end and chars[x + n] == char and style_ids[x + n] == style_id:
+            n += 1
+        return n
+
+    def _trailing_run_start(self, y):
+        chars = self._chars[y]
+        style_ids = self._style_ids[y]
+        x = self.w - 1
+        while x > 0 and chars[x - 1] == chars[x] and style_ids[x - 1] == style_ids[x]:
+            x -= 1
+        return x
+
+    def _same_style(self, x0, x1, y):
+        chars = self._chars[y]
+        style_ids = self._style_ids[y]
+        for x in range(x0 + 1, x1 + 1):
+            if style_ids[x] != style_ids[x0] or terminal_char_len(chr(chars[x])) != 1:
+                return False
+        return True
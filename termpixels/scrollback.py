@@ -0,0 +1,251 @@
+from termpixels.buffer import Buffer
+from termpixels.color import Color
+from termpixels.pixeldata import ImmutablePixelData
+from termpixels.util import terminal_char_len, splitlines_print
+
+# marks a viewport row whose contents are unknown and must be redrawn
+_STALE = object()
+
+def _wrap_rows(text, w):
+    """Split a single line of text into rows no wider than w terminal cells.
+
+    Always returns at least one (possibly empty) row. Characters that take up
+    no space in the terminal are dropped.
+    """
+    rows = []
+    row_start = 0
+    col = 0
+    for i, ch in enumerate(text):
+        ch_len = terminal_char_len(ch)
+        if not ch_len:
+            continue
+        if col + ch_len > w and col > 0:
+            rows.append(text[row_start:i])
+            row_start = i
+            col = 0
+        col += ch_len
+    rows.append(text[row_start:])
+    return rows
+
+class ScrollbackBuffer(Buffer):
+    """A Buffer that displays a viewport into a bounded history of text lines.
+
+    Lines are appended with append() (or log()) and stored in a fixed-capacity
+    ring. Once the capacity is reached, appending a line discards the oldest
+    one. Both operations are O(1). Each line is wrapped to the width of the
+    buffer and an index from lines to wrapped rows is maintained, so that the
+    viewport can be located in O(log n) time.
+
+    The width and height of the buffer are the dimensions of the viewport. The
+    viewport shows the wrapped rows starting at scroll_y. While follow is
+    enabled, the viewport is kept scrolled to the most recent line.
+
+    The contents of the viewport are rendered lazily, and only rows whose
+    contents have changed since the last render are redrawn, so blitting a
+    ScrollbackBuffer costs the same regardless of how many lines it holds.
+    Drawing directly into a ScrollbackBuffer is possible, but the drawing only
+    lasts until the viewport is next rendered (after lines are appended, the
+    viewport scrolls or the buffer is resized), when the rows that were drawn
+    over are redrawn.
+    """
+
+    def __init__(self, w, h, *, capacity=1000):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self._capacity = capacity
+        self._follow = True
+        self._scroll_y = 0
+        self.clear()
+        super().__init__(w, h)
+
+    @property
+    def capacity(self):
+        """Get the maximum number of lines retained."""
+        return self._capacity
+
+    @property
+    def line_count(self):
+        """Get the number of lines currently retained."""
+        return self._count
+
+    @property
+    def row_count(self):
+        """Get the total number of wrapped rows for the retained lines."""
+        if self._count == 0:
+            return 0
+        last = self._physical(self._count - 1)
+        return self._row_start[last] + len(self._rows[last]) - self._row_start[self._head]
+
+    @property
+    def follow(self):
+        """Get whether the viewport follows the most recent line."""
+        return self._follow
+
+    @follow.setter
+    def follow(self, follow):
+        self._follow = follow
+        if follow:
+            self._scroll_to(self._max_scroll())
+
+    @property
+    def scroll_y(self):
+        """Get the index of the first wrapped row in the viewport."""
+        return self._scroll_y
+
+    @scroll_y.setter
+    def scroll_y(self, scroll_y):
+        """Scroll the viewport, enabling follow only if it ends up at the bottom."""
+        self._scroll_to(scroll_y)
+        self._follow = self._scroll_y >= self._max_scroll()
+
+    def scroll(self, dy):
+        """Scroll the viewport by dy rows (positive values scroll down)."""
+        self.scroll_y = self._scroll_y + dy
+
+    def resize(self, w, h):
+        """Resize the viewport, re-wrapping all lines if the width changed."""
+        rewrap = w != self._w
+        super().resize(w, h)
+        self._row_keys = [_STALE] * h
+        if rewrap:
+            total = 0
+            for i in range(self._count):
+                p = self._physical(i)
+                self._rows[p] = _wrap_rows(self._lines[p][0], w)
+                self._row_start[p] = total
+                total += len(self._rows[p])
+        self._scroll_to(self._max_scroll() if self._follow else self._scroll_y)
+        self._dirty = True
+
+    def clear(self, *, fg=Color(255,255,255), bg=Color(0,0,0), char=" "):
+        """Discard all lines and set the attributes of empty space."""
+        self._clear_pixel = ImmutablePixelData(fg=fg, bg=bg, char=char)
+        self._lines = [None] * self._capacity
+        self._rows = [None] * self._capacity
+        self._row_start = [0] * self._capacity
+        self._head = 0
+        self._count = 0
+        self._first_serial = 0
+        self._row_keys = [_STALE] * getattr(self, "_h", 0)
+        self._scroll_y = 0
+        self._dirty = True
+
+    def append(self, text, *, fg=None, bg=None):
+        """Append one or more lines of text.
+
+        Text containing newlines is split into multiple lines. If fg or bg is
+        not specified, the corresponding attribute of empty space is used.
+        """
+        for line in splitlines_print(text.replace("\t", "    ")):
+            self._append_line(line, fg, bg)
+        if self._follow:
+            self._scroll_to(self._max_scroll())
+        self._dirty = True
+
+    def log(self, text, **kwargs):
+        """Alias of append()."""
+        self.append(text, **kwargs)
+
+    def line_at_row(self, row):
+        """Find the line containing a wrapped row.
+
+        Returns a tuple (line, subrow) where line is an index into the retained
+        lines (0 is the oldest) and subrow is the index of the row within that
+        line's wrapped rows. Returns None if row is out of range.
+        """
+        if row < 0 or self._count == 0:
+            return None
+        target = self._row_start[self._head] + row
+        lo, hi = 0, self._count
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self._row_start[self._physical(mid)] <= target:
+                lo = mid
+            else:
+                hi = mid
+        p = self._physical(lo)
+        subrow = target - self._row_start[p]
+        if subrow >= len(self._rows[p]):
+            return None
+        return lo, subrow
+
+    def line(self, index):
+        """Get the text of a retained line (0 is the oldest)."""
+        if index < 0 or index >= self._count:
+            raise IndexError("line index {} out of range".format(index))
+        return self._lines[self._physical(index)][0]
+
+    def at_unsafe(self, x, y, *, mutable=True):
+        if self._dirty:
+            self._render()
+        return super().at_unsafe(x, y, mutable=mutable)
+
+    def blit_to(self, buffer, x=0, y=0, x0=0, y0=0, x1=None, y1=None):
+        """Render the viewport and copy it to another buffer."""
+        if self._dirty:
+            self._render()
+        return super().blit_to(buffer, x=x, y=y, x0=x0, y0=y0, x1=x1, y1=y1)
+
+    def _physical(self, index):
+        return (self._head + index) % self._capacity
+
+    def _max_scroll(self):
+        return max(0, self.row_count - self._h)
+
+    def _scroll_to(self, scroll_y):
+        self._scroll_y = max(0, min(self._max_scroll(), scroll_y))
+        self._dirty = True
+
+    def _append_line(self, text, fg, bg):
+        if self._count == self._capacity:
+            # overwrite the oldest line
+            p = self._head
+            self._head = (self._head + 1) % self._capacity
+            self._first_serial += 1
+            # keep the viewport on the same rows
+            self._scroll_y = max(0, self._scroll_y - len(self._rows[p]))
+        else:
+            p = self._physical(self._count)
+            self._count += 1
+
+        row_start = 0
+        if p != self._head:
+            prev = (p - 1) % self._capacity
+            row_start = self._row_start[prev] + len(self._rows[prev])
+        self._lines[p] = (text, fg, bg)
+        self._rows[p] = _wrap_rows(text, self._w)
+        self._row_start[p] = row_start
+
+    def _render(self):
+        """Redraw the rows of the viewport whose contents have changed."""
+        self._dirty = False
+        blank = self._clear_pixel
+        location = self.line_at_row(self._scroll_y)
+        for y in range(self._h):
+            key = None
+            if location is not None:
+                line, subrow = location
+                key = (self._first_serial + line, subrow)
+            # the version of the row also changes if it was drawn over
+            if (key, self.row_version(y)) != self._row_keys[y]:
+                for x in range(self._w):
+                    self._pixels[x][y].set(blank)
+                if location is not None:
+                    p = self._physical(line)
+                    _, fg, bg = self._lines[p]
+                    x = 0
+                    for ch in self._rows[p][subrow]:
+                        ch_len = terminal_char_len(ch)
+                        if ch_len:
+                            x += self.put_char(ch, x, y, fg=fg, bg=bg)
+                self._row_keys[y] = (key, self.row_version(y))
+
+            # advance to the next wrapped row
+            if location is not None:
+                line, subrow = location
+                if subrow + 1 < len(self._rows[self._physical(line)]):
+                    location = (line, subrow + 1)
+                elif line + 1 < self._count:
+                    location = (line + 1, 0)
+                else:
+                    location = None
@@ -26,6 +26,7 @@ class SparseBuffer(Buffer):
     def resize(self, w, h):
         self._w = w
         self._h = h
+        self._extend_row_versions(h)
 
     def extend_to(self, w=0, h=0):
         """Extend the bounds of the SparseBuffer.
@@ -35,6 +36,14 @@ class SparseBuffer(Buffer):
         """
         self._w = max(w, self._w)
         self._h = max(h, self._h)
+        self._extend_row_versions(self._h)
+
+    def _extend_row_versions(self, h):
+        # the counters are kept when shrinking, since the pixels that have
+        # been accessed keep a reference to the counter of their row
+        versions = self._row_versions
+        if len(versions) < h:
+            versions.extend([0] for y in range(len(versions), h))
     
     def in_bounds(self, x, y):
         if not self.bounded:
@@ -51,7 +60,11 @@ class SparseBuffer(Buffer):
         if y not in self._data[x]:
             if not mutable:
                 return self._clear_pixel
-            self._data[x][y] = PixelData().set(self._clear_pixel)
+            pixel = PixelData().set(self._clear_pixel)
+            # an unbounded buffer may be accessed below its height
+            self._extend_row_versions(y + 1)
+            pixel._row_version = self._row_versions[y]
+            self._data[x][y] = pixel
             self._pixel_count += 1
         return self._data[x][y]
     
@@ -78,3 +91,5 @@ class SparseBuffer(Buffer):
         self._clear_pixel = ImmutablePixelData(fg=fg, bg=bg, char=char)
         self._data = defaultdict(lambda: {})
         self._pixel_count = 0
+        for version in self._row_versions:
+            version[0] += 1
@@ -0,0 +1,158 @@
+import weakref
+from termpixels.color import Color
+
+# text attributes, which may be combined with bitwise or
+BOLD = 1 << 0
+DIM = 1 << 1
+ITALIC = 1 << 2
+UNDERLINE = 1 << 3
+BLINK = 1 << 4
+REVERSE = 1 << 5
+STRIKETHROUGH = 1 << 6
+
+# SGR parameter used to enable each attribute
+_SGR_CODES = (
+    (BOLD, 1),
+    (DIM, 2),
+    (ITALIC, 3),
+    (UNDERLINE, 4),
+    (BLINK, 5),
+    (REVERSE, 7),
+    (STRIKETHROUGH, 9),
+)
+
+# a StyleTable does not reuse IDs until it holds at least this many styles
+_COLLECT_MIN = 256
+
+def sgr_attrs(attrs):
+    """Get the SGR parameters (e.g. "1;4") that enable a set of attributes."""
+    return ";".join(str(code) for flag, code in _SGR_CODES if attrs & flag)
+
+class Style:
+    """Represents an immutable combination of colors and text attributes.
+
+    attrs is a bitwise combination of the attribute constants in this module,
+    such as BOLD | UNDERLINE.
+    """
+
+    __slots__ = ("_fg", "_bg", "_attrs", "_hash")
+
+    def __init__(self, fg=Color(255, 255, 255), bg=Color(0, 0, 0), attrs=0):
+        self._fg = fg
+        self._bg = bg
+        self._attrs = attrs
+        self._hash = hash((fg, bg, attrs))
+
+    @property
+    def fg(self):
+        return self._fg
+
+    @property
+    def bg(self):
+        return self._bg
+
+    @property
+    def attrs(self):
+        return self._attrs
+
+    def __eq__(self, other):
+        if not isinstance(other, Style):
+            return False
+        return (self._hash == other._hash and self._attrs == other._attrs
+                and self._fg == other._fg and self._bg == other._bg)
+
+    def __hash__(self):
+        return self._hash
+
+    def __str__(self):
+        return repr(self)
+
+    def __repr__(self):
+        return "Style(fg={}, bg={}, attrs={})".format(repr(self.fg), repr(self.bg), self.attrs)
+
+class StyleTable:
+    """Assigns small integer IDs to distinct Styles.
+
+    A StyleTable interns every Style it is given, so that the same combination
+    of colors and attributes always has the same ID. All IDs are less than
+    len(table).
+
+    IDs that are no longer used are reused for new styles, so that the table
+    does not grow without bound when, for example, colors are animated. The
+    objects that hold IDs from the table (such as StyleBuffers) are registered
+    with attach(), and collect() frees every ID that is not held by one of
+    them. IDs interned since the previous collection are never freed, so an ID
+    may safely be interned and then stored. StyleScreen calls maybe_collect()
+    before each update.
+    """
+
+    def __init__(self):
+        self._styles = []
+        self._ids = {}
+        self._free = []
+        self._young = set()
+        self._users = weakref.WeakSet()
+        self._collect_at = _COLLECT_MIN
+
+    def __len__(self):
+        return len(self._styles)
+
+    def __getitem__(self, style_id):
+        """Get the Style with a particular ID."""
+        return self._styles[style_id]
+
+    def attach(self, user):
+        """Register an object that holds IDs from this table.
+
+        user must have a _style_refs() method, which returns an iterable of
+        iterables of the IDs that it holds. Tables without any attached objects
+        never free IDs.
+        """
+        self._users.add(user)
+
+    def intern(self, fg, bg, attrs=0):
+        """Get the ID of the style with the given colors and attributes."""
+        key = (fg, bg, attrs)
+        style_id = self._ids.get(key)
+        if style_id is None:
+            style = Style(fg, bg, attrs)
+            if self._free:
+                style_id = self._free.pop()
+                self._styles[style_id] = style
+            else:
+                style_id = len(self._styles)
+                self._styles.append(style)
+            self._ids[key] = style_id
+            self._young.add(style_id)
+        return style_id
+
+    def intern_style(self, style):
+        """Get the ID of a Style instance."""
+        return self.intern(style.fg, style.bg, style.attrs)
+
+    def maybe_collect(self):
+        """Call collect() if the table has doubled in size since the last collection."""
+        if not self._free and len(self._styles) >= self._collect_at:
+            self.collect()
+
+    def collect(self):
+        """Free the IDs that are not held by any attached object.
+
+        Returns the number of IDs that were freed.
+        """
+        users = list(self._users)
+        freed = 0
+        if users:
+            used = self._young
+            for user in users:
+                for ids in user._style_refs():
+                    used.update(ids)
+            for style_id, style in enumerate(self._styles):
+                if style is not None and style_id not in used:
+                    del self._ids[(style.fg, style.bg, style.attrs)]
+                    self._styles[style_id] = None
+                    self._free.append(style_id)
+                    freed += 1
+        self._young = set()
+        self._collect_at = max(_COLLECT_MIN, 2 * (len(self._styles) - len(self._free)))
+        return freed
@@ -0,0 +1,350 @@
+from array import array
+
+from termpixels.buffer import Buffer
+from termpixels.color import Color
+from termpixels.style import StyleTable
+from termpixels.util import terminal_char_len
+
+_SPACE = ord(" ")
+
+class StylePixel:
+    """A view of a single cell of a StyleBuffer.
+
+    Behaves like a PixelData instance, with an additional attrs attribute.
+    Modifying a StylePixel modifies the StyleBuffer that it belongs to.
+    """
+
+    __slots__ = ("_buffer", "_x", "_y")
+
+    def __init__(self, buffer, x, y):
+        self._buffer = buffer
+        self._x = x
+        self._y = y
+
+    @property
+    def codepoint(self):
+        """The character as an integer code point."""
+        return self._buffer._chars[self._y][self._x]
+
+    @property
+    def style_id(self):
+        """The ID of the style in the StyleTable of the buffer."""
+        return self._buffer._style_ids[self._y][self._x]
+
+    @style_id.setter
+    def style_id(self, style_id):
+        self._buffer._set_cell(self._x, self._y, self.codepoint, style_id)
+
+    @property
+    def style(self):
+        """The Style of the cell."""
+        return self._buffer.styles[self.style_id]
+
+    @property
+    def char(self):
+        return chr(self.codepoint)
+
+    @char.setter
+    def char(self, char):
+        if len(char) != 1:
+            raise Exception("Character must have length 1")
+        self._buffer._set_cell(self._x, self._y, ord(char), self.style_id)
+
+    @property
+    def fg(self):
+        return self.style.fg
+
+    @fg.setter
+    def fg(self, value):
+        style = self.style
+        self.style_id = self._buffer.styles.intern(value, style.bg, style.attrs)
+
+    @property
+    def bg(self):
+        return self.style.bg
+
+    @bg.setter
+    def bg(self, value):
+        style = self.style
+        self.style_id = self._buffer.styles.intern(style.fg, value, style.attrs)
+
+    @property
+    def attrs(self):
+        return self.style.attrs
+
+    @attrs.setter
+    def attrs(self, value):
+        style = self.style
+        self.style_id = self._buffer.styles.intern(style.fg, style.bg, value)
+
+    # allow PixelData.set() to copy from a StylePixel
+    _char = char
+    _fg = fg
+    _bg = bg
+
+    def set(self, pixel):
+        buffer = self._buffer
+        if isinstance(pixel, StylePixel) and pixel._buffer.styles is buffer.styles:
+            codepoint = pixel.codepoint
+            style_id = pixel.style_id
+        else:
+            codepoint = ord(pixel.char)
+            style_id = buffer.styles.intern(pixel.fg, pixel.bg, getattr(pixel, "attrs", 0))
+        buffer._set_cell(self._x, self._y, codepoint, style_id)
+        return self
+
+    def __str__(self):
+        return repr(self)
+
+    def __repr__(self):
+        return "StylePixel(char={}, fg={}, bg={}, attrs={})".format(
+            repr(self.char), repr(self.fg), repr(self.bg), self.attrs)
+
+    def __eq__(self, other):
+        if isinstance(other, StylePixel) and other._buffer.styles is self._buffer.styles:
+            return self.codepoint == other.codepoint and self.style_id == other.style_id
+        try:
+            return (self.char == other.char and self.fg == other.fg
+                    and self.bg == other.bg and self.attrs == getattr(other, "attrs", 0))
+        except AttributeError:
+            return False
+
+    def __hash__(self):
+        # consistent with PixelData
+        return hash((self.char, self.fg, self.bg))
+
+class StyleBuffer(Buffer):
+    """A Buffer that stores a code point and a style ID for each pixel.
+
+    Rather than storing colors in each pixel, a StyleBuffer stores an index
+    into a StyleTable, which holds each distinct combination of foreground
+    color, background color and text attributes (see termpixels.style) once.
+    Each row is stored as a pair of integer arrays, so a StyleBuffer uses
+    much less memory than a Buffer, and rows can be compared and copied
+    quickly. Buffers that share a StyleTable can be blitted to each other
+    without looking up any styles.
+
+    Pixels returned by at() are StylePixel views, which behave like PixelData
+    and additionally have an attrs attribute. fill(), clear(), put_char() and
+    print() accept attrs in addition to fg and bg.
+    """
+
+    def __init__(self, w, h, *, styles=None):
+        self.styles = StyleTable() if styles is None else styles
+        self._blank_id = self.styles.intern(Color(255, 255, 255), Color(0, 0, 0))
+        self._chars = []
+        self._style_ids = []
+        super().__init__(w, h)
+        self.styles.attach(self)
+
+    def _style_refs(self):
+        """Get the IDs held by this buffer; see StyleTable.attach()."""
+        return self._style_ids + [(self._blank_id,)]
+
+    def resize(self, w, h):
+        """Resize the screen buffer to the given width and height."""
+        chars = []
+        style_ids = []
+        n = min(w, self._w)
+        for y in range(h):
+            row_chars = array("I", [_SPACE]) * w
+            row_ids = array("I", [self._blank_id]) * w
+            if y < self._h:
+                row_chars[:n] = self._chars[y][:n]
+                row_ids[:n] = self._style_ids[y][:n]
+            chars.append(row_chars)
+            style_ids.append(row_ids)
+        self._chars = chars
+        self._style_ids = style_ids
+        self._w = w
+        self._h = h
+        self._row_versions = [[0] for y in range(h)]
+
+    def at_unsafe(self, x, y, *, mutable=True):
+        """Get a StylePixel for a particular location.
+
+        Should be used by internal methods for pixel data access.
+        No bounds checking is performed.
+        """
+        return StylePixel(self, x, y)
+
+    def _set_cell(self, x, y, codepoint, style_id):
+        chars = self._chars[y]
+        style_ids = self._style_ids[y]
+        if chars[x] != codepoint or style_ids[x] != style_id:
+            chars[x] = codepoint
+            style_ids[x] = style_id
+            self._row_versions[y][0] += 1
+
+    def _restyle(self, style_id, fg, bg, attrs):
+        """Get the ID of a style with some of its attributes replaced."""
+        if fg is None and bg is None and attrs is None:
+            return style_id
+        style = self.styles[style_id]
+        return self.styles.intern(
+            style.fg if fg is None else fg,
+            style.bg if bg is None else bg,
+            style.attrs if attrs is None else attrs)
+
+    def fill(self, x, y, w, h, *, fg=None, bg=None, char=None, attrs=None):
+        """Fill a rectangular region of the screen with the given attributes.
+
+        If an attribute value is not specified (set to None), then that
+        attribute will not be filled in, and instead be left unchanged.
+
+        Any part of the rectangle that lies outside of the screen buffer will
+        be silently ignored.
+        """
+        x0, x1 = max(0, x), min(self._w, x + w)
+        y0, y1 = max(0, y), min(self._h, y + h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        if char is not None and len(char) != 1:
+            raise Exception("Character must have length 1")
+        run = None if char is None else array("I", [ord(char)]) * (x1 - x0)
+        restyled = {}
+        for j in range(y0, y1):
+            changed = False
+            if run is not None and self._chars[j][x0:x1] != run:
+                self._chars[j][x0:x1] = run
+                changed = True
+            style_ids = self._style_ids[j]
+            for i in range(x0, x1):
+                style_id = style_ids[i]
+                new_id = restyled.get(style_id)
+                if new_id is None:
+                    new_id = restyled[style_id] = self._restyle(style_id, fg, bg, attrs)
+                if new_id != style_id:
+                    style_ids[i] = new_id
+                    changed = True
+            if changed:
+                self._row_versions[j][0] += 1
+
+    def _put_color_row(self, x, y, colors, char, lower=False):
+        """Set a row of pixels to a character and colors; see Buffer._put_color_row()."""
+        chars = self._chars[y]
+        style_ids = self._style_ids[y]
+        codepoint = ord(char)
+        styles = self.styles
+        restyled = {}
+        changed = False
+        for px, color in enumerate(colors, x):
+            if color is None:
+                continue
+            style_id = style_ids[px]
+            # whether the old background becomes the foreground
+            swap = lower and chars[px] != codepoint
+            key = (style_id, color._packed, swap)
+            new_id = restyled.get(key)
+            if new_id is None:
+                style = styles[style_id]
+                if not lower:
+                    new_id = styles.intern(color, style.bg, style.attrs)
+                elif swap:
+                    new_id = styles.intern(style.bg, color, style.attrs)
+                else:
+                    new_id = styles.intern(style.fg, color, style.attrs)
+                restyled[key] = new_id
+            if chars[px] != codepoint or new_id != style_id:
+                chars[px] = codepoint
+                style_ids[px] = new_id
+                changed = True
+        if changed:
+            self._row_versions[y][0] += 1
+
+    def hspan(self, x, y, w, char=None, *, fg=None, bg=None, attrs=None):
+        """Draw a horizontal run of a character and/or style.
+
+        Behaves like Buffer.hspan(), additionally replacing the text attributes
+        if attrs is specified.
+        """
+        if not self._single_cell(char):
+            self._put_run(char, x, y, w, 1, 0, fg=fg, bg=bg, attrs=attrs)
+        else:
+            self.fill(x, y, w, 1, fg=fg, bg=bg, char=char, attrs=attrs)
+
+    def vspan(self, x, y, h, char=None, *, fg=None, bg=None, attrs=None):
+        """Draw a vertical run of a character and/or style.
+
+        Behaves like Buffer.vspan(), additionally replacing the text attributes
+        if attrs is specified.
+        """
+        if not self._single_cell(char):
+            self._put_run(char, x, y, h, 0, 1, fg=fg, bg=bg, attrs=attrs)
+        else:
+            self.fill(x, y, 1, h, fg=fg, bg=bg, char=char, attrs=attrs)
+
+    def clear(self, *, fg=Color(255,255,255), bg=Color(0,0,0), char=" ", attrs=0):
+        """Fill the entire screen buffer with the given attributes.
+
+        Unlike fill(), all attributes must be specified. If not specified, they
+        will be given default values instead.
+        """
+        if len(char) != 1:
+            raise Exception("Character must have length 1")
+        blank_chars = array("I", [ord(char)]) * self._w
+        blank_ids = array("I", [self.styles.intern(fg, bg, attrs)]) * self._w
+        for y in range(self._h):
+            if self._chars[y] != blank_chars or self._style_ids[y] != blank_ids:
+                self._chars[y][:] = blank_chars
+                self._style_ids[y][:] = blank_ids
+                self._row_versions[y][0] += 1
+
+    def blit_to(self, buffer, x=0, y=0, x0=0, y0=0, x1=None, y1=None):
+        """ copy this buffer to another buffer
+
+        Copy a sub-region of this buffer by specifying two corners (x0, y0)
+        and (x1, y1) where all coordinates are inclusive.
+
+        Rows are copied directly when the destination is also a StyleBuffer.
+        """
+        if not isinstance(buffer, StyleBuffer):
+            return super().blit_to(buffer, x=x, y=y, x0=x0, y0=y0, x1=x1, y1=y1)
+        if x1 == None:
+            x1 = self.w
+        if y1 == None:
+            y1 = self.h
+        x0, x1 = (min(x0, x1), max(x0, x1))
+        y0, y1 = (min(y0, y1), max(y0, y1))
+
+        # clip the offsets into the region to the bounds of both buffers
+        dx0 = max(0, -x0, -x)
+        dx1 = min(x1 - x0, self.w - 1 - x0, buffer.w - 1 - x)
+        dy0 = max(0, -y0, -y)
+        dy1 = min(y1 - y0, self.h - 1 - y0, buffer.h - 1 - y)
+        if dx0 > dx1 or dy0 > dy1:
+            return
+
+        same_table = buffer.styles is self.styles
+        translated = {}
+        src = slice(x0 + dx0, x0 + dx1 + 1)
+        dst = slice(x + dx0, x + dx1 + 1)
+        for dy in range(dy0, dy1 + 1):
+            chars = self._chars[y0 + dy][src]
+            style_ids = self._style_ids[y0 + dy][src]
+            if not same_table:
+                for i, style_id in enumerate(style_ids):
+                    new_id = translated.get(style_id)
+                    if new_id is None:
+                        new_id = translated[style_id] = buffer.styles.intern_style(self.styles[style_id])
+                    style_ids[i] = new_id
+            dst_y = y + dy
+            if buffer._chars[dst_y][dst] != chars or buffer._style_ids[dst_y][dst] != style_ids:
+                buffer._chars[dst_y][dst] = chars
+                buffer._style_ids[dst_y][dst] = style_ids
+                buffer._row_versions[dst_y][0] += 1
+
+    def put_char(self, ch, x, y, *, fg=None, bg=None, attrs=None):
+        """Put a single character and/or style at a particular location.
+
+        Behaves like Buffer.put_char(), additionally replacing the text
+        attributes at the given coordinates if attrs is specified.
+        """
+        ch_len = terminal_char_len(ch)
+        if x >= 0 and y >= 0 and x + ch_len <= self._w and y < self._h:
+            style_ids = self._style_ids[y]
+            self._set_cell(x, y, ord(ch), self._restyle(style_ids[x], fg, bg, attrs))
+            if ch_len > 1:
+                assert ch_len == 2
+                self._set_cell(x + 1, y, _SPACE, self._restyle(style_ids[x + 1], fg, bg, attrs))
+        return ch_len
@@ -1,28 +1,416 @@
-import curses
-import operator
-import re
+"""Look up the capabilities of terminal types in the terminfo database.
+
+Each Terminfo reads the compiled terminfo entry of its terminal type (see
+term(5)) itself, rather than through the curses module, which only sets up
+one terminal type per process. This allows terminals of several types to be
+used at once, e.g. by Apps running on different terminals.
+"""
+
 import os
+import re
+import struct
+import sys
 from functools import lru_cache
 
+# the directories searched for terminfo entries, after those given by the
+# TERMINFO, HOME and TERMINFO_DIRS environment variables
+_TERMINFO_DIRS = ("/etc/terminfo", "/lib/terminfo", "/usr/share/terminfo",
+                  "/usr/lib/terminfo", "/usr/share/misc/terminfo",
+                  os.path.join(sys.prefix, "share", "terminfo"))
+
+# the magic numbers of entries with 16-bit and 32-bit numbers
+_MAGIC_16 = 0o432
+_MAGIC_32 = 0o1036
+
+# the names of the predefined capabilities, in the order they are stored
+_BOOL_NAMES = (
+    "bw", "am", "xsb", "xhp", "xenl", "eo", "gn", "hc", "km", "hs", "in", "da",
+    "db", "mir", "msgr", "os", "eslok", "xt", "hz", "ul", "xon", "nxon",
+    "mc5i", "chts", "nrrmc", "npc", "ndscr", "ccc", "bce", "hls", "xhpa",
+    "crxm", "daisy", "xvpa", "sam", "cpix", "lpix", "OTbs", "OTns", "OTnc",
+    "OTMT", "OTNL", "OTpt", "OTxr",
+)
+_NUM_NAMES = (
+    "cols", "it", "lines", "lm", "xmc", "pb", "vt", "wsl", "nlab", "lh", "lw",
+    "ma", "wnum", "colors", "pairs", "ncv", "bufsz", "spinv", "spinh", "maddr",
+    "mjump", "mcs", "mls", "npins", "orc", "orl", "orhi", "orvi", "cps",
+    "widcs", "btns", "bitwin", "bitype", "OTug", "OTdC", "OTdN", "OTdB",
+    "OTdT", "OTkn",
+)
+_STR_NAMES = (
+    "cbt", "bel", "cr", "csr", "tbc", "clear", "el", "ed", "hpa", "cmdch",
+    "cup", "cud1", "home", "civis", "cub1", "mrcup", "cnorm", "cuf1", "ll",
+    "cuu1", "cvvis", "dch1", "dl1", "dsl", "hd", "smacs", "blink", "bold",
+    "smcup", "smdc", "dim", "smir", "invis", "prot", "rev", "smso", "smul",
+    "ech", "rmacs", "sgr0", "rmcup", "rmdc", "rmir", "rmso", "rmul", "flash",
+    "ff", "fsl", "is1", "is2", "is3", "if", "ich1", "il1", "ip", "kbs", "ktbc",
+    "kclr", "kctab", "kdch1", "kdl1", "kcud1", "krmir", "kel", "ked", "kf0",
+    "kf1", "kf10", "kf2", "kf3", "kf4", "kf5", "kf6", "kf7", "kf8", "kf9",
+    "khome", "kich1", "kil1", "kcub1", "kll", "knp", "kpp", "kcuf1", "kind",
+    "kri", "khts", "kcuu1", "rmkx", "smkx", "lf0", "lf1", "lf10", "lf2", "lf3",
+    "lf4", "lf5", "lf6", "lf7", "lf8", "lf9", "rmm", "smm", "nel", "pad",
+    "dch", "dl", "cud", "ich", "indn", "il", "cub", "cuf", "rin", "cuu",
+    "pfkey", "pfloc", "pfx", "mc0", "mc4", "mc5", "rep", "rs1", "rs2", "rs3",
+    "rf", "rc", "vpa", "sc", "ind", "ri", "sgr", "hts", "wind", "ht", "tsl",
+    "uc", "hu", "iprog", "ka1", "ka3", "kb2", "kc1", "kc3", "mc5p", "rmp",
+    "acsc", "pln", "kcbt", "smxon", "rmxon", "smam", "rmam", "xonc", "xoffc",
+    "enacs", "smln", "rmln", "kbeg", "kcan", "kclo", "kcmd", "kcpy", "kcrt",
+    "kend", "kent", "kext", "kfnd", "khlp", "kmrk", "kmsg", "kmov", "knxt",
+    "kopn", "kopt", "kprv", "kprt", "krdo", "kref", "krfr", "krpl", "krst",
+    "kres", "ksav", "kspd", "kund", "kBEG", "kCAN", "kCMD", "kCPY", "kCRT",
+    "kDC", "kDL", "kslt", "kEND", "kEOL", "kEXT", "kFND", "kHLP", "kHOM",
+    "kIC", "kLFT", "kMSG", "kMOV", "kNXT", "kOPT", "kPRV", "kPRT", "kRDO",
+    "kRPL", "kRIT", "kRES", "kSAV", "kSPD", "kUND", "rfi", "kf11", "kf12",
+    "kf13", "kf14", "kf15", "kf16", "kf17", "kf18", "kf19", "kf20", "kf21",
+    "kf22", "kf23", "kf24", "kf25", "kf26", "kf27", "kf28", "kf29", "kf30",
+    "kf31", "kf32", "kf33", "kf34", "kf35", "kf36", "kf37", "kf38", "kf39",
+    "kf40", "kf41", "kf42", "kf43", "kf44", "kf45", "kf46", "kf47", "kf48",
+    "kf49", "kf50", "kf51", "kf52", "kf53", "kf54", "kf55", "kf56", "kf57",
+    "kf58", "kf59", "kf60", "kf61", "kf62", "kf63", "el1", "mgc", "smgl",
+    "smgr", "fln", "sclk", "dclk", "rmclk", "cwin", "wingo", "hup", "dial",
+    "qdial", "tone", "pulse", "hook", "pause", "wait", "u0", "u1", "u2", "u3",
+    "u4", "u5", "u6", "u7", "u8", "u9", "op", "oc", "initc", "initp", "scp",
+    "setf", "setb", "cpi", "lpi", "chr", "cvr", "defc", "swidm", "sdrfq",
+    "sitm", "slm", "smicm", "snlq", "snrmq", "sshm", "ssubm", "ssupm", "sum",
+    "rwidm", "ritm", "rlm", "rmicm", "rshm", "rsubm", "rsupm", "rum", "mhpa",
+    "mcud1", "mcub1", "mcuf1", "mvpa", "mcuu1", "porder", "mcud", "mcub",
+    "mcuf", "mcuu", "scs", "smgb", "smgbp", "smglp", "smgrp", "smgt", "smgtp",
+    "sbim", "scsd", "rbim", "rcsd", "subcs", "supcs", "docr", "zerom", "csnm",
+    "kmous", "minfo", "reqmp", "getm", "setaf", "setab", "pfxl", "devt",
+    "csin", "s0ds", "s1ds", "s2ds", "s3ds", "smglr", "smgtb", "birep", "binel",
+    "bicr", "colornm", "defbi", "endbi", "setcolor", "slines", "dispc",
+    "smpch", "rmpch", "smsc", "rmsc", "pctrm", "scesc", "scesa", "ehhlm",
+    "elhlm", "elohlm", "erhlm", "ethlm", "evhlm", "sgr1", "slength", "OTi2",
+    "OTrs", "OTnl", "OTbc", "OTko", "OTma", "OTG2", "OTG3", "OTG1", "OTG4",
+    "OTGR", "OTGL", "OTGU", "OTGD", "OTGH", "OTGV", "OTGC", "meml", "memu",
+    "box1",
+)
+
+def _terminfo_dirs():
+    dirs = []
+    if os.environ.get("TERMINFO"):
+        dirs.append(os.environ["TERMINFO"])
+    if os.environ.get("HOME"):
+        dirs.append(os.path.join(os.environ["HOME"], ".terminfo"))
+    for path in os.environ.get("TERMINFO_DIRS", "").split(":"):
+        # an empty path stands for the default directories
+        dirs.extend([path] if path else _TERMINFO_DIRS)
+    dirs.extend(_TERMINFO_DIRS)
+    return dirs
+
+def _find_entry(term):
+    """Get the path of the compiled terminfo entry for a terminal type, or None."""
+    if not term or "/" in term or term.startswith("."):
+        return None
+    # entries are in a subdirectory named by their first character, or by its
+    # hexadecimal code on case-insensitive filesystems (e.g. macOS)
+    subdirs = (term[0], "{:02x}".format(ord(term[0])))
+    for path in _terminfo_dirs():
+        for subdir in subdirs:
+            entry = os.path.join(path, subdir, term)
+            if os.path.isfile(entry):
+                return entry
+    return None
+
+def _read_strings(table, offsets):
+    """Read the NUL-terminated strings at each offset in a string table.
+
+    Absent or cancelled strings (with a negative offset) are None.
+    """
+    strings = []
+    for offset in offsets:
+        if offset < 0 or offset >= len(table):
+            strings.append(None)
+            continue
+        end = table.find(b"\0", offset)
+        strings.append(table[offset:] if end < 0 else table[offset:end])
+    return strings
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, fmt, count):
+        fmt = "<{}{}".format(count, fmt)
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def read_bytes(self, n):
+        data = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return data
+
+    def align(self):
+        self.pos += self.pos % 2
+
+@lru_cache(32)
+def _load(term):
+    """Read the capabilities of a terminal type.
+
+    Returns a tuple of dicts of its flags, numbers and strings.
+    """
+    path = _find_entry(term)
+    if path is None:
+        raise Exception("Unknown terminal type: '{}'".format(term))
+    with open(path, "rb") as f:
+        reader = _Reader(f.read())
+    try:
+        return _parse(reader)
+    except struct.error:
+        raise Exception("Invalid terminfo entry: '{}'".format(path))
+
+def _parse(reader):
+    magic, names_size, n_bools, n_nums, n_strings, table_size = reader.read("h", 6)
+    if magic == _MAGIC_16:
+        num_format = "h"
+    elif magic == _MAGIC_32:
+        num_format = "i"
+    else:
+        raise struct.error("bad magic number")
+    reader.read_bytes(names_size)
+    bools = reader.read("b", n_bools)
+    reader.align()
+    nums = reader.read(num_format, n_nums)
+    offsets = reader.read("h", n_strings)
+    strings = _read_strings(reader.read_bytes(table_size), offsets)
+
+    flags = {name: value > 0 for name, value in zip(_BOOL_NAMES, bools)}
+    numbers = {name: value for name, value in zip(_NUM_NAMES, nums) if value >= 0}
+    values = {name: value for name, value in zip(_STR_NAMES, strings) if value is not None}
+
+    # extended (user-defined) capabilities follow, named in their own table
+    reader.align()
+    if len(reader.data) - reader.pos < 10:
+        return flags, numbers, values
+    n_bools, n_nums, n_strings, n_items, table_size = reader.read("h", 5)
+    bools = reader.read("b", n_bools)
+    reader.align()
+    nums = reader.read(num_format, n_nums)
+    offsets = reader.read("h", n_strings)
+    name_offsets = reader.read("h", n_bools + n_nums + n_strings)
+    table = reader.read_bytes(table_size)
+    strings = _read_strings(table, offsets)
+    # the names follow the last string value
+    names_start = 0
+    for offset, string in zip(offsets, strings):
+        if string is not None:
+            names_start = max(names_start, offset + len(string) + 1)
+    names = [name.decode("latin-1") if name is not None else None
+             for name in _read_strings(table[names_start:], name_offsets)]
+
+    flags.update((name, value > 0) for name, value in zip(names, bools))
+    numbers.update((name, value) for name, value in zip(names[n_bools:], nums) if value >= 0)
+    values.update((name, value) for name, value in zip(names[n_bools + n_nums:], strings)
+                  if value is not None)
+    return flags, numbers, values
+
+def _c_div(x, y):
+    """Divide integers, truncating towards zero like C."""
+    if y == 0:
+        return 0
+    q = abs(x) // abs(y)
+    return q if (x < 0) == (y < 0) else -q
+
+def _c_mod(x, y):
+    if y == 0:
+        return 0
+    return x - y * _c_div(x, y)
+
+_BINARY_OPS = {
+    "+": lambda x, y: x + y,
+    "-": lambda x, y: x - y,
+    "*": lambda x, y: x * y,
+    "/": _c_div,
+    "m": _c_mod,
+    "&": lambda x, y: x & y,
+    "|": lambda x, y: x | y,
+    "^": lambda x, y: x ^ y,
+    "=": lambda x, y: int(x == y),
+    ">": lambda x, y: int(x > y),
+    "<": lambda x, y: int(x < y),
+    "A": lambda x, y: int(bool(x and y)),
+    "O": lambda x, y: int(bool(x or y)),
+}
+
+def _skip(string, i, to_else):
+    """Skip a branch of a conditional, to just after the %; ending it.
+
+    If to_else is true, also stop just after a %e at the same level.
+    """
+    depth = 0
+    n = len(string)
+    while i < n:
+        if string[i] != "%" or i + 1 >= n:
+            i += 1
+            continue
+        op = string[i + 1]
+        i += 2
+        if op == "?":
+            depth += 1
+        elif op == ";":
+            if depth == 0:
+                return i
+            depth -= 1
+        elif op == "e" and depth == 0 and to_else:
+            return i
+    return i
+
+def _format(spec, conversion, value):
+    if conversion == "s":
+        if not isinstance(value, str):
+            value = str(value)
+        return ("%" + spec + "s") % value
+    if isinstance(value, str):
+        value = 0
+    if conversion == "o" and "#" in spec:
+        # printf() prefixes octal with 0, rather than 0o
+        text = ("%" + spec.replace("#", "") + "o") % value
+        return text if text.lstrip().startswith("0") else "0" + text
+    return ("%" + spec + conversion) % value
+
+_CONVERSION = re.compile(r"%%|%:?[-+# ]*[0-9.]*[doxXsc]")
+_STATIC_VARIABLE = re.compile(rb"%[Pg][A-Z]")
+_PARAMETERIZED_MAX = 4096
+
+def tparm(string, *args, static=None):
+    """Substitute parameters into a terminfo string capability.
+
+    Implements the parameter language described in terminfo(5), like the
+    tparm() function of curses. string is bytes; so is the result.
+    static - a dict of the static variables (%PA to %PZ) to use
+    """
+    string = string.decode("latin-1")
+    params = list(args[:9]) + [0] * (9 - len(args[:9]))
+    dynamic = {}
+    if static is None:
+        static = {}
+    stack = []
+    # a string in the style of termcap takes a parameter for each conversion
+    termcap = "%p" not in string
+    if termcap:
+        count = sum(1 for match in _CONVERSION.findall(string) if match != "%%")
+        stack.extend(reversed(params[:min(count, 9)]))
+    incremented = False
+    def pop():
+        return stack.pop() if stack else 0
+    out = []
+    i = 0
+    n = len(string)
+    while i < n:
+        ch = string[i]
+        if ch != "%":
+            out.append(ch)
+            i += 1
+            continue
+        if i + 1 >= n:
+            # a trailing % is dropped, like curses does
+            break
+        op = string[i + 1]
+        i += 2
+        if op == "%":
+            out.append("%")
+        elif op == "p":
+            index = string[i:i + 1]
+            i += 1
+            stack.append(params[int(index) - 1] if index.isdigit() and index != "0" else 0)
+        elif op == "P":
+            name = string[i:i + 1]
+            i += 1
+            (static if name.isupper() else dynamic)[name] = pop()
+        elif op == "g":
+            name = string[i:i + 1]
+            i += 1
+            stack.append((static if name.isupper() else dynamic).get(name, 0))
+        elif op == "'":
+            stack.append(ord(string[i:i + 1] or "\0"))
+            i = string.find("'", i + 1) + 1 or n
+        elif op == "{":
+            end = string.find("}", i)
+            if end < 0:
+                end = n
+            try:
+                stack.append(int(string[i:end]))
+            except ValueError:
+                stack.append(0)
+            i = end + 1
+        elif op == "l":
+            value = pop()
+            stack.append(len(value) if isinstance(value, str) else 0)
+        elif op == "c":
+            value = pop()
+            if isinstance(value, str):
+                out.append(value[:1])
+            else:
+                # like curses, avoid writing a NUL character
+                out.append(chr(value % 256 or 0o200))
+        elif op == "i" and not incremented:
+            incremented = True
+            for j in (0, 1):
+                if isinstance(params[j], int):
+                    params[j] += 1
+                    # like curses, which then takes them in the opposite order
+                    if termcap and j < len(stack):
+                        stack[j] = params[j]
+        elif op in _BINARY_OPS:
+            y = pop()
+            x = pop()
+            if op not in "=<>" and (isinstance(x, str) or isinstance(y, str)):
+                x, y = 0, 0
+            stack.append(_BINARY_OPS[op](x, y))
+        elif op == "!":
+            stack.append(int(not pop()))
+        elif op == "~":
+            stack.append(~pop())
+        elif op == "?" or op == ";":
+            pass
+        elif op == "t":
+            if not pop():
+                i = _skip(string, i, True)
+        elif op == "e":
+            # the end of the branch that was taken
+            i = _skip(string, i, False)
+        else:
+            # a format: %[[:]flags][width[.precision]][doxXs]
+            j = i - 1
+            if string[j] == ":":
+                j += 1
+            start = j
+            while j < n and string[j] in "-+# 0123456789.":
+                j += 1
+            if j < n and string[j] in "doxXs":
+                out.append(_format(string[start:j], string[j], pop()))
+                i = j + 1
+            # otherwise, an invalid escape is dropped, like curses does
+    return "".join(out).encode("latin-1", "replace")
+
 class Terminfo:
-    def __init__(self):
-        curses.setupterm()
+    def __init__(self, term=None):
+        """
+        term - the terminal type, or None to use the TERM environment variable
+        """
+        self._term = term
+        self._flags, self._numbers, self._strings = _load(self.termname)
+        # the static variables of parameterized strings, kept per terminal
+        self._static = {}
+        # the results of parameterize() for strings that do not use them
+        self._parameterized = {}
 
     @property
     def termname(self):
+        if self._term is not None:
+            return self._term
         return os.environ["TERM"] 
     
-    @lru_cache(128)
     def flag(self, name):
-        return curses.tigetflag(name) > 0
+        return self._flags.get(name, False)
     
-    @lru_cache(128)
     def num(self, name):
-        return curses.tigetnum(name)
+        return self._numbers.get(name, -1)
 
-    @lru_cache(128)
     def string(self, name):
-        return curses.tigetstr(name)
+        return self._strings.get(name)
 
     def parameterize(self, name, *args, require=False):
         string = self.string(name)
@@ -31,4 +419,12 @@ class Terminfo:
                 return ""
             else:
                 raise Exception("Terminal does not support required capability: '{}'".format(name))
-        return curses.tparm(string, *args)
+        key = (name, args)
+        result = self._parameterized.get(key)
+        if result is None:
+            result = tparm(string, *args, static=self._static)
+            if _STATIC_VARIABLE.search(string) is None:
+                if len(self._parameterized) >= _PARAMETERIZED_MAX:
+                    self._parameterized.clear()
+                self._parameterized[key] = result
+        return result
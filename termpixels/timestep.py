@@ -0,0 +1,201 @@
+"""A fixed timestep, which decouples simulation from rendering.
+
+A simulation that advances by the time elapsed since the last frame behaves
+differently depending on the framerate, which varies with the load on the
+machine and the throughput of the terminal. Instead, a Timestep advances the
+simulation in "ticks" of a fixed length, running as many ticks each frame as
+are needed to keep up with the clock. Rendering then happens once per frame,
+using an interpolation factor (alpha) to blend between the last two states of
+the simulation.
+
+When the application cannot keep up, renders are skipped before ticks are:
+if running the ticks of a frame takes longer than the frame budget, the frame
+is not rendered (up to max_skipped_renders times in a row). Ticks are only
+dropped if more than max_ticks of them are due in a single frame, which keeps
+the application responsive after it has been suspended, for example.
+
+Example:
+```
+app = App(tickrate=100, framerate=30)
+
+@app.on("tick")
+def tick(dt):
+    ball.prev_y = ball.y
+    ball.y += ball.vy * dt
+
+@app.on("render")
+def render(alpha):
+    y = ball.prev_y + (ball.y - ball.prev_y) * alpha
+    ...
+    app.screen.update()
+```
+"""
+
+from time import perf_counter
+
+class TimestepStats:
+    """Timing statistics of a Timestep.
+
+    ticks, renders - the number of ticks run and frames rendered
+    dropped_ticks - the number of ticks that were not run because the
+                    simulation fell too far behind
+    skipped_renders - the number of frames that were not rendered because
+                      the ticks took too long
+    tick_time, render_time - the average time taken by a tick or render, in
+                             seconds (a moving average)
+    tick_rate, render_rate - the number of ticks and renders per second,
+                             measured over roughly the last second
+    """
+
+    # weight of the newest sample in the moving averages
+    _SMOOTHING = 0.1
+    # length of the window over which rates are measured, in seconds
+    _RATE_WINDOW = 1
+
+    def __init__(self):
+        self.ticks = 0
+        self.renders = 0
+        self.dropped_ticks = 0
+        self.skipped_renders = 0
+        self.tick_time = 0
+        self.render_time = 0
+        self.tick_rate = 0
+        self.render_rate = 0
+        self._window_start = None
+        self._window_ticks = 0
+        self._window_renders = 0
+
+    def _average(self, average, sample, count):
+        if count == 1:
+            return sample
+        return average + (sample - average) * self._SMOOTHING
+
+    def record_tick(self, duration):
+        self.ticks += 1
+        self.tick_time = self._average(self.tick_time, duration, self.ticks)
+
+    def record_render(self, duration):
+        self.renders += 1
+        self.render_time = self._average(self.render_time, duration, self.renders)
+
+    def _update_rates(self, now):
+        if self._window_start is None:
+            self._window_start = now
+            self._window_ticks = self.ticks
+            self._window_renders = self.renders
+            return
+        elapsed = now - self._window_start
+        if elapsed >= self._RATE_WINDOW:
+            self.tick_rate = (self.ticks - self._window_ticks) / elapsed
+            self.render_rate = (self.renders - self._window_renders) / elapsed
+            self._window_start = now
+            self._window_ticks = self.ticks
+            self._window_renders = self.renders
+
+    def __repr__(self):
+        return ("TimestepStats(ticks={}, renders={}, dropped_ticks={}, skipped_renders={}, "
+                "tick_rate={:.1f}, render_rate={:.1f}, tick_time={:.6f}, render_time={:.6f})").format(
+                    self.ticks, self.renders, self.dropped_ticks, self.skipped_renders,
+                    self.tick_rate, self.render_rate, self.tick_time, self.render_time)
+
+    def __str__(self):
+        return repr(self)
+
+class Timestep:
+    """Runs a simulation at a fixed rate, independently of the render rate."""
+
+    def __init__(self, tickrate, *, max_ticks=None, max_skipped_renders=4, clock=perf_counter):
+        """
+        tickrate - number of ticks per second
+        max_ticks - the most ticks to run in a single frame; any further ticks
+                    that are due are dropped. Defaults to a quarter second of
+                    ticks.
+        max_skipped_renders - the most consecutive frames that may be skipped
+                              while the simulation is catching up
+        clock - a function returning the current time in seconds
+        """
+        if tickrate <= 0:
+            raise ValueError("tickrate must be positive")
+        self._tickrate = tickrate
+        self._dt = 1 / tickrate
+        self.max_ticks = max(1, round(tickrate / 4)) if max_ticks is None else max_ticks
+        self.max_skipped_renders = max_skipped_renders
+        self._clock = clock
+        self.reset()
+
+    @property
+    def tickrate(self):
+        return self._tickrate
+
+    @property
+    def dt(self):
+        """The length of a tick in seconds."""
+        return self._dt
+
+    @property
+    def alpha(self):
+        """How far the clock is between the last tick and the next, in [0,1).
+
+        Used to interpolate between the previous and current state of the
+        simulation when rendering.
+        """
+        return self._accumulator / self._dt
+
+    def reset(self):
+        """Restart the clock and clear the statistics."""
+        self._last = None
+        self._accumulator = 0
+        self._skipped = 0
+        self.stats = TimestepStats()
+
+    def advance(self, now=None):
+        """Advance the clock and return the number of ticks that are due.
+
+        The first call only starts the clock, and returns 0.
+        """
+        if now is None:
+            now = self._clock()
+        if self._last is None:
+            self._last = now
+            return 0
+        self._accumulator += max(0, now - self._last)
+        self._last = now
+        # allow for rounding error, so that e.g. 0.3 seconds is 3 ticks of 0.1
+        ticks = int(self._accumulator / self._dt + 1e-9)
+        self._accumulator = max(0, self._accumulator - ticks * self._dt)
+        if ticks > self.max_ticks:
+            self.stats.dropped_ticks += ticks - self.max_ticks
+            ticks = self.max_ticks
+        return ticks
+
+    def frame(self, tick, render, *, budget=None):
+        """Run the ticks that are due, and then render unless out of time.
+
+        tick is called with dt for each tick, and render is called with alpha.
+        If budget is given and the ticks take longer than budget seconds, the
+        frame is not rendered, unless max_skipped_renders frames in a row have
+        already been skipped.
+
+        Returns whether the frame was rendered.
+        """
+        clock = self._clock
+        start = clock()
+        ticks = self.advance(start)
+        dt = self._dt
+        stats = self.stats
+        t0 = start
+        for _ in range(ticks):
+            tick(dt)
+            t1 = clock()
+            stats.record_tick(t1 - t0)
+            t0 = t1
+        stats._update_rates(t0)
+
+        if budget is not None and t0 - start > budget and self._skipped < self.max_skipped_renders:
+            self._skipped += 1
+            stats.skipped_renders += 1
+            return False
+        self._skipped = 0
+        render(self.alpha)
+        stats.record_render(clock() - t0)
+        return True
@@ -3,24 +3,30 @@ import tty
 import sys
 import os
 import threading 
-import queue
 import signal
 import fcntl
 import struct
 import selectors
-from queue import Queue
+import time
+import errno
+import weakref
 from termpixels.color import color_to_16, color_to_256
 from termpixels.observable import Observable
+from termpixels.style import sgr_attrs
 from termpixels.terminfo import Terminfo
 from termpixels.unix_keys import Key, Mouse, make_parsers
 from termpixels.util import terminal_len
 
+# the most escape sequences for styles to cache; see UnixBackend.set_style()
+_STYLE_ESCAPES_MAX = 4096
+
 def detect_truecolor(terminfo=None):
     """Detect true-color (24-bit) color support
     """
     if "COLORTERM" in os.environ and "truecolor" in os.environ["COLORTERM"]:
         return True
-    if "truecolor" in os.environ["TERM"]:
+    term = terminfo.termname if terminfo is not None else os.environ["TERM"]
+    if "truecolor" in term:
         return True
     if terminfo is not None:
         if terminfo.flag("RGB"):
@@ -39,30 +45,56 @@ def detect_color_mode(terminfo=None):
         return "16-color" 
     return "monochrome"
 
+def _open_tty(tty, flags):
+    """Open a terminal given as a path or a file descriptor.
+
+    A file descriptor is reopened by its path, so that the flags (such as 
+    O_NONBLOCK) of the new file descriptor are independent of the original.
+    """
+    if isinstance(tty, int):
+        tty = os.ttyname(tty)
+    return os.open(tty, flags)
+
 class UnixBackend(Observable):
-    def __init__(self, *, stdout=None):
-        super().__init__()
-        self._ti = Terminfo()
+    def __init__(self, *, stdout=None, tty=None, term=None, queue=None):
+        """
+        stdout - a file descriptor to which output is written, instead of 
+                 sys.stdout (or the tty, if given)
+        tty - the path or a file descriptor of the terminal, such as a pty, to
+              use instead of the controlling terminal
+        term - the terminal type, instead of the TERM environment variable
+        queue - the event queue of the backend
+        """
+        super().__init__(queue)
+        self._open_output(stdout, tty)
+        self._ti = Terminfo(term)
         self.color_mode = detect_color_mode(self._ti)
         self._cursor_pos = None
         self._fg = None
         self._bg = None
+        self._style = None
+        self._style_escapes = {}
         self._show_cursor = None
         self._mouse_tracking = None
         self.size_dirty = True 
         self._size = None
         self._window_title = None
 
-        # allow output to be redirected to a file, but make sure that a TTY 
-        # output is available for ioctl and termios operations.
-        self._fd_out = stdout if stdout is not None else sys.stdout.fileno()
-        if os.isatty(self._fd_out):
-            self._fd_out_tty = self._fd_out
-        else:
-            self._fd_out_tty = os.open("/dev/tty", os.O_WRONLY)
-
         self._out_buffer = bytearray()
         
+    def _open_output(self, stdout, tty):
+        if tty is not None:
+            self._fd_out_tty = _open_tty(tty, os.O_WRONLY)
+            self._fd_out = stdout if stdout is not None else self._fd_out_tty
+        else:
+            # allow output to be redirected to a file, but make sure that a 
+            # TTY output is available for ioctl and termios operations.
+            self._fd_out = stdout if stdout is not None else sys.stdout.fileno()
+            if os.isatty(self._fd_out):
+                self._fd_out_tty = self._fd_out
+            else:
+                self._fd_out_tty = os.open("/dev/tty", os.O_WRONLY)
+
     @property
     def terminal_name(self):
         return self._ti.termname
@@ -115,6 +147,7 @@ class UnixBackend(Observable):
             else:
                 self.write_escape(self._ti.parameterize("setaf", self.color_auto(color)))
             self._fg = color
+            self._style = None
     
     @property
     def bg(self):
@@ -128,7 +161,39 @@ class UnixBackend(Observable):
             else:
                 self.write_escape(self._ti.parameterize("setab", self.color_auto(color)))
             self._bg = color
+            self._style = None
     
+    def set_style(self, style):
+        """Set the colors and text attributes used for writing from a Style.
+
+        The escape sequence for each style is cached. Setting fg or bg 
+        afterwards changes only the colors, leaving the attributes enabled.
+        """
+        if self._style == style:
+            return
+        key = (self.color_mode, style)
+        escape = self._style_escapes.get(key)
+        if escape is None:
+            if len(self._style_escapes) >= _STYLE_ESCAPES_MAX:
+                self._style_escapes.clear()
+            escape = self._style_escapes[key] = self._style_escape(style)
+        self.write_escape(escape)
+        self._fg = style.fg
+        self._bg = style.bg
+        self._style = style
+
+    def _style_escape(self, style):
+        attrs = sgr_attrs(style.attrs)
+        reset = "\x1b[0;{}m".format(attrs) if attrs else "\x1b[0m"
+        fg, bg = style.fg, style.bg
+        if self.color_mode == "truecolor":
+            return "{};38;2;{};{};{};48;2;{};{};{}m".format(
+                reset[:-1], fg.r, fg.g, fg.b, bg.r, bg.g, bg.b).encode("utf-8")
+        parts = [reset,
+                 self._ti.parameterize("setaf", self.color_auto(fg)),
+                 self._ti.parameterize("setab", self.color_auto(bg))]
+        return b"".join(part.encode("utf-8") if type(part) == str else part for part in parts)
+
     @property
     def application_keypad(self):
         return self._application_keypad
@@ -199,6 +264,64 @@ class UnixBackend(Observable):
     def clear_screen(self):
         self.cursor_pos = (0, 0)
         self.write_escape("\x1b[2J")
+
+    @property
+    def can_erase(self):
+        """Whether erased cells are filled with the current background color."""
+        return self._ti.flag("bce") and bool(self._ti.string("el"))
+
+    @property
+    def can_repeat(self):
+        """Whether the terminal can repeat a character with repeat()."""
+        return bool(self._ti.string("rep"))
+
+    def erase_line(self):
+        """Erase from the cursor to the end of the line without moving the cursor."""
+        self.write_escape(self._ti.parameterize("el", require=True))
+
+    def erase_chars(self, n):
+        """Erase n characters starting at the cursor."""
+        if self._ti.string("ech"):
+            self.write_escape(self._ti.parameterize("ech", n))
+        else:
+            self.write(" " * n)
+
+    def repeat(self, char, n):
+        """Write a single-width ASCII character n times."""
+        self.write_escape(self._ti.parameterize("rep", ord(char), n, require=True))
+        if self._cursor_pos is not None:
+            self._cursor_pos = (self._cursor_pos[0] + n, self._cursor_pos[1])
+
+    def scroll(self, top, bottom, n):
+        """Scroll the rows from top to bottom (inclusive) up by n rows.
+
+        If n is negative, the rows are scrolled down instead. Rows exposed by
+        scrolling are left blank. Returns False if the terminal does not
+        support scroll regions, in which case nothing is written.
+        """
+        if n == 0:
+            return True
+        if not self._ti.string("csr"):
+            return False
+
+        # the cursor position is undefined after changing the scroll region
+        self.write_escape(self._ti.parameterize("csr", top, bottom))
+        self._cursor_pos = None
+        if n > 0:
+            self.cursor_pos = (0, bottom)
+            if self._ti.string("indn"):
+                self.write_escape(self._ti.parameterize("indn", n))
+            else:
+                self.write_escape(self._ti.parameterize("ind") * n)
+        else:
+            self.cursor_pos = (0, top)
+            if self._ti.string("rin"):
+                self.write_escape(self._ti.parameterize("rin", -n))
+            else:
+                self.write_escape(self._ti.parameterize("ri") * -n)
+        self.write_escape(self._ti.parameterize("csr", 0, self.size[1] - 1))
+        self._cursor_pos = None
+        return True
     
     def write_escape(self, string):
         if type(string) == str:
@@ -222,17 +345,49 @@ class UnixBackend(Observable):
         self._out_buffer.clear()
         termios.tcdrain(self._fd_out_tty)
 
+# time to wait for the rest of an escape sequence after receiving an escape
+_ESCAPE_TIMEOUT = 25/1000
+
+# inputs that read from the controlling terminal, and are notified when it is
+# resized; there is only one SIGWINCH handler, which is shared by all of them
+_resize_inputs = weakref.WeakSet()
+_resize_lock = threading.Lock()
+_sigwinch_installed = False
+
+def _handle_sigwinch(signum, frame):
+    for input in tuple(_resize_inputs):
+        input.notify_resize()
+
+def _subscribe_sigwinch(input):
+    global _sigwinch_installed
+    with _resize_lock:
+        if not _sigwinch_installed:
+            signal.signal(signal.SIGWINCH, _handle_sigwinch)
+            _sigwinch_installed = True
+        _resize_inputs.add(input)
+
 class UnixInput(Observable):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, *, tty=None, term=None, queue=None):
+        """
+        tty - the path or a file descriptor of the terminal, such as a pty, to
+              read instead of the controlling terminal. Resizes of such a 
+              terminal are not signalled, so notify_resize() must be called
+              when its size is changed.
+        term - the terminal type, instead of the TERM environment variable
+        queue - the event queue of the input
+        """
+        super().__init__(queue)
         self._old_attr = None
 
-        # open /dev/tty rather than using stdin in case it is e.g. a pipe
-        # also ensures that stdin state is not corrupted if we crash
-        self._fd_in = os.open("/dev/tty", os.O_RDONLY)
+        if tty is None:
+            # open /dev/tty rather than using stdin in case it is e.g. a pipe
+            # also ensures that stdin state is not corrupted if we crash
+            self._fd_in = os.open("/dev/tty", os.O_RDONLY)
+        else:
+            self._fd_in = _open_tty(tty, os.O_RDONLY)
 
         self._cbreak = False
-        self._ti = Terminfo()
+        self._ti = Terminfo(term)
         self._parsers = make_parsers(self._ti)
 
         self._has_exited = True
@@ -241,25 +396,63 @@ class UnixInput(Observable):
         self._stdin_selector = selectors.DefaultSelector()
         self._stdin_selector.register(self._fd_in, selectors.EVENT_READ)
 
-        self._input_queue = Queue()
-        self._sigwinch_event = threading.Event()
-
-        signal.signal(signal.SIGWINCH, self.handle_sigwinch)
+        # characters received but not yet parsed, and the time after which 
+        # they are parsed even if an escape sequence is incomplete
+        self._group = []
+        self._group_deadline = None
+
+        self._loop = None
+        self._flush_handle = None
+        self._collector = None
+        # whether the end of the input has been reached
+        self._closed = False
+
+        # a pipe used to wake up select() when the terminal is resized, or 
+        # when input is stopped
+        self._resized = False
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._stdin_selector.register(self._wake_r, selectors.EVENT_READ)
+
+        if tty is None:
+            _subscribe_sigwinch(self)
     
     def handle_sigwinch(self, signum, frame):
-        self._sigwinch_event.set()
-    
-    def watch_sigwinch(self):
-        while not self._has_exited:
-            self._sigwinch_event.wait()
-            self._sigwinch_event.clear()
-            self.emit("resize")
+        self.notify_resize()
+
+    def notify_resize(self):
+        """Emit a "resize" event from the thread reading input.
+
+        Called when the controlling terminal receives SIGWINCH; may be called
+        from any thread.
+        """
+        self._resized = True
+        self._wake()
+
+    def _drain_wake(self):
+        try:
+            while os.read(self._wake_r, 64):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass # already awake
     
     @property
     def cbreak(self):
         return self._cbreak
 
-    def collector_func(self):
+    def fileno(self):
+        """Get the file descriptor from which input is read."""
+        return self._fd_in
+
+    def read(self):
+        """Read and decode all of the input that is available without blocking."""
         # The encoding of input on stdin is unknown.
         # If the terminal supports UTF-8 mode, it will be UTF-8 encoded.
         # UTF-8 enables multilingual input, but is not always available.
@@ -268,52 +461,108 @@ class UnixInput(Observable):
         # data at once. At no point do we want to decode a fragment of 
         # UTF-8 bytes.
 
-        while not self._has_exited:
-            self._stdin_selector.select() # wait for data on stdin
+        # read chunks of stdin until it will block
+        data_chunks = []
+        try:
+            while True:
+                chunk = os.read(self._fd_in, 2048)
+                if not chunk:
+                    self._closed = True
+                    break
+                data_chunks.append(chunk)
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            # the other end of a pty may have been closed
+            if e.errno != errno.EIO:
+                raise
+            self._closed = True
+
+        # concatenate and decode chunks
+        data_bytes = b"".join(data_chunks)
+        try:
+            return data_bytes.decode("utf-8")
+        except UnicodeDecodeError:
+            # this indicates that the terminal is not generating UTF-8 input
+            return "".join(map(chr, data_bytes))
+
+    def feed(self, data, now=None):
+        """Group received characters into sequences and parse them.
+
+        Characters are parsed as soon as they have been received, unless an
+        escape sequence may be incomplete. An escape starts a new group, which
+        is parsed once no more characters arrive for a short time; call 
+        flush() once timeout() has elapsed.
+        """
+        escaped = self._group_deadline is not None
+        for ch in data:
+            if ch == "\x1b":
+                if len(self._group) > 0:
+                    self.parse_group("".join(self._group))
+                    self._group.clear()
+                escaped = True
+            self._group.append(ch)
+        if not escaped:
+            self.flush()
+        elif len(self._group) > 0:
+            if now is None:
+                now = time.perf_counter()
+            self._group_deadline = now + _ESCAPE_TIMEOUT
+
+    def timeout(self, now=None):
+        """Get the time in seconds until flush() should be called, or None."""
+        if self._group_deadline is None:
+            return None
+        if now is None:
+            now = time.perf_counter()
+        return max(0, self._group_deadline - now)
 
-            # read chunks of stdin until it will block
-            data_chunks = []
-            try:
-                while True:
-                    data_chunks.append(os.read(self._fd_in, 2048))
-            except BlockingIOError:
-                pass
+    def flush(self):
+        """Parse any characters that have been received, even if incomplete."""
+        self._group_deadline = None
+        if len(self._group) > 0:
+            self.parse_group("".join(self._group))
+            self._group.clear()
+
+    def poll(self, timeout=0):
+        """Read and parse input in the calling thread.
+
+        Waits up to timeout seconds (or indefinitely if timeout is None) for
+        input or a resize, and emits the resulting events. Returns early if 
+        an incomplete escape sequence times out. For use after 
+        start(threaded=False).
+        """
+        escape_timeout = self.timeout()
+        if escape_timeout is not None and (timeout is None or escape_timeout < timeout):
+            timeout = escape_timeout
+        for key, _ in self._stdin_selector.select(timeout):
+            if key.fd == self._wake_r:
+                self._drain_wake()
+            elif not self._has_exited and not self._closed:
+                self.feed(self.read())
+                if self._closed:
+                    self._stdin_selector.unregister(self._fd_in)
+                    self._close()
+        if self.timeout() == 0:
+            self.flush()
+        if self._resized:
+            self._resized = False
+            self.emit("resize")
 
-            # concatenate and decode chunks
-            data_bytes = b"".join(data_chunks)
-            try:
-                data = data_bytes.decode("utf-8")
-            except UnicodeDecodeError:
-                # this indicates that the terminal is not generating UTF-8 input
-                data = list(map(chr, data_bytes))
-        
-            # enqueue characters
-            for ch in data:
-                self._input_queue.put(ch)
-    
-    def grouper_func(self):
-        buffer = []
-        grouping = False
-        group_timeout = 0
-        def dump():
-            self.parse_group("".join(buffer))
-            buffer.clear()
+    def collector_func(self):
         while not self._has_exited:
-            try:
-                timeout = group_timeout if grouping else None
-                ch = self._input_queue.get(timeout=timeout)
-                if ch == "\x1b":
-                    if len(buffer) > 0:
-                        dump()
-                    group_timeout = 25/1000
-                buffer.append(ch)
-                grouping = True
-            except queue.Empty:
-                if len(buffer) > 0:
-                    dump()
-                grouping = False
-                group_timeout = 0
-    
+            # wait for data on stdin, for an escape sequence to time out, or
+            # to be woken up by a resize or stop()
+            self.poll(None)
+
+    def _close(self):
+        """Handle the end of the input, e.g. when the terminal hangs up.
+
+        The input is no longer read, and a "close" event is emitted.
+        """
+        self.flush()
+        self.emit("close")
+
     def parse_group(self, chars):
         self.emit("raw_input", chars)
         while len(chars) > 0:
@@ -343,7 +592,7 @@ class UnixInput(Observable):
             termios.tcsetattr(self._fd_in, termios.TCSAFLUSH, self._old_attr)
             self._cbreak = False
     
-    def start(self):
+    def _begin(self):
         with self._has_exited_lock:
             if not self._has_exited:
                 raise RuntimeError("Input already started.")
@@ -351,21 +600,76 @@ class UnixInput(Observable):
             self.set_cbreak(True)
             os.set_blocking(self._fd_in, False)
 
-            self._collector = threading.Thread(name="Unix input collector", target=self.collector_func, daemon=True)
-            self._grouper = threading.Thread(name="Unix input grouper", target=self.grouper_func, daemon=True)
-            self._sigwinch_consumer = threading.Thread(name="Unix SIGWINCH watcher", target=self.watch_sigwinch, daemon=True)
+    def start(self, *, threaded=True):
+        """Start reading input.
 
+        If threaded is true, input is read in a background thread. Otherwise,
+        poll() must be called to read input.
+        """
+        self._begin()
+        if threaded:
+            self._collector = threading.Thread(name="Unix input collector", target=self.collector_func, daemon=True)
             self._collector.start()
-            self._grouper.start()
-            self._sigwinch_consumer.start()
+
+    def start_async(self, loop):
+        """Start reading input using an asyncio event loop instead of threads.
+
+        Resizes are received through the same pipe as when reading input in
+        a thread.
+        """
+        self._begin()
+        self._loop = loop
+        loop.add_reader(self._fd_in, self._on_readable)
+        loop.add_reader(self._wake_r, self._on_wake)
+
+    def _on_wake(self):
+        self._drain_wake()
+        if self._resized:
+            self._resized = False
+            self.emit("resize")
+
+    def _on_readable(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self.feed(self.read(), self._loop.time())
+        if self._closed:
+            self._loop.remove_reader(self._fd_in)
+            self._close()
+            return
+        timeout = self.timeout(self._loop.time())
+        if timeout is not None:
+            self._flush_handle = self._loop.call_later(timeout, self.flush)
 
     def stop(self):
         with self._has_exited_lock:
             if self._has_exited:
                 raise RuntimeError("Input already stopped.")
 
-            # should not be necessary since we (re)open /dev/tty
-            os.set_blocking(self._fd_in, True)
-            self.set_cbreak(False)
+            if self._loop is not None:
+                self._loop.remove_reader(self._fd_in)
+                self._loop.remove_reader(self._wake_r)
+                if self._flush_handle is not None:
+                    self._flush_handle.cancel()
+                    self._flush_handle = None
+                self._loop = None
 
             self._has_exited = True
+            # let the collector thread (if any) exit, and wait for it, since it
+            # may still be parsing input
+            self._wake()
+            collector = self._collector
+            if collector is not None and collector is not threading.current_thread():
+                collector.join()
+            self._collector = None
+            self.flush()
+
+            # should not be necessary since we (re)open /dev/tty
+            os.set_blocking(self._fd_in, True)
+            try:
+                self.set_cbreak(False)
+            except termios.error:
+                # the terminal has hung up
+                if not self._closed:
+                    raise
+                self._cbreak = False
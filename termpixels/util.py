@@ -2,6 +2,26 @@ from unicodedata import east_asian_width, category
 from functools import lru_cache
 import re
 
+def flat_sequence(data):
+    """ return a flat sequence of the items in a list or a buffer
+
+    Objects supporting the buffer protocol (such as arrays, memoryviews and 
+    NumPy arrays) are returned as a one-dimensional memoryview. Other objects
+    are returned unchanged.
+    """
+    try:
+        view = memoryview(data)
+    except TypeError:
+        return data
+    if view.ndim <= 1:
+        return view
+    if view.c_contiguous:
+        return view.cast("B").cast(view.format)
+    flat = view.tolist()
+    for i in range(view.ndim - 1):
+        flat = [item for row in flat for item in row]
+    return flat
+
 def corners_to_box(x0, y0, x1, y1):
     """convert two corners (x0, y0, x1, y1) to (x, y, width, height)"""
     x0, x1 = min(x0, x1), max(x0, x1)
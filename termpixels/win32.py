@@ -181,8 +181,8 @@ def color_win32(col, bg):
     return out
 
 class Win32Backend(Observable):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, *, queue=None):
+        super().__init__(queue)
         # set up buffers
         self._stdout = windll.kernel32.GetStdHandle(STD_OUTPUT_HANDLE)
         self._back_buffer = None
@@ -353,8 +353,8 @@ class Win32Backend(Observable):
 
 
 class Win32Input(Observable):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, *, queue=None):
+        super().__init__(queue)
         self._stdin = windll.kernel32.GetStdHandle(STD_INPUT_HANDLE)
         self._old_mode = None
         self._old_cp = None
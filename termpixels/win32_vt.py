@@ -1,6 +1,8 @@
 from termpixels.win32 import *
+from termpixels.style import sgr_attrs
 from termpixels.util import terminal_len
 from ctypes import windll
+from functools import lru_cache
 
 def detect_vt_console():
     """Check whether new console features are supported"""
@@ -11,10 +13,10 @@ def detect_vt_console():
         return False
 
 class Win32VtBackend(Win32Backend):
-    def __init__(self):
+    def __init__(self, *, queue=None):
         #if not detect_vt_console():
         #    raise Exception("VT processing not supported")
-        super().__init__()
+        super().__init__(queue=queue)
 
         o_flags = ENABLE_PROCESSED_OUTPUT | ENABLE_VIRTUAL_TERMINAL_PROCESSING
         windll.kernel32.SetConsoleMode(self._out_buffer, o_flags)
@@ -22,6 +24,7 @@ class Win32VtBackend(Win32Backend):
         self._buffer = []
         self._termname = "Windows Console (VT)"
         self._fg = None
+        self._style = None
         self.color_mode = "truecolor"
     
     @property
@@ -33,6 +36,7 @@ class Win32VtBackend(Win32Backend):
         if self._fg != color:
             self.write_escape("\x1b[38;2;{};{};{}m".format(color.r, color.g, color.b))
             self._fg = color
+            self._style = None
     
     @property
     def bg(self):
@@ -43,7 +47,25 @@ class Win32VtBackend(Win32Backend):
         if self._bg != color:
             self.write_escape("\x1b[48;2;{};{};{}m".format(color.r, color.g, color.b))
             self._bg = color
+            self._style = None
     
+    def set_style(self, style):
+        """Set the colors and text attributes used for writing from a Style."""
+        if self._style == style:
+            return
+        self.write_escape(self._style_escape(style))
+        self._fg = style.fg
+        self._bg = style.bg
+        self._style = style
+
+    @staticmethod
+    @lru_cache(256)
+    def _style_escape(style):
+        attrs = sgr_attrs(style.attrs)
+        fg, bg = style.fg, style.bg
+        return "\x1b[0{}{};38;2;{};{};{};48;2;{};{};{}m".format(
+            ";" if attrs else "", attrs, fg.r, fg.g, fg.b, bg.r, bg.g, bg.b)
+
     @property
     def cursor_pos(self):
         return self._cursor_pos
@@ -64,6 +86,37 @@ class Win32VtBackend(Win32Backend):
         if self._show_cursor != show_cursor:
             self.write_escape("\x1b[?25{}".format("h" if show_cursor else "l"))
         
+    def clear_screen(self):
+        self.cursor_pos = (0, 0)
+        self.write_escape("\x1b[2J")
+
+    @property
+    def can_erase(self):
+        """Whether erased cells are filled with the current background color."""
+        return True
+
+    def erase_line(self):
+        """Erase from the cursor to the end of the line without moving the cursor."""
+        self.write_escape("\x1b[K")
+
+    def erase_chars(self, n):
+        """Erase n characters starting at the cursor."""
+        self.write_escape("\x1b[{}X".format(n))
+
+    def scroll(self, top, bottom, n):
+        """Scroll the rows from top to bottom (inclusive) up by n rows.
+
+        If n is negative, the rows are scrolled down instead.
+        """
+        if n == 0:
+            return True
+        # setting the scroll margins moves the cursor to the home position
+        self.write_escape("\x1b[{};{}r".format(top + 1, bottom + 1))
+        self.write_escape("\x1b[{}{}".format(abs(n), "S" if n > 0 else "T"))
+        self.write_escape("\x1b[r")
+        self._cursor_pos = None
+        return True
+
     def enter_alt_buffer(self):
         self.write_escape("\x1b[?1049h")
     
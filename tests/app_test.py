@@ -0,0 +1,130 @@
+import asyncio
+import fcntl
+import os
+import pty
+import struct
+import termios
+import pytest
+from termpixels.app import App
+
+def run_loop(coroutine):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+def read_output(master):
+    data = bytearray()
+    while True:
+        try:
+            chunk = os.read(master, 1 << 16)
+        except (BlockingIOError, OSError):
+            return bytes(data)
+        if not chunk:
+            return bytes(data)
+        data.extend(chunk)
+
+@pytest.fixture
+def terminal():
+    master, slave = pty.openpty()
+    fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", 10, 40, 0, 0))
+    os.set_blocking(master, False)
+    yield master, slave
+    os.close(master)
+    os.close(slave)
+
+def assert_restored(app, terminal, attrs):
+    master, slave = terminal
+    assert not app.running
+    assert termios.tcgetattr(slave) == attrs
+    # the alternate screen buffer is exited
+    output = read_output(master)
+    assert output.rfind(b"\x1b[?1049l") > output.rfind(b"\x1b[?1049h") >= 0
+
+def test_app_step(terminal):
+    master, slave = terminal
+    app = App(tty=slave, term="xterm", threaded=False)
+    frames = []
+    app.listen("frame", lambda: frames.append(len(frames)))
+    app.start()
+    try:
+        for i in range(3):
+            app.step()
+            assert len(frames) == i + 1
+        # frames are only emitted by step()
+        app.poll_input(0.05)
+        assert len(frames) == 3
+    finally:
+        app.stop()
+
+def test_app_poll_input(terminal):
+    master, slave = terminal
+    app = App(tty=slave, term="xterm", threaded=False)
+    keys = []
+    app.listen("key", lambda k: keys.append(k.char))
+    app.start()
+    try:
+        os.write(master, b"ab")
+        app.poll_input(1)
+        assert keys == ["a", "b"]
+    finally:
+        app.stop()
+
+def test_app_stop_restores_terminal(terminal):
+    master, slave = terminal
+    attrs = termios.tcgetattr(slave)
+    app = App(tty=slave, term="xterm", threaded=False)
+    stopped = []
+    app.listen("after_stop", lambda: stopped.append(True))
+    app.start()
+    app.step()
+    assert app.running
+    assert termios.tcgetattr(slave) != attrs
+    app.stop()
+    assert stopped == [True]
+    assert_restored(app, terminal, attrs)
+
+def test_app_run_async(terminal):
+    master, slave = terminal
+    attrs = termios.tcgetattr(slave)
+    app = App(tty=slave, term="xterm", framerate=100)
+    frames = []
+    @app.on("frame")
+    def frame():
+        frames.append(True)
+        if len(frames) == 3:
+            app.stop()
+    run_loop(asyncio.wait_for(app.run_async(), 5))
+    assert len(frames) >= 3
+    assert_restored(app, terminal, attrs)
+
+def test_app_run_async_cancel(terminal):
+    master, slave = terminal
+    attrs = termios.tcgetattr(slave)
+    app = App(tty=slave, term="xterm", framerate=100)
+    stopped = []
+    app.listen("after_stop", lambda: stopped.append(True))
+    async def main():
+        task = asyncio.ensure_future(app.run_async())
+        await asyncio.sleep(0.05)
+        assert app.running
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    run_loop(main())
+    assert stopped == [True]
+    assert_restored(app, terminal, attrs)
+
+def test_app_run_async_error(terminal):
+    master, slave = terminal
+    attrs = termios.tcgetattr(slave)
+    app = App(tty=slave, term="xterm", framerate=100)
+    @app.on("frame")
+    def frame():
+        raise ValueError("frame failed")
+    with pytest.raises(ValueError, match="frame failed"):
+        run_loop(asyncio.wait_for(app.run_async(), 5))
+    assert_restored(app, terminal, attrs)
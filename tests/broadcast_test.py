@@ -0,0 +1,138 @@
+import os
+import pty
+import socket
+import pytest
+from termpixels.broadcast import BroadcastBackend
+from termpixels.observable import EventQueue, poll_events
+from termpixels.screen import Screen
+
+def read_all(sock):
+    data = bytearray()
+    while True:
+        try:
+            chunk = sock.recv(1 << 16)
+        except BlockingIOError:
+            return bytes(data)
+        if not chunk:
+            return bytes(data)
+        data.extend(chunk)
+
+@pytest.fixture
+def mirror():
+    backend = BroadcastBackend(20, 5, term="xterm", queue=EventQueue())
+    return backend, Screen(backend)
+
+def test_broadcast_size(mirror):
+    backend, screen = mirror
+    assert backend.size == (20, 5)
+    assert (screen.w, screen.h) == (20, 5)
+
+def test_broadcast_same_bytes(mirror):
+    backend, screen = mirror
+    pairs = [socket.socketpair() for _ in range(3)]
+    for ours, _ in pairs:
+        backend.subscribe(ours)
+    for _, theirs in pairs:
+        theirs.setblocking(False)
+        read_all(theirs)
+
+    screen.print("hello", 2, 1)
+    screen.update()
+    frames = [read_all(theirs) for _, theirs in pairs]
+    assert b"hello" in frames[0]
+    assert frames[0] == frames[1] == frames[2]
+
+def test_broadcast_late_joiner_keyframe(mirror):
+    backend, screen = mirror
+    screen.print("before", 0, 0)
+    screen.update()
+
+    ours, theirs = socket.socketpair()
+    theirs.setblocking(False)
+    backend.subscribe(ours)
+    keyframe = read_all(theirs)
+    assert b"before" in keyframe
+    assert keyframe.startswith(b"\x1b[0m")
+
+    screen.print("after", 0, 1)
+    screen.update()
+    frame = read_all(theirs)
+    assert b"after" in frame
+    assert b"before" not in frame
+
+def test_broadcast_pty(mirror):
+    backend, screen = mirror
+    master, slave = pty.openpty()
+    try:
+        backend.subscribe(slave)
+        screen.print("tty", 0, 0)
+        screen.update()
+        assert b"tty" in os.read(master, 1 << 16)
+    finally:
+        os.close(master)
+        os.close(slave)
+
+def test_broadcast_backlog_resync():
+    backend = BroadcastBackend(20, 5, term="xterm", backlog_limit=4096, queue=EventQueue())
+    screen = Screen(backend)
+    ours, theirs = socket.socketpair()
+    ours.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    theirs.setblocking(False)
+    backend.subscribe(ours)
+
+    # fill the socket without reading it, until the backlog is dropped
+    for i in range(2000):
+        screen.print("frame {:04d}".format(i), 0, i % 5)
+        screen.update()
+    assert backend.backlog(ours) <= 4096
+
+    read_all(theirs)
+    screen.print("latest", 0, 0)
+    screen.update()
+    backend.pump()
+    data = read_all(theirs)
+    while backend.pump():
+        data += read_all(theirs)
+    data += read_all(theirs)
+    # after falling behind, the viewer is sent a complete keyframe
+    assert b"\x1b[2J" in data
+    assert b"latest" in data
+
+def test_broadcast_disconnect():
+    queue = EventQueue()
+    backend = BroadcastBackend(20, 5, term="xterm", queue=queue)
+    screen = Screen(backend)
+    ours, theirs = socket.socketpair()
+    backend.subscribe(ours)
+    disconnected = []
+    backend.listen("disconnect", disconnected.append)
+    theirs.close()
+    screen.print("x", 0, 0)
+    screen.update()
+    assert backend.subscribers == []
+    poll_events(queue)
+    assert disconnected == [ours]
+
+def test_broadcast_keyframe_encoder_reused(mirror):
+    backend, screen = mirror
+    backend.color_mode = "16-color"
+    screen.print("same", 0, 0)
+    screen.update()
+    keyframes = []
+    for _ in range(2):
+        ours, theirs = socket.socketpair()
+        theirs.setblocking(False)
+        backend.subscribe(ours)
+        keyframes.append(read_all(theirs))
+    encoder = backend._encoder
+    assert encoder.color_mode == "16-color"
+    # the same screen gives the same keyframe, though the encoder is reused
+    assert keyframes[0] == keyframes[1]
+    assert b"same" in keyframes[1]
+
+    backend.resize(30, 6)
+    screen.resize(30, 6)
+    screen.print("resized", 0, 5)
+    screen.update()
+    assert backend._encoder is encoder
+    assert backend._keyframe_screen.w == 30
@@ -1,6 +1,8 @@
 import pytest
 from termpixels.buffer import Buffer
 from termpixels.buffer import PixelData
+from termpixels.color import Color
+from termpixels.sparsebuffer import SparseBuffer
 from types import SimpleNamespace
 from unittest.mock import Mock
 from utils import assert_buffer_matches
@@ -68,6 +70,36 @@ def test_buffer_fill_char_none():
     assert buffer.at(0, 0).char == "X"
     assert buffer.at(1, 0).char == "Y"
 
+def test_buffer_hspan():
+    buffer = Buffer(4, 2)
+    buffer.hspan(-1, 1, 4, "X", fg=Color(255, 0, 0))
+    assert_buffer_matches(buffer, "    ", "XXX ")
+    assert buffer.at(2, 1).fg == Color(255, 0, 0)
+    assert buffer.at(3, 1).fg == Color(255, 255, 255)
+
+def test_buffer_hspan_fullwidth():
+    buffer = Buffer(5, 1)
+    buffer.hspan(0, 0, 5, "中")
+    assert buffer.at(0, 0).char == "中"
+    assert buffer.at(1, 0).char == " "
+    assert buffer.at(2, 0).char == "中"
+    assert buffer.at(4, 0).char == " "
+
+def test_buffer_hspan_row_version():
+    buffer = Buffer(3, 2)
+    v0 = buffer.row_version(0)
+    v1 = buffer.row_version(1)
+    buffer.hspan(0, 0, 3, " ")
+    assert buffer.row_version(0) == v0
+    buffer.hspan(0, 0, 3, "X")
+    assert buffer.row_version(0) != v0
+    assert buffer.row_version(1) == v1
+
+def test_buffer_vspan():
+    buffer = Buffer(2, 3)
+    buffer.vspan(1, 1, 5, "X")
+    assert_buffer_matches(buffer, "  ", " X", " X")
+
 def test_buffer_clear_char():
     buffer = Buffer(2, 1)
     buffer.clear(char="X")
@@ -235,3 +267,43 @@ def test_blit_blittable():
     buffer = Buffer(1, 1)
     buffer.blit(blittable)
     assert blittable.blit_to.called
+
+def test_buffer_row_version_changes():
+    buffer = Buffer(2, 2)
+    v0 = buffer.row_version(0)
+    v1 = buffer.row_version(1)
+    buffer.at(1, 0).char = "X"
+    assert buffer.row_version(0) != v0
+    assert buffer.row_version(1) == v1
+
+def test_buffer_row_version_unchanged_by_same_value():
+    buffer = Buffer(2, 1)
+    buffer.clear(char="X")
+    v0 = buffer.row_version(0)
+    buffer.clear(char="X")
+    buffer.at(0, 0).char = "X"
+    assert buffer.row_version(0) == v0
+
+def test_buffer_row_version_after_resize():
+    buffer = Buffer(2, 1)
+    buffer.resize(2, 2)
+    v1 = buffer.row_version(1)
+    buffer.at(0, 1).set(PixelData(char="X"))
+    assert buffer.row_version(1) != v1
+
+def test_sparse_buffer_row_version():
+    buffer = SparseBuffer(2, 2)
+    v0 = buffer.row_version(0)
+    v1 = buffer.row_version(1)
+    buffer.at(1, 0).char = "X"
+    assert buffer.row_version(0) != v0
+    assert buffer.row_version(1) == v1
+
+    buffer.resize(2, 3)
+    v2 = buffer.row_version(2)
+    buffer.at(0, 2).fg = Color(1, 2, 3)
+    assert buffer.row_version(2) != v2
+
+    v0 = buffer.row_version(0)
+    buffer.clear()
+    assert buffer.row_version(0) != v0
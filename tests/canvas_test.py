@@ -0,0 +1,132 @@
+import pytest
+from array import array
+from termpixels.buffer import Buffer
+from termpixels.canvas import Canvas
+from termpixels.color import Color
+from tests.utils import assert_buffer_matches
+
+RED = Color(255, 0, 0)
+BLUE = Color(0, 0, 255)
+BLACK = Color(0, 0, 0)
+
+def test_canvas_size():
+    canvas = Canvas(3, 2, mode="braille")
+    assert (canvas.w, canvas.h) == (6, 8)
+    canvas = Canvas(3, 2, mode="quadrant")
+    assert (canvas.w, canvas.h) == (6, 4)
+    canvas = Canvas(3, 2, mode="half")
+    assert (canvas.w, canvas.h) == (3, 4)
+    with pytest.raises(ValueError):
+        Canvas(1, 1, mode="sextant")
+
+def test_canvas_braille():
+    canvas = Canvas(2, 1, mode="braille")
+    canvas.set(0, 0)
+    canvas.set(1, 3, RED)
+    canvas.set(2, 1)
+    buffer = Buffer(2, 1)
+    buffer.blit(canvas)
+    assert buffer.at(0, 0).char == chr(0x2800 + 0x01 + 0x80)
+    assert buffer.at(0, 0).fg == RED
+    assert buffer.at(1, 0).char == chr(0x2800 + 0x02)
+    assert canvas.get(1, 3) == RED
+    assert canvas.get(0, 1) is None
+
+def test_canvas_braille_unset():
+    canvas = Canvas(1, 1, mode="braille")
+    canvas.fill(0, 0, 2, 4)
+    canvas.unset(0, 0)
+    buffer = Buffer(1, 1)
+    buffer.blit(canvas)
+    assert buffer.at(0, 0).char == chr(0x28FE)
+    canvas.fill(0, 0, 2, 4, on=False)
+    buffer.blit(canvas)
+    assert buffer.at(0, 0).char == " "
+
+def quadrant_colors(pixel):
+    """Decode the colors of the four sub-pixels of a quadrant cell."""
+    bits = " ▘▝▀▖▌▞▛▗▚▐▜▄▙▟█".index(pixel.char)
+    return tuple(pixel.fg if bits & (1 << i) else pixel.bg for i in range(4))
+
+def test_canvas_quadrant():
+    canvas = Canvas(2, 1, mode="quadrant")
+    canvas.set(0, 0, RED)
+    canvas.set(1, 1, RED)
+    canvas.fill(2, 0, 2, 2, color=BLUE)
+    buffer = Buffer(2, 1)
+    buffer.blit(canvas)
+    assert quadrant_colors(buffer.at(0, 0)) == (RED, BLACK, BLACK, RED)
+    assert quadrant_colors(buffer.at(1, 0)) == (BLUE, BLUE, BLUE, BLUE)
+
+def test_canvas_quadrant_best_colors():
+    canvas = Canvas(1, 1, mode="quadrant")
+    canvas.set(0, 0, Color(250, 0, 0))
+    canvas.set(1, 0, Color(255, 0, 0))
+    canvas.fill(0, 1, 2, 1, color=BLUE)
+    buffer = Buffer(1, 1)
+    buffer.blit(canvas)
+    # the two reds are grouped together
+    top_left, top_right, bottom_left, bottom_right = quadrant_colors(buffer.at(0, 0))
+    assert top_left == top_right and top_left.r >= 250
+    assert bottom_left == bottom_right == BLUE
+
+def test_canvas_half():
+    canvas = Canvas(1, 2, mode="half")
+    canvas.set(0, 1, RED)
+    canvas.fill(0, 2, 1, 2, color=BLUE)
+    buffer = Buffer(1, 2)
+    buffer.blit(canvas)
+    assert buffer.at(0, 0).char == "▀"
+    assert buffer.at(0, 0).fg == BLACK
+    assert buffer.at(0, 0).bg == RED
+    assert buffer.at(0, 1).char == " "
+    assert buffer.at(0, 1).bg == BLUE
+
+def test_canvas_out_of_bounds():
+    canvas = Canvas(1, 1, mode="quadrant")
+    canvas.set(-1, 0)
+    canvas.fill(-5, -5, 6, 6, color=RED)
+    assert canvas.get(0, 0) == RED
+    assert canvas.get(1, 1) is None
+
+def test_canvas_rasterizes_changed_cells():
+    canvas = Canvas(3, 1, mode="braille")
+    buffer = Buffer(3, 1)
+    buffer.blit(canvas)
+
+    rendered = []
+    render_cell = canvas._render_cell
+    def spy(cell):
+        rendered.append(cell)
+        return render_cell(cell)
+    canvas._render_cell = spy
+
+    canvas.set(2, 0)
+    buffer.blit(canvas)
+    assert rendered == [1]
+    buffer.blit(canvas)
+    assert rendered == [1]
+
+def test_canvas_blit_offset():
+    canvas = Canvas(2, 2, mode="half")
+    canvas.fill(0, 0, 2, 4, color=RED)
+    buffer = Buffer(3, 3)
+    buffer.blit(canvas, 2, 1)
+    assert buffer.at(2, 1).bg == RED
+    assert buffer.at(2, 2).bg == RED
+    assert buffer.at(1, 1).bg == BLACK
+
+def test_canvas_draw_colormap():
+    canvas = Canvas(2, 1, mode="half")
+    canvas.draw_colormap(array("I", [0xff0000, 0x0000ff, 0x0000ff, 0xff0000]), 0, 0, w=2, h=2)
+    buffer = Buffer(2, 1)
+    buffer.blit(canvas)
+    assert (buffer.at(0, 0).fg, buffer.at(0, 0).bg) == (RED, BLUE)
+    assert (buffer.at(1, 0).fg, buffer.at(1, 0).bg) == (BLUE, RED)
+
+def test_canvas_draw_colormap_transparent():
+    canvas = Canvas(2, 1, mode="braille")
+    canvas.draw_colormap([RED, None, -1, RED], -1, 0, w=2, h=2)
+    assert canvas.get(0, 0) is None
+    assert canvas.get(0, 1) == RED
+    assert canvas.get(1, 1) is None
@@ -1,6 +1,7 @@
 import termpixels.color
 from termpixels.color import Color
 import pytest
+from tests.utils import Integer
 
 def test_color_constructor_rgb():
     c = Color(1,2,3)
@@ -14,6 +15,11 @@ def test_color_constructor_packed():
     assert c.g == 2
     assert c.b == 3
 
+def test_color_constructor_packed_integral():
+    # integer types other than int, such as numpy's, are also accepted
+    c = Color(Integer(0x010203))
+    assert (c.r, c.g, c.b) == (1, 2, 3)
+
 def test_color_constructor_tuple():
     c = Color((0.1, 0.2, 0.3))
     assert c.r == round(0.1 * 255)
@@ -142,6 +148,50 @@ def test_color_rgb_int_cache():
     assert id(a) == id(b)
     assert id(a) != id(c)
 
+def test_color_from_packed():
+    assert Color.from_packed(0x010203) == Color(1,2,3)
+    assert Color.from_packed(0x010203) is Color.from_packed(0x010203)
+    assert Color.from_packed(0x010203).packed == 0x010203
+
+def test_color_from_packed_masked():
+    # equal colors are the same instance, however they are given
+    assert Color.from_packed(-1) is Color.from_packed(0xFFFFFF)
+    assert Color.from_packed(0x1010203) is Color.from_packed(0x010203)
+    assert Color.from_packed(-1).packed == 0xFFFFFF
+
+def test_color_operators_intern():
+    assert Color(1,2,3) + Color(1,1,1) is Color.from_packed(0x020304)
+    assert Color(1,2,3) * 2 is Color.from_packed(0x020406)
+
+def test_color_slots():
+    with pytest.raises(AttributeError):
+        Color(1,2,3).foo = 1
+
+def test_add_packed():
+    assert termpixels.color.add_packed(0x010203, 0x102030) == 0x112233
+    # channels saturate independently
+    assert termpixels.color.add_packed(0x80FF01, 0x8001FF) == 0xFFFFFF
+    assert termpixels.color.add_packed(0x7F0000, 0x010000) == 0x800000
+
+def test_sub_packed():
+    assert termpixels.color.sub_packed(0x112233, 0x102030) == 0x010203
+    # channels saturate independently
+    assert termpixels.color.sub_packed(0x000180, 0x010081) == 0x000100
+    assert termpixels.color.sub_packed(0x800000, 0x010000) == 0x7F0000
+
+def test_mul_packed():
+    assert termpixels.color.mul_packed(0x020202, 0x010305) == 0x02060A
+    assert termpixels.color.mul_packed(0x10FF00, 0x10FFFF) == 0xFFFF00
+
+def test_scale_packed():
+    assert termpixels.color.scale_packed(0x010305, 2) == 0x02060A
+    assert termpixels.color.scale_packed(0x804020, -1) == 0x000000
+
+def test_lerp_packed():
+    assert termpixels.color.lerp_packed(0x000000, 0xFFFFFF, 0.5) == 0x808080
+    assert termpixels.color.lerp_packed(0x102030, 0xFFFFFF, 0) == 0x102030
+    assert termpixels.color.lerp_packed(0x102030, 0xFFFFFF, 1) == 0xFFFFFF
+
 def test_color_rgb():
     assert Color.rgb(0.1,0.2,0.3) == Color((0.1,0.2,0.3))
 
@@ -166,10 +216,42 @@ def test_color_to_256():
     # test grayscale output
     assert termpixels.color.color_to_256(Color.rgb(0.2,0.2,0.2)) == 236 
     assert termpixels.color.color_to_256(Color.rgb(0.5,0.5,0.5)) == 244
-    assert termpixels.color.color_to_256(Color.rgb(0.8,0.8,0.8)) == 251
+    assert termpixels.color.color_to_256(Color.rgb(0.8,0.8,0.8)) == 252
 
     # test a couple RGB colors
     assert termpixels.color.color_to_256(Color(255,0,0)) == 196
     assert termpixels.color.color_to_256(Color(0,255,0)) == 46
     assert termpixels.color.color_to_256(Color(0,0,255)) == 21
     assert termpixels.color.color_to_256(Color(127,127,255)) == 105
+
+def test_color_to_256_named_colors():
+    # named colors are used only when they are strictly closer
+    assert termpixels.color.color_to_256(Color(0xcd, 0, 0)) == 1
+    assert termpixels.color.color_to_256(Color(0xff, 0, 0)) == 196
+
+def test_color_to_256_nearest():
+    # compare against a search of the entire palette
+    palette = termpixels.color.PALETTE_256
+    distance = termpixels.color._color_distance
+    for packed in range(0, 0x1000000, 0x0F1E2D):
+        nearest = min(range(256), key=lambda i: (distance(packed, palette[i]), i < 16))
+        assert termpixels.color.color_to_256(Color.from_packed(packed)) == nearest
+
+def test_colors_to_256():
+    colors = [Color(0,0,0), 0xFFFFFF, Color(0,0,255), 0xFFFFFF]
+    assert termpixels.color.colors_to_256(colors) == bytes([16, 231, 21, 231])
+
+def test_colors_to_16():
+    colors = [Color(0,0,0), 0xFFFFFF, Color(0,0,100)]
+    assert termpixels.color.colors_to_16(colors) == bytes([0, 0o17, 0o4])
+
+def test_colors_to_16_integral():
+    colors = [Integer(0x000000), Integer(0xFFFFFF), 0x0000EE]
+    assert termpixels.color.colors_to_16(colors) == bytes([0, 0o17, 0o4])
+
+def test_palettes():
+    assert len(termpixels.color.PALETTE_16) == 16
+    assert len(termpixels.color.PALETTE_256) == 256
+    assert termpixels.color.PALETTE_256[196] == 0xFF0000
+    assert termpixels.color.PALETTE_256[232] == 0x080808
+
@@ -0,0 +1,233 @@
+import fcntl
+import os
+import pty
+import socket
+import struct
+import termios
+import pytest
+from termpixels.broadcast import BroadcastBackend
+from termpixels.color import Color
+from termpixels.delta import (DeltaBackend, DeltaClient, DeltaDecoder, KEYFRAME, STYLE,
+                              read_varint, unzigzag, write_varint, zigzag)
+from termpixels.observable import EventQueue
+from termpixels.screen import Screen, StyleScreen
+from termpixels.style import BOLD
+from termpixels.unix import UnixBackend
+
+def read_all(sock):
+    data = bytearray()
+    while True:
+        try:
+            chunk = sock.recv(1 << 16)
+        except BlockingIOError:
+            return bytes(data)
+        if not chunk:
+            return bytes(data)
+        data.extend(chunk)
+
+def frame_text(decoder, y):
+    frame = decoder.frame
+    return "".join(frame.at(x, y).char for x in range(frame.w))
+
+@pytest.fixture
+def stream():
+    backend = DeltaBackend(20, 5, queue=EventQueue())
+    screen = StyleScreen(backend)
+    ours, theirs = socket.socketpair()
+    theirs.setblocking(False)
+    backend.subscribe(ours)
+    return screen, theirs
+
+def test_varint():
+    for value in (0, 1, 127, 128, 300, 1 << 40):
+        out = bytearray()
+        write_varint(out, value)
+        assert read_varint(out, 0) == (value, len(out))
+    with pytest.raises(IndexError):
+        read_varint(b"\x80", 0)
+
+def test_zigzag():
+    assert [zigzag(n) for n in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]
+    for n in range(-300, 300):
+        assert unzigzag(zigzag(n)) == n
+
+def test_delta_round_trip(stream):
+    screen, theirs = stream
+    decoder = DeltaDecoder()
+    screen.clear(bg=Color(0, 0, 64))
+    screen.print("hello", 1, 1, fg=Color(255, 0, 0), attrs=BOLD)
+    screen.print("=" * 10, 0, 3)
+    screen.cursor_pos = (4, 2)
+    screen.update()
+    assert decoder.feed(read_all(theirs)) >= 1
+
+    assert frame_text(decoder, 1) == " hello" + " " * 14
+    assert frame_text(decoder, 3) == "=" * 10 + " " * 10
+    pixel = decoder.frame.at(1, 1)
+    assert pixel.fg == Color(255, 0, 0)
+    assert pixel.bg == Color(0, 0, 64)
+    assert pixel.attrs == BOLD
+    assert decoder.cursor_pos == (4, 2)
+
+def test_delta_plain_screen():
+    backend = DeltaBackend(10, 2, queue=EventQueue())
+    screen = Screen(backend)
+    ours, theirs = socket.socketpair()
+    theirs.setblocking(False)
+    backend.subscribe(ours)
+    decoder = DeltaDecoder()
+    screen.print("ab", 0, 0, fg=Color(0, 255, 0))
+    screen.update()
+    decoder.feed(read_all(theirs))
+    assert frame_text(decoder, 0) == "ab" + " " * 8
+    assert decoder.frame.at(0, 0).fg == Color(0, 255, 0)
+
+def test_delta_chunked(stream):
+    screen, theirs = stream
+    screen.print("fullwidth ｗ and text", 0, 0)
+    screen.update()
+    data = read_all(theirs)
+    decoder = DeltaDecoder()
+    frames = 0
+    for i in range(len(data)):
+        frames += decoder.feed(data[i:i + 1])
+    assert frames == 2
+    assert frame_text(decoder, 0).startswith("fullwidth ｗ")
+
+def test_delta_scroll(stream):
+    screen, theirs = stream
+    decoder = DeltaDecoder()
+    for i in range(5):
+        screen.print("line {}".format(i), 0, i)
+    screen.update()
+    decoder.feed(read_all(theirs))
+
+    screen.clear()
+    for i in range(5):
+        screen.print("line {}".format(i + 1), 0, i)
+    screen.update()
+    decoder.feed(read_all(theirs))
+    assert [frame_text(decoder, y).strip() for y in range(5)] == ["line {}".format(i + 1) for i in range(5)]
+
+def test_delta_late_joiner(stream):
+    screen, theirs = stream
+    screen.print("first", 0, 0, fg=Color(1, 2, 3))
+    screen.update()
+    read_all(theirs)
+    screen.print("second", 0, 1, fg=Color(4, 5, 6))
+    screen.update()
+
+    ours, late = socket.socketpair()
+    late.setblocking(False)
+    screen.backend.subscribe(ours)
+    data = read_all(late)
+    assert data[0] == KEYFRAME
+    decoder = DeltaDecoder()
+    decoder.feed(data)
+    assert frame_text(decoder, 0).startswith("first")
+    assert decoder.frame.at(0, 1).fg == Color(4, 5, 6)
+
+    # the late viewer is kept in sync afterwards
+    screen.print("third", 0, 2, fg=Color(7, 8, 9))
+    screen.update()
+    decoder.feed(read_all(late))
+    assert frame_text(decoder, 2).startswith("third")
+    assert decoder.frame.at(0, 2).fg == Color(7, 8, 9)
+
+def test_delta_bad_stream():
+    with pytest.raises(ValueError):
+        DeltaDecoder().feed(bytes([KEYFRAME, 99, 1, 1]))
+    with pytest.raises(ValueError):
+        DeltaDecoder().feed(bytes([4, 0, 0]))
+    # rather than waiting for more data forever
+    with pytest.raises(ValueError, match="not defined"):
+        DeltaDecoder().feed(bytes([KEYFRAME, 1, 1, 1, STYLE, 5]))
+
+def test_delta_recovers_after_bad_data(stream):
+    screen, theirs = stream
+    decoder = DeltaDecoder()
+    screen.print("first", 0, 0)
+    screen.update()
+    decoder.feed(read_all(theirs))
+    with pytest.raises(ValueError, match="not defined"):
+        decoder.feed(bytes([STYLE, 100]))
+    assert len(decoder._data) == 0
+
+    screen.print("second", 0, 1)
+    screen.update()
+    assert decoder.feed(read_all(theirs)) == 1
+    assert frame_text(decoder, 0).startswith("first")
+    assert frame_text(decoder, 1).startswith("second")
+
+def test_delta_many_styles_bounded():
+    backend = DeltaBackend(20, 5, style_limit=64, queue=EventQueue())
+    screen = StyleScreen(backend)
+    ours, theirs = socket.socketpair()
+    theirs.setblocking(False)
+    backend.subscribe(ours)
+    decoder = DeltaDecoder()
+    for i in range(3000):
+        color = Color.from_packed(i * 2654435761 % (1 << 24))
+        screen.print("#", i % 20, i % 5, fg=color)
+        screen.update()
+        decoder.feed(read_all(theirs))
+    assert len(decoder._style_ids) <= 64
+    assert len(decoder.styles) <= 1024
+    assert decoder.frame.at(19, 4).fg == Color.from_packed(2999 * 2654435761 % (1 << 24))
+
+    # a keyframe defines only the styles of the 100 cells on the screen
+    late, late_theirs = socket.socketpair()
+    late_theirs.setblocking(False)
+    backend.subscribe(late)
+    keyframe = read_all(late_theirs)
+    assert len(keyframe) < 2000
+    late_decoder = DeltaDecoder()
+    late_decoder.feed(keyframe)
+    assert len(late_decoder._style_ids) <= 64
+
+    # both viewers stay in sync after the keyframe
+    decoder.feed(read_all(theirs))
+    for i in range(200):
+        screen.print("@", i % 20, (i * 3) % 5, fg=Color(i, 255 - i, 7))
+        screen.update()
+        decoder.feed(read_all(theirs))
+        late_decoder.feed(read_all(late_theirs))
+    for y in range(5):
+        assert frame_text(late_decoder, y) == frame_text(decoder, y)
+        for x in range(20):
+            assert late_decoder.frame.at(x, y).fg == decoder.frame.at(x, y).fg == screen.at(x, y).fg
+
+def test_delta_smaller_than_ansi():
+    queue = EventQueue()
+    delta = StyleScreen(DeltaBackend(40, 10, queue=queue))
+    ansi = StyleScreen(BroadcastBackend(40, 10, term="xterm-256color", queue=queue))
+    sizes = []
+    for screen in (delta, ansi):
+        ours, theirs = socket.socketpair()
+        theirs.setblocking(False)
+        screen.backend.subscribe(ours)
+        total = len(read_all(theirs))
+        for i in range(30):
+            screen.clear(bg=Color(0, 0, 32))
+            screen.print("frame {:03d}".format(i), 1, 1, fg=Color(255, 200, 0))
+            screen.print("#" * (i % 30), 1, 3 + i % 5, fg=Color(0, 255, 0))
+            screen.update()
+            total += len(read_all(theirs))
+        sizes.append(total)
+    assert sizes[0] < sizes[1]
+
+def test_delta_client_pty(stream):
+    screen, theirs = stream
+    master, slave = pty.openpty()
+    fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", 5, 20, 0, 0))
+    try:
+        client = DeltaClient(UnixBackend(tty=slave, term="xterm"), color_mode="16-color")
+        assert client.backend.color_mode == "16-color"
+        screen.print("remote", 2, 1, fg=Color(255, 0, 0))
+        screen.update()
+        client.feed(read_all(theirs))
+        assert client.screen.at(2, 1).char == "r"
+        assert b"remote" in os.read(master, 1 << 16)
+    finally:
+        os.close(master)
+        os.close(slave)
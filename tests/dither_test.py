@@ -0,0 +1,75 @@
+from array import array
+from termpixels.dither import dither_colormap
+from termpixels.color import Color, PALETTE_16, PALETTE_256, color_to_16, color_to_256
+from termpixels.buffer import Buffer
+from termpixels.drawing import draw_colormap
+
+def gradient(w, h):
+    return [Color(round(255 * x / (w - 1)), 40, 200) for y in range(h) for x in range(w)]
+
+def test_dither_truecolor_unchanged():
+    colormap = gradient(8, 2)
+    assert dither_colormap(colormap, 8, 2, "truecolor") == colormap
+
+def test_dither_256_palette_colors():
+    colormap = gradient(16, 4)
+    for color in dither_colormap(colormap, 16, 4, "256-color"):
+        assert PALETTE_256[color_to_256(color)] == color.packed
+
+def test_dither_16_palette_colors():
+    colormap = gradient(16, 4)
+    dithered = dither_colormap(colormap, 16, 4, "16-color")
+    for color in dithered:
+        assert color.packed in PALETTE_16
+        # the backend displays each color as the named color it was taken from
+        assert color_to_16(color) == PALETTE_16.index(color.packed)
+
+def test_dither_16_bright_colors():
+    # between red (0xcd0000) and bright red (0xff0000)
+    colormap = [Color(230, 0, 0)] * 16
+    dithered = dither_colormap(colormap, 4, 4, "16-color")
+    assert {c.packed for c in dithered} == {0xcd0000, 0xff0000}
+    average = sum(c.r for c in dithered) / len(dithered)
+    assert abs(average - 230) < 4
+    assert dither_colormap([Color(255, 255, 0)] * 4, 2, 2, "16-color") == [Color(255, 255, 0)] * 4
+
+def test_dither_16_transparent():
+    dithered = dither_colormap([None, -1, Color(0, 0, 0), 0xffffff], 2, 2, "16-color")
+    assert dithered == [None, None, Color(0, 0, 0), Color(255, 255, 255)]
+
+def test_dither_packed_array():
+    colormap = gradient(8, 2)
+    packed = array("L", (c.packed for c in colormap))
+    expected = dither_colormap(colormap, 8, 2, "256-color")
+    assert dither_colormap(packed, 8, 2, "256-color") == expected
+
+def test_dither_exact_colors_unchanged():
+    colormap = [Color(95, 135, 255)] * 16
+    assert dither_colormap(colormap, 4, 4, "256-color") == colormap
+
+def test_dither_preserves_average():
+    w = 64
+    colormap = [Color(120, 120, 120)] * (w * 4)
+    dithered = dither_colormap(colormap, w, 4, "256-color")
+    average = sum(c.r for c in dithered) / len(dithered)
+    assert abs(average - 120) < 4
+
+def test_dither_transparent():
+    colormap = [None, Color(10, 20, 30), 0x102030, None]
+    dithered = dither_colormap(colormap, 2, 2, "256-color")
+    assert dithered[0] is None and dithered[3] is None
+    assert dithered[1] == dithered[2]
+
+def test_dither_aligned_to_destination():
+    # the pattern depends on the destination position, not the colormap
+    colormap = gradient(8, 8)
+    a = dither_colormap(colormap, 8, 8, "256-color", x=2, y=1)
+    b = dither_colormap(colormap[8:], 8, 7, "256-color", x=2, y=2)
+    assert a[8:] == b
+
+def test_draw_colormap_dither():
+    buffer = Buffer(4, 4)
+    colormap = gradient(4, 4)
+    draw_colormap(buffer, colormap, 0, 0, w=4, h=4, dither="256-color")
+    expected = dither_colormap(colormap, 4, 4, "256-color")
+    assert buffer.at(3, 2).fg == expected[2 * 4 + 3]
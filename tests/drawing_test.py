@@ -5,7 +5,14 @@ from termpixels.drawing import draw_vline
 from termpixels.drawing import draw_box
 from termpixels.drawing import draw_spinner
 from termpixels.drawing import draw_progress
-from tests.utils import assert_buffer_matches
+from termpixels.drawing import draw_colormap, draw_colormap_2x
+from termpixels.drawing import draw_line, draw_circle, draw_ellipse, draw_polygon, flood_fill
+from termpixels.drawing import draw_frame, draw_frames, draw_grid, _isqrt
+from termpixels.canvas import Canvas
+from termpixels.color import Color
+from array import array
+from termpixels.stylebuffer import StyleBuffer
+from tests.utils import assert_buffer_matches, Integer
 
 _BOX_CHARS_TEST = "tblrABCD"
 
@@ -73,6 +80,51 @@ def test_drawing_draw_box_negative_dim():
         "   "
     )
 
+def test_drawing_draw_frame():
+    buffer = Buffer(5, 3)
+    draw_frame(buffer, 0, 0, 5, 3)
+    assert_buffer_matches(
+        buffer,
+        "┌───┐",
+        "│   │",
+        "└───┘",
+    )
+
+def test_drawing_draw_frame_connects():
+    buffer = Buffer(5, 3)
+    draw_frame(buffer, 0, 0, 3, 3)
+    draw_frame(buffer, 2, 0, 3, 3)
+    assert_buffer_matches(
+        buffer,
+        "┌─┬─┐",
+        "│ │ │",
+        "└─┴─┘",
+    )
+
+def test_drawing_draw_frames_overlap():
+    buffer = Buffer(6, 4)
+    draw_frames(buffer, [(0, 0, 4, 3), (2, 1, 4, 3)])
+    assert_buffer_matches(
+        buffer,
+        "┌──┐  ",
+        "│ ┌┼─┐",
+        "└─┼┘ │",
+        "  └──┘",
+    )
+
+def test_drawing_draw_grid():
+    buffer = Buffer(8, 6)
+    draw_grid(buffer, 0, 0, [2, 3], [1, 2])
+    assert_buffer_matches(
+        buffer,
+        "┌──┬───┐",
+        "│  │   │",
+        "├──┼───┤",
+        "│  │   │",
+        "│  │   │",
+        "└──┴───┘",
+    )
+
 def test_drawing_draw_spinner():
     buffer = Buffer(1, 1)
 
@@ -166,3 +218,187 @@ def test_drawing_draw_progress_multi_head():
         buffer,
         "[===3x]"
     ) 
+
+def test_drawing_draw_colormap():
+    buffer = Buffer(3, 2)
+    red = Color(255, 0, 0)
+    draw_colormap(buffer, [red, None, 0x0000FF, -1], 1, 0, w=2, h=2, char="#")
+    assert_buffer_matches(buffer, " # ", " # ")
+    assert buffer.at(1, 0).fg == red
+    assert buffer.at(1, 1).fg == Color(0, 0, 255)
+
+def test_drawing_draw_colormap_array():
+    buffer = Buffer(2, 2)
+    colormap = array("I", [0x010203, 0x040506, 0x070809, 0x0A0B0C])
+    draw_colormap(buffer, colormap, 0, 0, w=2, h=2)
+    assert buffer.at(1, 1).fg == Color(10, 11, 12)
+
+    # a two-dimensional buffer
+    buffer = Buffer(2, 2)
+    view = memoryview(colormap).cast("B").cast("I", [2, 2])
+    draw_colormap(buffer, view, 0, 0, w=2, h=2)
+    assert buffer.at(0, 1).fg == Color(7, 8, 9)
+
+def test_drawing_draw_colormap_clip():
+    buffer = Buffer(2, 2)
+    colormap = array("I", range(9))
+    draw_colormap(buffer, colormap, -1, -1, w=3, h=3, char="#")
+    assert_buffer_matches(buffer, "##", "##")
+    assert buffer.at(0, 0).fg == Color.from_packed(4)
+    assert buffer.at(1, 1).fg == Color.from_packed(8)
+
+def test_drawing_draw_colormap_2x():
+    buffer = Buffer(2, 2)
+    colormap = array("I", [1, 2, 3, 4, 5, 6])
+    draw_colormap_2x(buffer, colormap, 0, 0.5, w=2, h=3)
+    # the first row is drawn at the bottom of the first cell
+    assert buffer.at(0, 0).bg == Color.from_packed(1)
+    assert buffer.at(0, 0).fg == Color(0, 0, 0)
+    assert buffer.at(1, 1).fg == Color.from_packed(4)
+    assert buffer.at(1, 1).bg == Color.from_packed(6)
+    assert buffer.at(0, 1).char == "▀"
+
+def test_drawing_draw_colormap_integral():
+    buffer = Buffer(3, 1)
+    draw_colormap(buffer, [Integer(0x010203), Integer(-1), 0x040506], 0, 0, w=3, h=1, char="#")
+    assert_buffer_matches(buffer, "# #")
+    assert buffer.at(0, 0).fg == Color(1, 2, 3)
+    assert buffer.at(2, 0).fg == Color(4, 5, 6)
+
+@pytest.mark.parametrize("buffer_class", [Buffer, StyleBuffer])
+def test_drawing_draw_colormap_rows(buffer_class):
+    buffer = buffer_class(3, 2)
+    buffer.put_char("x", 1, 1, bg=Color(9, 9, 9))
+    versions = [buffer.row_version(y) for y in range(2)]
+    colormap = array("I", [1, 2, 3, 4, 5, 6, 7, 8, 9])
+    draw_colormap_2x(buffer, colormap, 0, 0, w=3, h=3)
+    assert [buffer.row_version(y) for y in range(2)] != versions
+    for x in range(3):
+        assert buffer.at(x, 0).char == "▀"
+        assert buffer.at(x, 0).fg == Color.from_packed(1 + x)
+        assert buffer.at(x, 0).bg == Color.from_packed(4 + x)
+        assert buffer.at(x, 1).char == "▀"
+        assert buffer.at(x, 1).fg == Color.from_packed(7 + x)
+    # the background of the cell below is unchanged
+    assert buffer.at(1, 1).bg == Color(9, 9, 9)
+
+    # drawing the same colormap again changes nothing
+    versions = [buffer.row_version(y) for y in range(2)]
+    draw_colormap_2x(buffer, colormap, 0, 0, w=3, h=3)
+    assert [buffer.row_version(y) for y in range(2)] == versions
+
+def test_drawing_draw_line():
+    buffer = Buffer(5, 3)
+    draw_line(buffer, 0, 0, 4, 2, char="#")
+    assert_buffer_matches(
+        buffer,
+        "#    ",
+        " ##  ",
+        "   ##",
+    )
+
+def test_drawing_draw_line_steep():
+    buffer = Buffer(3, 4)
+    draw_line(buffer, 2, 3, 0, 0, char="#")
+    assert_buffer_matches(
+        buffer,
+        "#  ",
+        " # ",
+        " # ",
+        "  #",
+    )
+
+def test_drawing_draw_line_clip():
+    # clipping should give the same pixels as drawing the whole line
+    big = Buffer(40, 40)
+    draw_line(big, 3, 5, 37, 31, char="#")
+    small = Buffer(20, 20)
+    draw_line(small, -7, -5, 27, 21, char="#")
+    for y in range(20):
+        for x in range(20):
+            assert small.at(x, y).char == big.at(x + 10, y + 10).char
+
+    # distant lines should not be slow to clip
+    draw_line(small, -10**9, 0, 10**9, 1, char="#")
+
+def test_drawing_draw_circle():
+    buffer = Buffer(7, 7)
+    draw_circle(buffer, 3, 3, 3, char="#")
+    assert_buffer_matches(
+        buffer,
+        "  ###  ",
+        " #   # ",
+        "#     #",
+        "#     #",
+        "#     #",
+        " #   # ",
+        "  ###  ",
+    )
+
+def test_drawing_draw_circle_fill():
+    buffer = Buffer(5, 5)
+    draw_circle(buffer, 2, 2, 2, fill=True, char="#")
+    assert_buffer_matches(
+        buffer,
+        " ### ",
+        "#####",
+        "#####",
+        "#####",
+        " ### ",
+    )
+
+def test_drawing_draw_ellipse():
+    buffer = Buffer(7, 3)
+    draw_ellipse(buffer, 3, 1, 3, 1, char="#")
+    assert_buffer_matches(
+        buffer,
+        " ##### ",
+        "#     #",
+        " ##### ",
+    )
+
+def test_drawing_draw_polygon_fill():
+    buffer = Buffer(5, 5)
+    draw_polygon(buffer, [(0, 0), (4, 0), (4, 4), (0, 4)], fill=True, char="#")
+    for y in range(5):
+        assert "".join(buffer.at(x, y).char for x in range(5)) == "#####"
+
+def test_drawing_draw_polygon_canvas():
+    canvas = Canvas(2, 1, mode="braille")
+    draw_polygon(canvas, [(0, 0), (3, 0), (3, 3)], color=0xFF0000)
+    assert canvas.get(0, 0).packed == 0xFF0000
+    assert canvas.get(3, 3) is not None
+    assert canvas.get(0, 3) is None
+
+def test_drawing_flood_fill():
+    buffer = Buffer(5, 4)
+    draw_box(buffer, 0, 0, 5, 4, chars=_BOX_CHARS_TEST)
+    draw_line(buffer, 2, 0, 2, 3, char="|")
+    flood_fill(buffer, 1, 1, char=".")
+    assert_buffer_matches(
+        buffer,
+        "At|tB",
+        "l.| r",
+        "l.| r",
+        "Cb|bD",
+    )
+
+def test_drawing_flood_fill_same_value():
+    buffer = Buffer(3, 3)
+    flood_fill(buffer, 1, 1, char=" ")
+    assert_buffer_matches(buffer, "   ", "   ", "   ")
+
+def test_drawing_flood_fill_canvas():
+    canvas = Canvas(2, 2, mode="quadrant")
+    draw_line(canvas, 0, 2, 3, 2)
+    flood_fill(canvas, 0, 0, color=0x0000FF)
+    assert canvas.get(3, 1).packed == 0x0000FF
+    assert canvas.get(3, 3) is None
+
+
+def test_isqrt():
+    for n in range(1000):
+        assert _isqrt(n) == int(n ** 0.5 + 1e-9)
+    big = 10 ** 20 + 1
+    assert _isqrt(big * big - 1) == big - 1
+    assert _isqrt(big * big) == big
@@ -0,0 +1,84 @@
+import math
+import pytest
+from termpixels.gradient import Palette, Gradient, linear_colormap, radial_colormap, fill_linear, fill_radial
+from termpixels.buffer import Buffer
+from termpixels.canvas import Canvas
+from termpixels.color import Color
+
+RED = Color(255, 0, 0)
+BLUE = Color(0, 0, 255)
+
+def test_palette_at_clamps():
+    palette = Palette([RED, 0x00ff00, BLUE])
+    assert palette.at(0) is Color.from_packed(0xff0000)
+    assert palette.at(0.5) == Color(0, 255, 0)
+    assert palette.at(1) == BLUE
+    assert palette.at(-1) == RED
+    assert palette.at(2) == BLUE
+
+def test_palette_cyclic():
+    palette = Palette([RED, BLUE], cyclic=True)
+    assert palette.at(0) == RED
+    assert palette.at(0.5) == BLUE
+    assert palette.at(1) == RED
+    assert palette.at(-0.5) == BLUE
+
+def test_palette_empty():
+    with pytest.raises(ValueError):
+        Palette([])
+
+def test_gradient_rgb():
+    gradient = Gradient(RED, BLUE, size=5)
+    assert len(gradient) == 5
+    assert list(gradient.packed) == [0xff0000, 0xbf0040, 0x800080, 0x4000bf, 0x0000ff]
+
+def test_gradient_stop_positions():
+    gradient = Gradient((0.5, RED), (1, BLUE), size=5)
+    assert list(gradient.packed) == [0xff0000, 0xff0000, 0xff0000, 0x800080, 0x0000ff]
+
+def test_gradient_hsl():
+    gradient = Gradient(RED, BLUE, size=3, interpolate="hsl")
+    # the shorter way from red to blue is through magenta
+    assert gradient[1] == Color(255, 0, 255)
+
+def test_gradient_cyclic():
+    gradient = Gradient(RED, BLUE, size=4, cyclic=True)
+    assert gradient[0] == RED
+    assert gradient[2] == BLUE
+    assert gradient[1] == gradient[3]
+
+def test_gradient_hues():
+    hues = Gradient.hues(1, 0.5)
+    assert hues.cyclic
+    for t in (0, 1 / 3, 2 / 3, 1.25):
+        expected = Color.hsl(t % 1, 1, 0.5)
+        color = hues.at(t)
+        assert abs(color.r - expected.r) + abs(color.g - expected.g) + abs(color.b - expected.b) <= 12
+
+def test_linear_colormap():
+    gradient = Gradient(RED, BLUE, size=5)
+    colormap = linear_colormap(gradient, 5, 2)
+    assert list(colormap) == list(gradient.packed) * 2
+    colormap = linear_colormap(gradient, 2, 5, angle=math.pi / 2)
+    assert list(colormap[::2]) == list(gradient.packed)
+    assert list(colormap[1::2]) == list(gradient.packed)
+
+def test_radial_colormap():
+    gradient = Gradient(RED, BLUE, size=3)
+    colormap = radial_colormap(gradient, 3, 3)
+    assert colormap[4] == RED.packed
+    assert colormap[0] == BLUE.packed
+    assert colormap[1] == gradient[1].packed
+
+def test_fill_linear_buffer():
+    buffer = Buffer(3, 1)
+    fill_linear(buffer, Gradient(RED, BLUE, size=3), 0, 0, 3, 1, char="#")
+    assert buffer.at(0, 0).fg == RED
+    assert buffer.at(2, 0).fg == BLUE
+    assert buffer.at(1, 0).char == "#"
+
+def test_fill_radial_canvas():
+    canvas = Canvas(2, 2, mode="half")
+    fill_radial(canvas, Gradient(RED, BLUE, size=2), 0, 0, 2, 4)
+    assert canvas.get(0, 0) == BLUE
+    assert canvas.get(1, 2) == RED
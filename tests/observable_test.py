@@ -1,7 +1,19 @@
-from termpixels.observable import Observable, poll_events, Event
+from termpixels.observable import (Observable, poll_events, Event, EventQueue, LoopInterval,
+                                   start_polling, stop_polling, join_polling)
+import asyncio
+import termpixels.observable
 import threading
 import pytest
 
+def run_loop(coroutine):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
 def test_observable_listen_emit():
     o = Observable()
     def listener():
@@ -206,3 +218,510 @@ def test_observable_listener_priority():
     o.emit("A")
     poll_events()
     assert handled_1 and handled_2 and handled_3
+
+def test_observable_coroutine_listener():
+    o = Observable()
+    result = []
+
+    @o.on("test")
+    async def listener(data):
+        await asyncio.sleep(0)
+        result.append(data)
+
+    async def main():
+        o.emit("test", 1)
+        poll_events()
+        assert result == []
+        await asyncio.sleep(0.01)
+        assert result == [1]
+    run_loop(main())
+
+def test_observable_coroutine_listener_without_loop():
+    o = Observable()
+    result = []
+
+    done = threading.Event()
+
+    @o.on("test")
+    async def listener(data):
+        result.append((data, threading.current_thread()))
+        done.set()
+
+    o.emit("test", 1)
+    poll_events()
+    # the coroutine runs on a background loop, without blocking dispatch
+    assert done.wait(1)
+    assert result[0][0] == 1
+    assert result[0][1] is not threading.current_thread()
+
+def test_observable_coroutine_listener_error():
+    queue = EventQueue()
+    o = Observable(queue)
+
+    @o.on("test")
+    async def listener():
+        raise ValueError("failed")
+
+    o.emit("test")
+    with pytest.raises(ValueError, match="failed"):
+        poll_events(queue)
+        poll_events(queue, timeout=1)
+
+def test_observable_next_emitted_during_listen():
+    o = Observable()
+    listen = o.listen
+
+    def listen_and_emit(event_name, listener, **kwargs):
+        # another thread emitting before listen() returns
+        handle = listen(event_name, listener, **kwargs)
+        o.emit(event_name, 1, sync=True)
+        return handle
+    o.listen = listen_and_emit
+
+    async def main():
+        future = o.next("test")
+        assert await future == 1
+        assert len(o._listeners["test"]) == 0
+    run_loop(main())
+
+def test_observable_next():
+    o = Observable()
+
+    async def main():
+        future = o.next("test")
+        o.emit("test", 123)
+        o.emit("test", 456)
+        poll_events()
+        assert await future == 123
+        assert len(o._listeners["test"]) == 0
+    run_loop(main())
+
+def test_observable_next_multiple_args():
+    o = Observable()
+
+    async def main():
+        future = o.next("test")
+        o.emit("test", 1, 2)
+        poll_events()
+        assert await future == (1, 2)
+    run_loop(main())
+
+def test_event_queue_waker():
+    queue = EventQueue()
+    o = Observable(queue)
+    wakes = []
+    queue.set_waker(lambda: wakes.append(queue.qsize()))
+    o.emit("test")
+    assert wakes == [1]
+    queue.set_waker(None)
+    o.emit("test")
+    assert wakes == [1]
+
+def test_loop_interval():
+    queue = EventQueue()
+    o = Observable(queue)
+    count = 0
+
+    @o.on("tick")
+    def tick():
+        nonlocal count
+        count += 1
+
+    async def main():
+        interval = o.create_interval("tick", 0.01)
+        assert isinstance(interval, LoopInterval)
+        queue.set_waker(lambda: asyncio.get_event_loop().call_soon(poll_events, queue))
+        interval.start()
+        await asyncio.sleep(0.055)
+        interval.cancel()
+        n = count
+        await asyncio.sleep(0.03)
+        assert count == n
+        assert 2 <= n <= 6
+    run_loop(main())
+
+def test_observable_emit_sync():
+    o = Observable()
+    calls = []
+    o.listen("test", lambda x, y=None: calls.append((x, y)))
+    o.emit("test", 1, y=2, sync=True)
+    assert calls == [(1, 2)]
+    poll_events()
+    assert calls == [(1, 2)]
+
+def test_observable_propagate_event_dispatches_directly():
+    a = Observable()
+    b = Observable()
+    b.propagate_event(a, "test")
+    order = []
+    b.listen("test", lambda: order.append("propagated"))
+    a.listen("test", lambda: order.append("source"))
+
+    a.emit("test")
+    poll_events()
+    assert order == ["propagated", "source"]
+
+def test_observable_propagate_event_queued():
+    a = Observable()
+    b = Observable()
+    b.propagate_event(a, "test", sync=False)
+    order = []
+    b.listen("test", lambda: order.append("propagated"))
+    a.listen("test", lambda: order.append("source"))
+
+    a.emit("test")
+    poll_events()
+    assert order == ["source", "propagated"]
+
+def test_event_traceback():
+    def make_event():
+        return Event(source=None, name="test")
+    event = make_event()
+    assert not hasattr(event, "__dict__")
+    # the last two frames are Event.__init__ and the function creating it
+    lines = event._traceback
+    assert "in __init__" in lines[-1]
+    assert "in make_event" in lines[-2]
+    assert "in test_event_traceback" in lines[-3]
+    assert "return Event(" in lines[-2]
+
+def test_event_queue_input_first():
+    o = Observable()
+    order = []
+    for name in ("A", "frame", "key", "mouse"):
+        o.listen(name, lambda name=name: order.append(name))
+    o.emit("A")
+    o.emit("frame")
+    o.emit("key")
+    o.emit("mouse")
+    poll_events()
+    assert order == ["key", "mouse", "frame", "A"]
+
+def test_event_queue_background_budget():
+    queue = EventQueue(background_budget=2)
+    o = Observable(queue)
+    o.set_event_lane("work", "background")
+    order = []
+    o.listen("work", lambda i: order.append(i))
+    o.listen("A", lambda: order.append("A"))
+    o.listen("frame", lambda: order.append("frame"))
+    for i in range(4):
+        o.emit("work", i)
+    o.emit("A")
+    o.emit("frame")
+    o.emit("A")
+    poll_events(queue)
+    # two background events are taken after the frame, the rest when idle
+    assert order == ["frame", 0, 1, "A", "A", 2, 3]
+
+def test_event_queue_ordered_events():
+    queue = EventQueue()
+    o = Observable(queue)
+    order = []
+    for name in ("start", "key", "tick", "A"):
+        o.listen(name, lambda name=name: order.append(name))
+    o.set_event_lane("tick", "timer")
+    o.emit("A")
+    o.emit("start")
+    o.emit("key")
+    o.emit("tick")
+    poll_events(queue)
+    # events before "start" may be reordered, but none put after it overtake it
+    assert order == ["A", "start", "key", "tick"]
+
+    order.clear()
+    queue.set_ordered("start", False)
+    o.emit("start")
+    o.emit("key")
+    poll_events(queue)
+    assert order == ["key", "start"]
+
+def test_event_queue_stop_polling_first():
+    queue = EventQueue()
+    o = Observable(queue)
+    stopped = threading.Event()
+    order = []
+    o.set_event_lane("work", "background")
+    o.listen("work", lambda: order.append("work"))
+    o.listen("frame", lambda: (stopped.wait(1), order.append("frame")))
+    start_polling(queue)
+    o.emit("frame")
+    o.emit("work")
+    o.emit("frame")
+    stop_polling(queue)
+    stopped.set()
+    queue.join()
+    # the events queued before stopping are still dispatched
+    assert sorted(order) == ["frame", "frame", "work"]
+    assert queue.qsize() == 0
+
+    queue.put(Event(source=o, name="frame"))
+    queue.put(termpixels.observable._STOP_POLLING)
+    assert queue.get_nowait() is termpixels.observable._STOP_POLLING
+
+def test_event_queue_lanes():
+    queue = EventQueue()
+    queue.put(Event(source=None, name="A", lane="timer"))
+    queue.put(Event(source=None, name="B"))
+    assert queue.qsize() == 2
+    assert queue.lane_size("timer") == 1
+    assert queue.lane_size("default") == 1
+    with pytest.raises(ValueError):
+        queue.set_lane("A", "nonexistent")
+    assert queue.get_nowait().name == "A"
+    queue.task_done()
+    assert queue.get_nowait().name == "B"
+    queue.task_done()
+    queue.join()
+
+def test_observable_listen_handle():
+    o = Observable()
+    calls = []
+    handle = o.listen("test", lambda: calls.append(1))
+    assert handle.active
+    handle.off()
+    assert not handle.active
+    handle.off()
+    o.emit("test", sync=True)
+    assert calls == []
+    with pytest.raises(ValueError):
+        o.unlisten("test", handle.listener)
+
+def test_observable_listener_priority_stable():
+    o = Observable()
+    order = []
+    for i, priority in enumerate([0, 1, 0, 2, 1, 0]):
+        o.listen("test", lambda i=i: order.append(i), priority=priority)
+    o.emit("test", sync=True)
+    assert order == [3, 1, 4, 0, 2, 5]
+
+def test_observable_listen_weak():
+    o = Observable()
+    calls = []
+    class Widget:
+        def on_test(self):
+            calls.append(self)
+    widget = Widget()
+    handle = o.listen("test", widget.on_test, weak=True)
+    o.emit("test", sync=True)
+    assert calls == [widget]
+    o.unlisten("test", widget.on_test)
+    assert not handle.active
+
+    handle = o.listen("test", widget.on_test, weak=True)
+    calls.clear()
+    del widget
+    assert not handle.active
+    assert len(o._listeners["test"]) == 0
+    o.emit("test", sync=True)
+    assert calls == []
+
+def test_observable_mutation_during_dispatch():
+    o = Observable()
+    order = []
+    def first():
+        order.append("first")
+        second_handle.off()
+        o.listen("test", lambda: order.append("added"))
+    o.listen("test", first)
+    second_handle = o.listen("test", lambda: order.append("second"))
+    o.listen("test", lambda: order.append("third"))
+
+    o.emit("test", sync=True)
+    assert order == ["first", "third"]
+    order.clear()
+    first_handle = o._listeners["test"]._by_listener[first][0]
+    first_handle.off()
+    o.emit("test", sync=True)
+    assert order == ["third", "added"]
+
+def test_observable_many_listeners():
+    o = Observable()
+    handles = [o.listen("test", lambda: None, priority=i % 7) for i in range(2000)]
+    for handle in handles[:1500]:
+        handle.off()
+    listeners = o._listeners["test"]
+    assert len(listeners) == 500
+    assert len(listeners._handles) < 1500
+    keys = [h._key for h in listeners._handles]
+    assert keys == sorted(keys)
+
+def test_observable_submit():
+    o = Observable()
+    results = []
+    o.listen("done", results.append)
+    future = o.submit(sum, [1, 2, 3], event="done")
+    assert future.result(timeout=5) == 6
+    poll_events(timeout=5)
+    assert results == [6]
+
+def test_observable_submit_default_executor(monkeypatch):
+    # build the shared executor from scratch rather than reuse one from an earlier test
+    monkeypatch.setattr(termpixels.observable, "_shared_executor", None)
+    o = Observable()
+    future = o.submit(pow, 2, 10)
+    assert future.result(timeout=5) == 1024
+    executor = termpixels.observable._shared_executor
+    assert executor is not None
+    assert Observable().submit(abs, -1).result(timeout=5) == 1
+    assert termpixels.observable._shared_executor is executor
+    executor.shutdown()
+
+def test_observable_submit_error_event():
+    o = Observable()
+    errors = []
+    o.listen("failed", errors.append)
+    future = o.submit(int, "x", event="done", error_event="failed")
+    future.exception(timeout=5)
+    poll_events(timeout=5)
+    assert isinstance(errors[0], ValueError)
+
+def test_observable_submit_unhandled_error():
+    o = Observable()
+    future = o.submit(int, "x")
+    future.exception(timeout=5)
+    with pytest.raises(ValueError):
+        poll_events(timeout=5)
+
+def test_observable_cancel_submitted():
+    o = Observable()
+    o.set_executor("thread")
+    results = []
+    o.listen("done", results.append)
+    started = threading.Event()
+    release = threading.Event()
+    def slow():
+        started.set()
+        release.wait(5)
+        return "slow"
+    running = o.submit(slow, event="done")
+    started.wait(5)
+    o.cancel_submitted()
+    # callbacks run in order, so this one runs after the one emitting "done"
+    finished = threading.Event()
+    running.add_done_callback(lambda future: finished.set())
+    release.set()
+    assert finished.wait(5)
+    poll_events()
+    assert results == []
+
+def test_observable_cancel_submitted_shutdown():
+    o = Observable()
+    o.set_executor("thread")
+    release = threading.Event()
+    # more calls than the executor has threads, so that the last has not started
+    futures = [o.submit(release.wait, 5) for _ in range(64)]
+    o.cancel_submitted(shutdown=True)
+    assert futures[-1].cancelled()
+    release.set()
+    for future in futures:
+        if not future.cancelled():
+            future.result(timeout=5)
+
+def test_observable_submit_process():
+    o = Observable()
+    o.set_executor("process")
+    results = []
+    o.listen("done", results.append)
+    o.submit(pow, 2, 10, event="done").result(timeout=30)
+    poll_events(timeout=5)
+    assert results == [1024]
+    o.cancel_submitted(shutdown=True)
+
+def test_observable_set_executor_invalid():
+    with pytest.raises(ValueError):
+        Observable().set_executor("fiber")
+
+def test_start_stop_polling_per_queue():
+    from termpixels.observable import start_polling, stop_polling
+    queue_a = EventQueue()
+    queue_b = EventQueue()
+    assert start_polling(queue_a)
+    assert not start_polling(queue_a)
+    assert start_polling(queue_b)
+    dispatcher = queue_a._dispatcher
+
+    o = Observable(queue_a)
+    done = threading.Event()
+    o.listen("test", done.set)
+    o.emit("test")
+    assert done.wait(5)
+
+    assert stop_polling(queue_a)
+    assert not stop_polling(queue_a)
+    queue_a.join()
+    dispatcher.join(5)
+    assert not dispatcher.is_alive()
+    assert queue_b._dispatcher.is_alive()
+    stop_polling(queue_b)
+
+def test_stop_then_restart_polling():
+    queue = EventQueue()
+    o = Observable(queue)
+    release = threading.Event()
+    active = []
+    overlaps = []
+    order = []
+    def listener(i):
+        if active:
+            overlaps.append(i)
+        active.append(i)
+        if i == 0:
+            release.wait(5)
+        order.append(i)
+        active.pop()
+    o.listen("test", listener)
+    assert start_polling(queue)
+    old = queue._dispatcher
+    o.emit("test", 0)
+    assert stop_polling(queue)
+    o.emit("test", 1)
+
+    # the new daemon is only started once the old one has exited
+    restarted = []
+    restart = threading.Thread(target=lambda: restarted.append(start_polling(queue)))
+    restart.start()
+    restart.join(0.1)
+    assert restart.is_alive()
+    release.set()
+    restart.join(5)
+    assert restarted == [True]
+    assert not old.is_alive()
+    assert queue._dispatcher is not old
+
+    o.emit("test", 2)
+    queue.join()
+    assert order == [0, 1, 2]
+    assert overlaps == []
+    assert stop_polling(queue)
+    join_polling(queue, 5)
+    assert queue._dispatcher is None
+
+def test_restart_polling_from_listener():
+    queue = EventQueue()
+    o = Observable(queue)
+    done = threading.Event()
+    release = threading.Event()
+    o.listen("hold", lambda: release.wait(5))
+    o.listen("restart", lambda: start_polling(queue))
+    o.listen("test", done.set)
+    start_polling(queue)
+    dispatcher = queue._dispatcher
+    o.emit("hold")
+    o.emit("restart")
+    stop_polling(queue)
+    release.set()
+    queue.join()
+    # the stopping daemon keeps polling rather than waiting for itself
+    o.emit("test")
+    assert done.wait(5)
+    assert queue._dispatcher is dispatcher and dispatcher.is_alive()
+    stop_polling(queue)
+    join_polling(queue, 5)
+    assert not dispatcher.is_alive()
+
+def test_interval_uses_source_queue():
+    from termpixels.observable import Interval
+    queue = EventQueue()
+    o = Observable(queue)
+    assert Interval("test", 1, source=o).queue is queue
@@ -0,0 +1,325 @@
+from termpixels.observable import Observable
+from termpixels.screen import Screen, StyleScreen
+from termpixels.stylebuffer import StyleBuffer
+from termpixels.style import BOLD, UNDERLINE
+from termpixels.color import Color
+from tests.utils import FakeBackend, assert_backend_matches
+
+def make_screen(w, h, **kwargs):
+    backend = FakeBackend(w, h, **kwargs)
+    return Screen(backend, Observable()), backend
+
+def test_screen_update():
+    screen, backend = make_screen(3, 2)
+    screen.clear()
+    screen.print("ab", 1, 1)
+    screen.update()
+    assert backend.lines() == ["   ", " ab"]
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_only_changes():
+    screen, backend = make_screen(3, 2)
+    screen.clear()
+    screen.update()
+    backend.chars_written = 0
+    screen.print("x", 2, 0)
+    screen.update()
+    assert backend.chars_written == 1
+    assert_backend_matches(backend, screen)
+
+def log_lines(screen, lines, h=None):
+    screen.clear()
+    for y, line in enumerate(lines[-(h or screen.h):]):
+        screen.print(line, 0, y)
+
+def test_screen_update_scroll_up():
+    screen, backend = make_screen(4, 4)
+    lines = ["aaaa", "bbbb", "cccc", "dddd"]
+    log_lines(screen, lines)
+    screen.update()
+    backend.chars_written = 0
+
+    lines.append("eeee")
+    log_lines(screen, lines)
+    screen.update()
+    assert backend.scrolls == [(0, 3, 1)]
+    assert backend.chars_written == 4
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_scroll_down():
+    screen, backend = make_screen(4, 4)
+    lines = ["aaaa", "bbbb", "cccc", "dddd"]
+    log_lines(screen, lines)
+    screen.update()
+    backend.chars_written = 0
+
+    log_lines(screen, ["zzzz"] + lines[:3])
+    screen.update()
+    assert backend.scrolls == [(0, 3, -1)]
+    assert backend.chars_written == 4
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_scroll_region():
+    # a static status line should not be scrolled
+    screen, backend = make_screen(4, 4)
+    lines = ["aaaa", "bbbb", "cccc"]
+    log_lines(screen, lines, 3)
+    screen.print("STAT", 0, 3)
+    screen.update()
+
+    lines.append("dddd")
+    log_lines(screen, lines, 3)
+    screen.print("STAT", 0, 3)
+    screen.update()
+    assert backend.scrolls == [(0, 2, 1)]
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_no_scroll_without_benefit():
+    screen, backend = make_screen(4, 3)
+    screen.clear()
+    screen.print("aaaa", 0, 0)
+    screen.update()
+    screen.clear()
+    screen.print("aaaa", 0, 1)
+    screen.update()
+    assert backend.scrolls == []
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_scroll_colors():
+    red = Color(255, 0, 0)
+    screen, backend = make_screen(2, 3)
+    lines = ["aa", "bb", "cc"]
+    log_lines(screen, lines)
+    screen.fill(0, 2, 2, 1, bg=red)
+    screen.update()
+
+    log_lines(screen, lines[1:] + ["dd"])
+    screen.fill(0, 1, 2, 1, bg=red)
+    screen.update()
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_skips_unmodified_rows():
+    screen, backend = make_screen(3, 3)
+    screen.clear()
+    screen.update()
+
+    visited_rows = set()
+    at_unsafe = screen.at_unsafe
+    def spy(x, y, **kwargs):
+        visited_rows.add(y)
+        return at_unsafe(x, y, **kwargs)
+    screen.at_unsafe = spy
+
+    screen.print("x", 1, 1)
+    screen.update()
+    assert visited_rows == {1}
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_region():
+    screen, backend = make_screen(4, 2)
+    screen.clear()
+    screen.update()
+    screen.print("ab", 0, 0)
+    screen.print("cd", 2, 1)
+    screen.update(2, 1, 2, 1)
+    assert backend.lines() == ["    ", "  cd"]
+
+    # changes outside of the region are rendered later
+    screen.update()
+    assert backend.lines() == ["ab  ", "  cd"]
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_region_default_extent():
+    screen, backend = make_screen(3, 3)
+    screen.clear(char="x")
+    screen.update(1, 1)
+    assert backend.lines() == ["   ", " xx", " xx"]
+
+def test_screen_update_regions():
+    screen, backend = make_screen(3, 3)
+    screen.clear(char="x")
+    screen.update(regions=[(0, 0, 1, 1), (2, 2, 1, 1)])
+    assert backend.lines() == ["x  ", "   ", "  x"]
+
+def test_screen_update_region_oob():
+    screen, backend = make_screen(2, 2)
+    screen.clear(char="x")
+    screen.update(-1, -1, 2, 2)
+    screen.update(5, 5, 2, 2)
+    assert backend.lines() == ["x ", "  "]
+
+def test_screen_update_region_cursor():
+    screen, backend = make_screen(3, 1)
+    screen.clear()
+    screen.cursor_pos = (1, 0)
+    screen.update(2, 0, 1, 1)
+    assert backend.cursor_pos == (1, 0)
+
+def test_screen_update_erase_line():
+    blue = Color(0, 0, 255)
+    screen, backend = make_screen(10, 2, can_erase=True)
+    screen.clear()
+    screen.update()
+    screen.fill(0, 1, 10, 1, bg=blue)
+    screen.print("ab", 0, 1)
+    screen.update()
+    assert backend.erases == 1
+    assert backend.chars_written == 2
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_erase_chars():
+    blue = Color(0, 0, 255)
+    screen, backend = make_screen(20, 1, can_erase=True)
+    screen.clear()
+    screen.update()
+    screen.fill(0, 0, 20, 1, bg=blue)
+    screen.print("a", 0, 0)
+    screen.print("b", 19, 0)
+    screen.update()
+    assert backend.erases == 1
+    assert backend.chars_written == 2
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_repeat():
+    screen, backend = make_screen(10, 1, can_repeat=True)
+    screen.clear()
+    screen.update()
+    backend.repeats = 0
+    backend.chars_written = 0
+    screen.print("=" * 8, 1, 0)
+    screen.update()
+    assert backend.repeats == 1
+    assert backend.chars_written == 1
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_repeat_not_wide():
+    screen, backend = make_screen(10, 1, can_repeat=True)
+    screen.clear()
+    screen.update()
+    backend.repeats = 0
+    screen.print("人" * 4, 0, 0)
+    screen.update()
+    assert backend.repeats == 0
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_clear():
+    blue = Color(0, 0, 255)
+    screen, backend = make_screen(30, 10, can_erase=True)
+    screen.clear()
+    screen.print("hello", 0, 0)
+    screen.update()
+    backend.clears = 0
+    backend.chars_written = 0
+    screen.clear(bg=blue)
+    screen.print("hi", 3, 3)
+    screen.update()
+    assert backend.clears == 1
+    assert backend.chars_written == 2
+    assert_backend_matches(backend, screen)
+
+def test_screen_update_join_spans():
+    screen, backend = make_screen(10, 1)
+    screen.clear()
+    screen.print("abcdef", 0, 0)
+    screen.update()
+    positions = []
+    write = backend.write
+    def spy(text):
+        positions.append(backend.cursor_pos)
+        write(text)
+    backend.write = spy
+    screen.print("X", 0, 0)
+    screen.print("Y", 3, 0)
+    screen.update()
+    # the unchanged pixels between X and Y are re-drawn instead of moving
+    assert positions == [(0, 0), (1, 0), (2, 0), (3, 0)]
+    assert_backend_matches(backend, screen)
+
+def make_style_screen(w, h, **kwargs):
+    backend = FakeBackend(w, h, **kwargs)
+    return StyleScreen(backend, Observable()), backend
+
+def test_style_screen_update():
+    screen, backend = make_style_screen(4, 2)
+    screen.clear()
+    screen.print("ab", 1, 1, fg=Color(255, 0, 0), attrs=BOLD)
+    screen.update()
+    assert backend.lines() == ["    ", " ab "]
+    assert backend.cell_attrs[1] == [0, BOLD, BOLD, 0]
+    assert_backend_matches(backend, screen)
+
+def test_style_screen_update_only_changes():
+    screen, backend = make_style_screen(4, 2)
+    screen.clear()
+    screen.update()
+    backend.chars_written = 0
+    screen.print("x", 2, 0, attrs=UNDERLINE)
+    screen.update()
+    assert backend.chars_written == 1
+    assert backend.cell_attrs[0][2] == UNDERLINE
+    assert_backend_matches(backend, screen)
+
+    # restoring the old contents renders them again
+    backend.chars_written = 0
+    screen.print(" ", 2, 0, attrs=0)
+    screen.update()
+    assert backend.chars_written == 1
+    assert backend.cell_attrs[0][2] == 0
+
+def test_style_screen_style_changes():
+    screen, backend = make_style_screen(4, 1)
+    screen.clear()
+    screen.update()
+    backend.style_changes = 0
+    screen.print("ab", 0, 0, attrs=BOLD)
+    screen.print("cd", 2, 0, attrs=UNDERLINE)
+    screen.update()
+    assert backend.style_changes == 2
+
+def test_style_screen_scroll():
+    screen, backend = make_style_screen(4, 4)
+    lines = ["aaaa", "bbbb", "cccc", "dddd"]
+    log_lines(screen, lines)
+    screen.update()
+    backend.chars_written = 0
+
+    lines.append("eeee")
+    log_lines(screen, lines)
+    screen.update()
+    assert backend.scrolls == [(0, 3, 1)]
+    assert backend.chars_written == 4
+    assert_backend_matches(backend, screen)
+
+def test_style_screen_blit():
+    screen, backend = make_style_screen(4, 2)
+    screen.clear()
+    screen.update()
+    b = StyleBuffer(2, 1, styles=screen.styles)
+    b.print("xy", 0, 0, bg=Color(0, 0, 255), attrs=BOLD)
+    screen.blit(b, 1, 1)
+    screen.update()
+    assert backend.lines() == ["    ", " xy "]
+    assert backend.cell_attrs[1] == [0, BOLD, BOLD, 0]
+    assert_backend_matches(backend, screen)
+
+def test_style_screen_update_erase_line():
+    screen, backend = make_style_screen(8, 1, can_erase=True)
+    screen.clear()
+    screen.print("abcdefgh", 0, 0)
+    screen.update()
+    backend.erases = 0
+    screen.clear(bg=Color(0, 0, 255))
+    screen.print("ab", 0, 0)
+    screen.update()
+    assert backend.erases == 1
+    assert_backend_matches(backend, screen)
+
+
+def test_style_screen_animated_colors_bounded():
+    screen, backend = make_style_screen(20, 5)
+    for i in range(3000):
+        screen.clear(bg=Color(i >> 8, i & 0xFF, 0))
+        screen.print("x", i % 20, i % 5, fg=Color(0, i & 0xFF, i >> 8))
+        screen.update()
+    assert len(screen.styles) <= 1024
+    assert_backend_matches(backend, screen)
@@ -0,0 +1,154 @@
+from termpixels.buffer import Buffer
+from termpixels.scrollback import ScrollbackBuffer
+from termpixels.color import Color
+from tests.utils import assert_buffer_matches
+
+def test_scrollback_append():
+    sb = ScrollbackBuffer(3, 2)
+    sb.append("a")
+    assert sb.line_count == 1
+    assert sb.row_count == 1
+    assert_buffer_matches(
+        sb,
+        "a  ",
+        "   "
+    )
+
+def test_scrollback_append_multiline():
+    sb = ScrollbackBuffer(3, 3)
+    sb.append("a\nb")
+    assert sb.line_count == 2
+    assert sb.line(1) == "b"
+
+def test_scrollback_wrap():
+    sb = ScrollbackBuffer(3, 3)
+    sb.append("abcdefg")
+    assert sb.line_count == 1
+    assert sb.row_count == 3
+    assert_buffer_matches(
+        sb,
+        "abc",
+        "def",
+        "g  "
+    )
+
+def test_scrollback_wrap_fullwidth():
+    sb = ScrollbackBuffer(3, 2)
+    sb.append("你好")
+    assert sb.row_count == 2
+    assert sb.at(0, 0).char == "你"
+    assert sb.at(0, 1).char == "好"
+
+def test_scrollback_follow():
+    sb = ScrollbackBuffer(1, 2)
+    for ch in "abcd":
+        sb.append(ch)
+    assert sb.scroll_y == 2
+    assert_buffer_matches(
+        sb,
+        "c",
+        "d"
+    )
+
+def test_scrollback_scroll_disables_follow():
+    sb = ScrollbackBuffer(1, 2)
+    for ch in "abcd":
+        sb.append(ch)
+    sb.scroll(-2)
+    assert not sb.follow
+    sb.append("e")
+    assert_buffer_matches(
+        sb,
+        "a",
+        "b"
+    )
+
+def test_scrollback_scroll_to_bottom_enables_follow():
+    sb = ScrollbackBuffer(1, 2)
+    for ch in "abcd":
+        sb.append(ch)
+    sb.scroll(-1)
+    sb.scroll(1)
+    assert sb.follow
+
+def test_scrollback_capacity():
+    sb = ScrollbackBuffer(1, 2, capacity=3)
+    for ch in "abcde":
+        sb.append(ch)
+    assert sb.line_count == 3
+    assert [sb.line(i) for i in range(3)] == ["c", "d", "e"]
+    assert_buffer_matches(
+        sb,
+        "d",
+        "e"
+    )
+
+def test_scrollback_capacity_keeps_viewport():
+    sb = ScrollbackBuffer(1, 1, capacity=3)
+    for ch in "abc":
+        sb.append(ch)
+    sb.scroll_y = 1
+    sb.append("d")
+    assert sb.at(0, 0).char == "b"
+
+def test_scrollback_line_at_row():
+    sb = ScrollbackBuffer(2, 2)
+    sb.append("abc")
+    sb.append("d")
+    assert sb.line_at_row(0) == (0, 0)
+    assert sb.line_at_row(1) == (0, 1)
+    assert sb.line_at_row(2) == (1, 0)
+    assert sb.line_at_row(3) is None
+
+def test_scrollback_resize_rewraps():
+    sb = ScrollbackBuffer(2, 3)
+    sb.append("abcd")
+    assert sb.row_count == 2
+    sb.resize(4, 3)
+    assert sb.row_count == 1
+    assert_buffer_matches(
+        sb,
+        "abcd"
+    )
+
+def test_scrollback_colors():
+    red = Color(255, 0, 0)
+    blue = Color(0, 0, 255)
+    sb = ScrollbackBuffer(2, 1)
+    sb.clear(bg=blue)
+    sb.append("a", fg=red)
+    assert sb.at(0, 0).fg == red
+    assert sb.at(0, 0).bg == blue
+    assert sb.at(1, 0).bg == blue
+
+def test_scrollback_blit():
+    sb = ScrollbackBuffer(2, 2)
+    for line in ("ab", "cd", "ef"):
+        sb.append(line)
+    target = Buffer(2, 2)
+    target.blit(sb)
+    assert_buffer_matches(
+        target,
+        "cd",
+        "ef"
+    )
+
+def test_scrollback_direct_drawing_redrawn():
+    sb = ScrollbackBuffer(2, 3)
+    sb.append("ab")
+    sb.print("X", 1, 0)
+    sb.print("Y", 0, 2)
+    assert_buffer_matches(
+        sb,
+        "aX",
+        "  ",
+        "Y "
+    )
+    # the drawing lasts until the viewport is rendered again
+    sb.append("cd")
+    assert_buffer_matches(
+        sb,
+        "ab",
+        "cd",
+        "  "
+    )
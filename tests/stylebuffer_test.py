@@ -0,0 +1,152 @@
+from termpixels.buffer import Buffer
+from termpixels.stylebuffer import StyleBuffer
+from termpixels.style import Style, StyleTable, BOLD, UNDERLINE, sgr_attrs
+from termpixels.color import Color
+from termpixels.pixeldata import PixelData
+from tests.utils import assert_buffer_matches
+
+RED = Color(255, 0, 0)
+BLUE = Color(0, 0, 255)
+
+def test_style_table_intern():
+    table = StyleTable()
+    a = table.intern(RED, BLUE)
+    b = table.intern(RED, BLUE, BOLD)
+    assert a != b
+    assert table.intern(RED, BLUE) == a
+    assert table[b] == Style(RED, BLUE, BOLD)
+    assert len(table) == 2
+
+def test_style_table_collect():
+    buffer = StyleBuffer(2, 1)
+    table = buffer.styles
+    buffer.put_char("a", 0, 0, fg=RED)
+    kept = buffer.at(0, 0).style_id
+    unused = table.intern(BLUE, BLUE)
+    # IDs interned since the last collection are kept
+    assert table.collect() == 0
+    assert table.collect() == 1
+    assert table[unused] is None
+    assert table[kept] == Style(RED, Color(0, 0, 0))
+    # freed IDs are reused
+    assert table.intern(BLUE, RED) == unused
+
+def test_style_table_collect_unattached():
+    table = StyleTable()
+    a = table.intern(RED, BLUE)
+    table.collect()
+    assert table.collect() == 0
+    assert table[a] == Style(RED, BLUE)
+
+def test_sgr_attrs():
+    assert sgr_attrs(0) == ""
+    assert sgr_attrs(BOLD | UNDERLINE) == "1;4"
+
+def test_stylebuffer_defaults():
+    b = StyleBuffer(2, 2)
+    pixel = b.at(1, 1)
+    assert pixel == PixelData()
+    assert pixel.attrs == 0
+
+def test_stylebuffer_print():
+    b = StyleBuffer(4, 2)
+    b.print("ab", 1, 1, fg=RED, attrs=BOLD)
+    assert_buffer_matches(b, "    ", " ab ")
+    assert b.at(1, 1).fg == RED
+    assert b.at(1, 1).attrs == BOLD
+    assert b.at(1, 1).style_id == b.at(2, 1).style_id
+    assert b.at(0, 1).attrs == 0
+
+def test_stylebuffer_pixel_setters():
+    b = StyleBuffer(2, 1)
+    pixel = b.at(0, 0)
+    pixel.bg = BLUE
+    pixel.char = "x"
+    pixel.attrs = UNDERLINE
+    assert b.at(0, 0).style == Style(Color(255, 255, 255), BLUE, UNDERLINE)
+    assert b.at(0, 0).char == "x"
+    b.at(1, 0).set(b.at(0, 0))
+    assert b.at(1, 0) == b.at(0, 0)
+
+def test_stylebuffer_fill():
+    b = StyleBuffer(3, 3)
+    b.fill(1, 1, 5, 5, bg=BLUE, char="#")
+    assert_buffer_matches(b, "   ", " ##", " ##")
+    assert b.at(2, 2).bg == BLUE
+    assert b.at(2, 2).fg == Color(255, 255, 255)
+    assert b.at(0, 0).bg == Color(0, 0, 0)
+
+def test_stylebuffer_spans():
+    b = StyleBuffer(3, 3)
+    b.hspan(0, 0, 3, "-", attrs=BOLD)
+    b.vspan(2, 0, 3, "|", fg=RED)
+    assert_buffer_matches(b, "--|", "  |", "  |")
+    assert b.at(0, 0).attrs == BOLD
+    assert b.at(2, 0).attrs == BOLD
+    assert b.at(2, 0).fg == RED
+    assert b.at(2, 1).attrs == 0
+
+def test_stylebuffer_clear():
+    b = StyleBuffer(2, 2)
+    b.print("ab", 0, 0)
+    b.clear(bg=BLUE, char=".")
+    assert_buffer_matches(b, "..", "..")
+    assert b.at(1, 1).bg == BLUE
+
+def test_stylebuffer_row_version():
+    b = StyleBuffer(3, 2)
+    v0 = b.row_version(0)
+    v1 = b.row_version(1)
+    b.fill(0, 0, 3, 1, char="x")
+    assert b.row_version(0) != v0
+    assert b.row_version(1) == v1
+    v0 = b.row_version(0)
+    b.fill(0, 0, 3, 1, char="x")
+    assert b.row_version(0) == v0
+
+def test_stylebuffer_resize():
+    b = StyleBuffer(2, 2)
+    b.print("ab", 0, 0)
+    b.resize(3, 1)
+    assert_buffer_matches(b, "ab ")
+
+def test_stylebuffer_blit_shared_table():
+    a = StyleBuffer(2, 2)
+    a.print("xy", 0, 1, fg=RED, attrs=BOLD)
+    b = StyleBuffer(4, 4, styles=a.styles)
+    b.blit(a, 1, 1)
+    assert_buffer_matches(b, "    ", "    ", " xy ", "    ")
+    assert b.at(1, 2).attrs == BOLD
+    assert b.at(1, 2).style_id == a.at(0, 1).style_id
+
+def test_stylebuffer_blit_other_table():
+    a = StyleBuffer(2, 1)
+    a.print("xy", 0, 0, fg=RED, attrs=BOLD)
+    b = StyleBuffer(3, 1)
+    b.styles.intern(BLUE, BLUE)
+    b.blit(a, 2, 0)
+    assert_buffer_matches(b, "  x")
+    assert b.at(2, 0).style == Style(RED, Color(0, 0, 0), BOLD)
+
+def test_stylebuffer_blit_to_buffer():
+    a = StyleBuffer(2, 1)
+    a.print("xy", 0, 0, fg=RED)
+    b = Buffer(2, 1)
+    b.blit(a)
+    assert_buffer_matches(b, "xy")
+    assert b.at(0, 0).fg == RED
+
+def test_stylebuffer_blit_from_buffer():
+    a = Buffer(2, 1)
+    a.print("xy", 0, 0, fg=RED)
+    b = StyleBuffer(2, 1)
+    b.blit(a)
+    assert_buffer_matches(b, "xy")
+    assert b.at(0, 0).fg == RED
+
+def test_stylebuffer_fullwidth():
+    b = StyleBuffer(3, 1)
+    b.print("ab", 0, 0)
+    assert b.put_char("ｗ", 0, 0) == 2
+    assert b.at(0, 0).char == "ｗ"
+    assert b.at(1, 0).char == " "
@@ -0,0 +1,94 @@
+import struct
+import pytest
+from termpixels.terminfo import Terminfo, tparm
+
+def test_terminfo_multiple_terms():
+    a = Terminfo("xterm-256color")
+    b = Terminfo("xterm")
+    assert a.termname == "xterm-256color"
+    assert a.num("colors") == 256
+    assert b.num("colors") == 8
+    assert a.parameterize("setaf", 100) == b"\x1b[38;5;100m"
+    assert b.parameterize("setaf", 3) == b"\x1b[33m"
+
+def compile_entry(bools, nums, strings, extended, magic=0o432):
+    """Compile a terminfo entry like tic, with predefined and extended capabilities."""
+    num_format = "h" if magic == 0o432 else "i"
+    table = bytearray()
+    offsets = []
+    for string in strings:
+        offsets.append(len(table) if string is not None else -1)
+        if string is not None:
+            table += string + b"\0"
+    names = b"test|a test terminal\0"
+    data = struct.pack("<6h", magic, len(names), len(bools), len(nums), len(strings), len(table))
+    data += names + bytes(bools)
+    if len(data) % 2:
+        data += b"\0"
+    data += struct.pack("<{}{}".format(len(nums), num_format), *nums)
+    data += struct.pack("<{}h".format(len(offsets)), *offsets) + table
+    if len(data) % 2:
+        data += b"\0"
+
+    ext_bools, ext_nums, ext_strings = extended
+    values = bytearray()
+    value_offsets = []
+    for _, string in ext_strings:
+        value_offsets.append(len(values))
+        values += string + b"\0"
+    ext_names = bytearray()
+    name_offsets = []
+    for name, _ in ext_bools + ext_nums + ext_strings:
+        name_offsets.append(len(ext_names))
+        ext_names += name.encode() + b"\0"
+    data += struct.pack("<5h", len(ext_bools), len(ext_nums), len(ext_strings),
+                        len(value_offsets) + len(name_offsets), len(values) + len(ext_names))
+    data += bytes(value for _, value in ext_bools)
+    if len(data) % 2:
+        data += b"\0"
+    data += struct.pack("<{}{}".format(len(ext_nums), num_format), *(value for _, value in ext_nums))
+    data += struct.pack("<{}h".format(len(value_offsets) + len(name_offsets)), *(value_offsets + name_offsets))
+    return data + values + ext_names
+
+@pytest.mark.parametrize("magic", [0o432, 0o1036])
+def test_terminfo_compiled_entry(tmp_path, monkeypatch, magic):
+    # am, colors and cup are the second boolean, fourteenth number and eleventh string
+    entry = compile_entry([0, 1, 1], [-1] * 13 + [88], [None] * 10 + [b"\x1b[%i%p1%d;%p2%dH"],
+                          ([("XT", 1)], [("Xn", 7)], [("Ss", b"\x1b[%p1%d q")]), magic)
+    (tmp_path / "t").mkdir()
+    (tmp_path / "t" / "test").write_bytes(entry)
+    monkeypatch.setenv("TERMINFO", str(tmp_path))
+    ti = Terminfo("test")
+    assert ti.flag("am") and ti.flag("xsb") and not ti.flag("bw")
+    assert ti.num("colors") == 88
+    assert ti.num("cols") == -1
+    assert ti.string("cup") == b"\x1b[%i%p1%d;%p2%dH"
+    assert ti.string("clear") is None
+    assert ti.parameterize("cup", 2, 3) == b"\x1b[3;4H"
+    assert ti.flag("XT")
+    assert ti.num("Xn") == 7
+    assert ti.parameterize("Ss", 5) == b"\x1b[5 q"
+
+def test_terminfo_unknown():
+    with pytest.raises(Exception, match="Unknown terminal type"):
+        Terminfo("no-such-terminal")
+
+def test_tparm():
+    assert tparm(b"%p1%d;%p2%03d", 7, 5) == b"7;005"
+    assert tparm(b"%p1%x %p1%X %p1%o %p1%:-4d|", 255) == b"ff FF 377 255 |"
+    assert tparm(b"%p1%{2}%*%{1}%-%d", 5) == b"9"
+    assert tparm(b"%p1%p2%/%d %p1%p2%m%d", 20, -7) == b"-2 6"
+    assert tparm(b"%p1%'A'%+%c", 2) == b"C"
+    assert tparm(b"%p1%c", 0) == b"\x80"
+    assert tparm(b"%p1%Pa%ga%ga%+%d", 4) == b"8"
+    assert tparm(b"%%%i%p1%d") == b"%1"
+    # conditionals, with else-if chains and nesting
+    colors = b"%?%p1%{8}%<%t3%p1%d%e%p1%{16}%<%t9%p1%{8}%-%d%e38;5;%p1%d%;"
+    assert tparm(colors, 3) == b"33"
+    assert tparm(colors, 12) == b"94"
+    assert tparm(colors, 100) == b"38;5;100"
+    assert tparm(b"%?%p1%t%?%p2%tab%eac%;%ed%;", 1, 0) == b"ac"
+    assert tparm(b"%?%p1%!%p2%&%tyes%;", 0, 1) == b"yes"
+    # termcap style, without %p
+    assert tparm(b"\x1b[%i%d;%dR", 5, 10) == b"\x1b[11;6R"
+    assert tparm(b"%c%c", 65, 66) == b"AB"
@@ -0,0 +1,72 @@
+from termpixels.timestep import Timestep
+import pytest
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+def test_timestep_first_advance_starts_clock():
+    ts = Timestep(10, clock=FakeClock())
+    assert ts.advance(5) == 0
+    assert ts.advance(5.25) == 2
+    assert ts.alpha == pytest.approx(0.5)
+
+def test_timestep_accumulates_remainder():
+    ts = Timestep(10)
+    ts.advance(0)
+    assert ts.advance(0.05) == 0
+    assert ts.advance(0.1) == 1
+    assert ts.advance(0.35) == 2
+    assert ts.alpha == pytest.approx(0.5)
+
+def test_timestep_drops_ticks_beyond_limit():
+    ts = Timestep(100, max_ticks=5)
+    ts.advance(0)
+    assert ts.advance(1) == 5
+    assert ts.stats.dropped_ticks == 95
+    # the dropped time is not made up later
+    assert ts.advance(1.01) == 1
+
+def test_timestep_invalid_tickrate():
+    with pytest.raises(ValueError):
+        Timestep(0)
+
+def test_timestep_frame_ticks_then_renders():
+    clock = FakeClock()
+    ts = Timestep(10, max_ticks=10, clock=clock)
+    calls = []
+    ts.frame(lambda dt: calls.append(("tick", dt)), lambda a: calls.append(("render", a)))
+    clock.now = 0.3
+    assert ts.frame(lambda dt: calls.append(("tick", dt)), lambda a: calls.append(("render", a)))
+    assert [c[0] for c in calls] == ["render", "tick", "tick", "tick", "render"]
+    assert calls[1][1] == pytest.approx(0.1)
+    assert ts.stats.ticks == 3
+    assert ts.stats.renders == 2
+
+def test_timestep_skips_renders_under_load():
+    clock = FakeClock()
+    ts = Timestep(100, max_skipped_renders=2, clock=clock)
+    def slow_tick(dt):
+        clock.now += 0.008
+    results = []
+    for _ in range(20):
+        results.append(ts.frame(slow_tick, lambda a: None, budget=1/30))
+        clock.now += 0.02
+    # renders are skipped, but at most twice in a row, while no ticks are lost
+    assert not all(results)
+    assert "FFF" not in "".join("T" if r else "F" for r in results)
+    assert ts.stats.skipped_renders == results.count(False)
+    assert ts.stats.dropped_ticks == 0
+    assert ts.stats.ticks == pytest.approx(clock.now * 100, abs=ts.max_ticks)
+
+def test_timestep_measures_rates():
+    clock = FakeClock()
+    ts = Timestep(10, clock=clock)
+    for _ in range(21):
+        ts.frame(lambda dt: None, lambda a: None)
+        clock.now += 0.1
+    assert ts.stats.tick_rate == pytest.approx(10, rel=0.1)
+    assert ts.stats.render_rate == pytest.approx(10, rel=0.1)
@@ -0,0 +1,86 @@
+import os
+import pty
+import pytest
+import time
+from termpixels.observable import EventQueue, poll_events
+from termpixels.unix import UnixBackend, UnixInput
+
+@pytest.fixture
+def pty_pair():
+    master, slave = pty.openpty()
+    yield master, slave
+    os.close(master)
+    os.close(slave)
+
+def test_unix_input_tty(pty_pair):
+    master, slave = pty_pair
+    queue = EventQueue()
+    inpt = UnixInput(tty=slave, term="xterm", queue=queue)
+    keys = []
+    inpt.listen("key", keys.append)
+    inpt.start(threaded=False)
+    try:
+        os.write(master, b"ab")
+        inpt.poll(1)
+        poll_events(queue)
+    finally:
+        inpt.stop()
+    assert [k.char for k in keys] == ["a", "b"]
+
+def test_unix_input_notify_resize(pty_pair):
+    master, slave = pty_pair
+    queue = EventQueue()
+    inpt = UnixInput(tty=slave, term="xterm", queue=queue)
+    resized = []
+    inpt.listen("resize", lambda: resized.append(True))
+    inpt.start(threaded=False)
+    try:
+        inpt.notify_resize()
+        inpt.poll(1)
+        poll_events(queue)
+    finally:
+        inpt.stop()
+    assert resized == [True]
+
+def test_unix_input_close():
+    master, slave = pty.openpty()
+    queue = EventQueue()
+    inpt = UnixInput(tty=slave, term="xterm", queue=queue)
+    closed = []
+    inpt.listen("close", lambda: closed.append(True))
+    inpt.start(threaded=False)
+    try:
+        os.close(master)
+        inpt.poll(1)
+        poll_events(queue)
+        assert closed == [True]
+        # the closed terminal is no longer polled, rather than spinning
+        t0 = time.perf_counter()
+        inpt.poll(0.05)
+        assert time.perf_counter() - t0 >= 0.04
+    finally:
+        inpt.stop()
+        os.close(slave)
+
+def test_unix_input_stop_threaded(pty_pair):
+    master, slave = pty_pair
+    queue = EventQueue()
+    inpt = UnixInput(tty=slave, term="xterm", queue=queue)
+    keys = []
+    inpt.listen("key", keys.append)
+    inpt.start()
+    # an incomplete escape sequence, which is flushed by stop()
+    os.write(master, b"a\x1b")
+    time.sleep(0.01)
+    inpt.stop()
+    assert inpt._collector is None
+    poll_events(queue)
+    assert [k.char for k in keys][0] == "a"
+
+def test_unix_backend_tty(pty_pair):
+    master, slave = pty_pair
+    backend = UnixBackend(tty=slave, term="xterm-256color")
+    assert backend.color_mode == "256-color"
+    backend.write("hello")
+    backend.flush()
+    assert os.read(master, 1024) == b"hello"
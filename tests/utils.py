@@ -1,3 +1,5 @@
+import numbers
+
 def assert_buffer_matches(buffer, *lines):
     # dump buffer contents
     for y in range(buffer.h):
@@ -8,3 +10,123 @@ def assert_buffer_matches(buffer, *lines):
     for y, line in enumerate(lines):
         for x, ch in enumerate(line):
             assert buffer.at(x, y).char == ch
+
+class FakeBackend:
+    """A stand-in for a terminal backend that emulates a grid of cells.
+
+    Each cell holds a tuple (char, fg, bg). Counts the number of characters 
+    written so that tests can check how much was redrawn.
+    """
+    def __init__(self, w, h, *, can_erase=False, can_repeat=False):
+        self.size = (w, h)
+        self.cursor_pos = None
+        self.show_cursor = None
+        self.fg = None
+        self.bg = None
+        self.attrs = 0
+        self.style_changes = 0
+        self.cells = [[(" ", None, None) for x in range(w)] for y in range(h)]
+        self.cell_attrs = [[0] * w for y in range(h)]
+        self.chars_written = 0
+        self.scrolls = []
+        self.erases = 0
+        self.repeats = 0
+        self.clears = 0
+        self.can_erase = can_erase
+        self.can_repeat = can_repeat
+    
+    def write(self, text):
+        x, y = self.cursor_pos
+        for ch in text:
+            self.cells[y][x] = (ch, self.fg, self.bg)
+            self.cell_attrs[y][x] = self.attrs
+            self.chars_written += 1
+            x += 1
+        self.cursor_pos = (x, y)
+
+    def set_style(self, style):
+        if (style.fg, style.bg, style.attrs) == (self.fg, self.bg, self.attrs):
+            return
+        self.fg = style.fg
+        self.bg = style.bg
+        self.attrs = style.attrs
+        self.style_changes += 1
+
+    def scroll(self, top, bottom, n):
+        self.scrolls.append((top, bottom, n))
+        rows = self.cells[top:bottom + 1]
+        blank = [(" ", None, self.bg) for x in range(self.size[0])]
+        if n > 0:
+            rows = rows[n:] + [list(blank) for i in range(n)]
+        else:
+            rows = [list(blank) for i in range(-n)] + rows[:n]
+        self.cells[top:bottom + 1] = rows
+        attrs = self.cell_attrs[top:bottom + 1]
+        if n > 0:
+            attrs = attrs[n:] + [[0] * self.size[0] for i in range(n)]
+        else:
+            attrs = [[0] * self.size[0] for i in range(-n)] + attrs[:n]
+        self.cell_attrs[top:bottom + 1] = attrs
+        self.cursor_pos = None
+        return True
+
+    def erase_line(self):
+        self.erase_chars(self.size[0] - self.cursor_pos[0])
+
+    def erase_chars(self, n):
+        x, y = self.cursor_pos
+        for i in range(x, min(self.size[0], x + n)):
+            self.cells[y][i] = (" ", self.fg, self.bg)
+            self.cell_attrs[y][i] = self.attrs
+        self.erases += 1
+
+    def repeat(self, char, n):
+        self.repeats += 1
+        self.write(char * n)
+        self.chars_written -= n - 1
+
+    def clear_screen(self):
+        self.clears += 1
+        self.cells = [[(" ", self.fg, self.bg) for x in range(self.size[0])] for y in range(self.size[1])]
+        self.cell_attrs = [[self.attrs] * self.size[0] for y in range(self.size[1])]
+        self.cursor_pos = (0, 0)
+
+    def flush(self):
+        pass
+
+    def lines(self):
+        return ["".join(cell[0] for cell in row) for row in self.cells]
+
+def assert_backend_matches(backend, buffer):
+    """Check that a FakeBackend displays the contents of a buffer."""
+    for y in range(buffer.h):
+        for x in range(buffer.w):
+            pixel = buffer.at(x, y)
+            assert backend.cells[y][x] == (pixel.char, pixel.fg, pixel.bg)
+
+class _IntegerMethods:
+    def __init__(self, value):
+        self.value = value
+
+    def __index__(self):
+        return self.value
+
+    def __int__(self):
+        return self.value
+
+    def __eq__(self, other):
+        return self.value == other
+
+    def __hash__(self):
+        return hash(self.value)
+
+def _not_implemented(self, *args):
+    return NotImplemented
+
+# An integer type other than int, like numpy's integer scalars. It subclasses
+# numbers.Integral, rather than registering with it, which would affect the
+# rest of the test run. Only conversion to int is supported.
+Integer = type("Integer", (_IntegerMethods, numbers.Integral), {
+    name: _not_implemented for name in numbers.Integral.__abstractmethods__
+    if name not in vars(_IntegerMethods)
+})